@@ -1,13 +1,36 @@
 from fastapi import APIRouter, Depends, Query
 
+from core.pagination import DEFAULT_PAGE_SIZE
+from core.streaming import StreamFormat
 from services.affinity.search_affinity_programs_service import (
     search_affinity_porgram_records as get_affinity_program_records_service,
 )
+from services.affinity.search_affinity_programs_service import (
+    search_affinity_program_page as search_affinity_program_page_service,
+)
+from services.affinity.search_affinity_programs_service import (
+    stream_affinity_program_records as stream_affinity_program_records_service,
+)
 from services.auth_service import get_current_user_from_token
 
 router = APIRouter(dependencies=[Depends(get_current_user_from_token)])
 
 
 @router.get("/")
-async def get_affinity_program_records(search_by: str = Query(..., alias="search_by")):
+async def get_affinity_program_records(
+    search_by: str = Query(..., alias="search_by"),
+    stream: StreamFormat | None = None,
+    page_size: int | None = None,
+    cursor: str | None = None,
+    include_total: bool = False,
+):
+    if page_size is not None or cursor is not None:
+        return await search_affinity_program_page_service(
+            search_by,
+            DEFAULT_PAGE_SIZE if page_size is None else page_size,
+            cursor,
+            include_total,
+        )
+    if stream:
+        return await stream_affinity_program_records_service(search_by, stream)
     return await get_affinity_program_records_service(search_by)
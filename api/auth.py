@@ -7,7 +7,9 @@ from services.auth_service import (
     get_current_user_from_token,
     login_user,
     logout_user,
+    refresh_branch_mappings,
     refresh_user_token,
+    require_admin,
 )
 
 router = APIRouter()
@@ -30,8 +32,13 @@ async def get_current_user(request: Request):
 
 
 @router.post("/logout")
-async def logout(response: Response):
-    return await logout_user(response)
+async def logout(request: Request, response: Response):
+    return await logout_user(response, request)
+
+
+@router.post("/refresh_branch_mapping", dependencies=[Depends(require_admin)])
+async def refresh_branch_mapping():
+    return await refresh_branch_mappings()
 
 
 @router.post("/refresh")
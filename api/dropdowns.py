@@ -1,13 +1,18 @@
 from typing import Any
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 
+from core.http_cache import conditional_json_response
 from services.auth_service import get_current_user_from_token
+from services.dropdowns_service import bundle_validators
 from services.dropdowns_service import (
     delete_dropdown_values as delete_dropdown_values_service,
 )
 from services.dropdowns_service import (
-    get_dropdown_values as get_dropdown_values_service,
+    get_dropdown_bundle as get_dropdown_bundle_service,
+)
+from services.dropdowns_service import (
+    get_dropdown_entry as get_dropdown_entry_service,
 )
 from services.dropdowns_service import (
     upsert_dropdown_values as upsert_dropdown_values_service,
@@ -16,9 +21,25 @@ from services.dropdowns_service import (
 router = APIRouter(dependencies=[Depends(get_current_user_from_token)])
 
 
+@router.get("/bundle")
+async def get_dropdown_bundle(names: str, request: Request):
+    # Declared before /{dropdown_name} so "bundle" is not treated as a dropdown type.
+    entries = await get_dropdown_bundle_service(names.split(","))
+    etag, last_modified = bundle_validators(entries)
+    return conditional_json_response(
+        request,
+        {name: entry.rows for name, entry in entries.items()},
+        etag=etag,
+        last_modified=last_modified,
+    )
+
+
 @router.get("/{dropdown_name}")
-async def get_dropdown(dropdown_name: str):
-    return await get_dropdown_values_service(dropdown_name)
+async def get_dropdown(dropdown_name: str, request: Request):
+    entry = await get_dropdown_entry_service(dropdown_name)
+    return conditional_json_response(
+        request, entry.rows, etag=entry.etag, last_modified=entry.last_modified
+    )
 
 
 @router.post("/{dropdown_name}/upsert")
@@ -11,8 +11,10 @@ router = APIRouter(dependencies=[Depends(get_current_user_from_token)])
 
 
 @router.get("/")
-async def get_sac_account(request: Request):
-    return await get_sac_account_service(dict(request.query_params))
+async def get_sac_account(request: Request, fields: str | None = None):
+    params = dict(request.query_params)
+    params.pop("fields", None)
+    return await get_sac_account_service(params, fields=fields)
 
 
 @router.post("/upsert")
@@ -8,6 +8,9 @@ from services.sac.sac_account_associations_service import (
 from services.sac.sac_account_associations_service import (
     delete_associations as delete_associations_service,
 )
+from services.sac.sac_account_associations_service import (
+    get_account_family as get_account_family_service,
+)
 from services.sac.sac_account_associations_service import (
     get_associations as get_associations_service,
 )
@@ -20,6 +23,11 @@ async def get_associations(request: Request):
     return await get_associations_service(dict(request.query_params))
 
 
+@router.get("/family")
+async def get_account_family(request: Request):
+    return await get_account_family_service(dict(request.query_params))
+
+
 @router.post("/add")
 async def add_associations(payload: SacAccountAssociationRequest):
     return await add_associations_service(payload.model_dump())
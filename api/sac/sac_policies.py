@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, Request
 from core.models.sac_policies import SacPolicyBulkFieldUpdate, SacPolicyUpsert
 from services.auth_service import get_current_user_from_token
 from services.sac.sac_policies_service import get_premium as get_premium_service
+from services.sac.sac_policies_service import get_premiums as get_premiums_service
 from services.sac.sac_policies_service import (
     get_underwriter_details as get_underwriter_details_service,
 )
@@ -30,8 +31,10 @@ router = APIRouter(dependencies=[Depends(get_current_user_from_token)])
 
 
 @router.get("/")
-async def get_sac_policies(request: Request):
-    return await get_sac_policies_service(dict(request.query_params))
+async def get_sac_policies(request: Request, fields: str | None = None):
+    params = dict(request.query_params)
+    params.pop("fields", None)
+    return await get_sac_policies_service(params, fields=fields)
 
 
 @router.post("/upsert")
@@ -52,6 +55,10 @@ async def update_field_for_all_policies(payload: list[SacPolicyBulkFieldUpdate]
 async def get_premium(request: Request):
     return await get_premium_service(dict(request.query_params))
 
+@router.get("/get_premiums")
+async def get_premiums(request: Request):
+    return await get_premiums_service(dict(request.query_params))
+
 @router.get("/underwriter_details")
 async def get_underwriter_details(request: Request):
     return await get_underwriter_details_service(dict(request.query_params))
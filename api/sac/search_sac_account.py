@@ -1,13 +1,36 @@
 from fastapi import APIRouter, Depends, Query
 
+from core.pagination import DEFAULT_PAGE_SIZE
+from core.streaming import StreamFormat
 from services.auth_service import get_current_user_from_token
+from services.sac.search_sac_account_service import (
+    search_sac_account_page as search_sac_account_page_service,
+)
 from services.sac.search_sac_account_service import (
     search_sac_account_records as get_sac_account_records_service,
 )
+from services.sac.search_sac_account_service import (
+    stream_sac_account_records as stream_sac_account_records_service,
+)
 
 router = APIRouter(dependencies=[Depends(get_current_user_from_token)])
 
 
 @router.get("/")
-async def get_sac_account_records(search_by: str = Query(..., alias="search_by")):
+async def get_sac_account_records(
+    search_by: str = Query(..., alias="search_by"),
+    stream: StreamFormat | None = None,
+    page_size: int | None = None,
+    cursor: str | None = None,
+    include_total: bool = False,
+):
+    if page_size is not None or cursor is not None:
+        return await search_sac_account_page_service(
+            search_by,
+            DEFAULT_PAGE_SIZE if page_size is None else page_size,
+            cursor,
+            include_total,
+        )
+    if stream:
+        return await stream_sac_account_records_service(search_by, stream)
     return await get_sac_account_records_service(search_by)
@@ -1,3 +1,6 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -40,8 +43,43 @@ from api.sac.sac_affiliates import router as sac_affiliates_router
 from api.sac.sac_policies import router as sac_policies_router
 from api.sac.search_sac_account import router as search_sac_account_router
 from core.config import settings
+from core.db_executor import executor_stats, run_db, shutdown_executor
+from core.db_helpers import warm_schema_cache
+from core.jwt_handler import decode_cache_stats
+from db import dispose_pool, get_pool
+from services.association_graph_service import (
+    association_graphs,
+    start_association_graphs,
+)
+from services.branch_mapping_service import start_branch_mapping_index
+from services.name_email_index_service import name_email_index, start_name_email_index
+from services.sac.sac_policies_service import premium_cache_stats
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    if settings.DB_SCHEMA_WARMUP:
+        try:
+            tables = await run_db(warm_schema_cache)
+            logger.info(f"Schema cache warmed for {tables} tables")
+        except Exception as e:
+            # Writers fall back to loading schemas on demand.
+            logger.warning(f"Schema cache warm-up failed - {str(e)}")
+
+    branch_refresher = await start_branch_mapping_index()
+    graph_refresher = await start_association_graphs()
+    name_email_refresher = await start_name_email_index()
+    yield
+    for refresher in (branch_refresher, graph_refresher, name_email_refresher):
+        if refresher is not None:
+            refresher.cancel()
+    shutdown_executor()
+    dispose_pool()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
@@ -61,6 +99,21 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/health/db", tags=["health"])
+async def db_health_check():
+    return {"executor": executor_stats(), "pool": get_pool().stats()}
+
+
+@app.get("/health/caches", tags=["health"])
+async def cache_health_check():
+    return {
+        "jwt_decode": decode_cache_stats(),
+        "association_graphs": {graph.table: graph.stats() for graph in association_graphs},
+        "name_email_index": name_email_index.stats(),
+        "premiums": premium_cache_stats(),
+    }
+
+
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(dropdowns_router, prefix="/dropdowns", tags=["dropdowns"])
 
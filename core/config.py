@@ -34,6 +34,59 @@ class Settings:
     DB_DRIVER: str = os.getenv("DB_DRIVER", "{ODBC Driver 17 for SQL Server}")
     DB_AUTH: str | None = os.getenv("DB_AUTH")
 
+    # Connection pool configuration (see db.ConnectionPool)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: float = float(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = _as_bool(os.getenv("DB_POOL_PRE_PING"), default=True)
+
+    # Async DB executor (see core.db_executor). 0 workers means "match DB_POOL_SIZE".
+    DB_EXECUTOR_WORKERS: int = int(os.getenv("DB_EXECUTOR_WORKERS", "0"))
+    DB_CALL_TIMEOUT: float = float(os.getenv("DB_CALL_TIMEOUT", "0"))
+    # Concurrent streamed queries (see core.db_helpers.stream_raw_query_async).
+    # 0 means half of DB_POOL_SIZE.
+    DB_STREAM_LIMIT: int = int(os.getenv("DB_STREAM_LIMIT", "0"))
+
+    # Table schema cache (see core.db_helpers.get_table_schema). 0 TTL disables caching.
+    DB_SCHEMA_CACHE_TTL: float = float(os.getenv("DB_SCHEMA_CACHE_TTL", "3600"))
+    DB_SCHEMA_WARMUP: bool = _as_bool(os.getenv("DB_SCHEMA_WARMUP"), default=True)
+
+    # Dropdown reference data cache (see services.dropdowns_service).
+    # 0 size or TTL disables caching.
+    DROPDOWN_CACHE_TTL: float = float(os.getenv("DROPDOWN_CACHE_TTL", "300"))
+    DROPDOWN_CACHE_SIZE: int = int(os.getenv("DROPDOWN_CACHE_SIZE", "256"))
+
+    # Per-customer active premium totals (see services.sac.sac_policies_service.get_premium).
+    # 0 size or TTL disables the cache.
+    PREMIUM_CACHE_TTL: float = float(os.getenv("PREMIUM_CACHE_TTL", "60"))
+    PREMIUM_CACHE_SIZE: int = int(os.getenv("PREMIUM_CACHE_SIZE", "4096"))
+
+    # Authenticated principal cache (see services.auth_service.resolve_principal)
+    PRINCIPAL_CACHE_TTL: float = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+
+    # Verified JWT decode cache (see core.jwt_handler). 0 size or TTL disables it.
+    JWT_DECODE_CACHE_SIZE: int = int(os.getenv("JWT_DECODE_CACHE_SIZE", "4096"))
+    JWT_DECODE_CACHE_TTL: float = float(os.getenv("JWT_DECODE_CACHE_TTL", "300"))
+
+    # tblBranchMapping index refresh interval (see services.branch_mapping_service).
+    # 0 disables the index and branch lookups query the table directly.
+    BRANCH_MAPPING_REFRESH_SECONDS: float = float(
+        os.getenv("BRANCH_MAPPING_REFRESH_SECONDS", "300")
+    )
+
+    # Account association graph reload interval (see services.association_graph_service).
+    # 0 disables the in-memory graph and family lookups read the table per request.
+    ASSOCIATION_GRAPH_REFRESH_SECONDS: float = float(
+        os.getenv("ASSOCIATION_GRAPH_REFRESH_SECONDS", "300")
+    )
+
+    # Underwriter / SAC user name -> email index refresh interval
+    # (see services.name_email_index_service). 0 disables it and lookups join in SQL.
+    NAME_EMAIL_INDEX_REFRESH_SECONDS: float = float(
+        os.getenv("NAME_EMAIL_INDEX_REFRESH_SECONDS", "300")
+    )
+
     # Azure AD app credentials (used with SSO login)
     AZURE_TENANT_ID: str | None = os.getenv("AZURE_TENANT_ID")
     AZURE_CLIENT_ID: str | None = os.getenv("AZURE_CLIENT_ID")
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import re
 from collections.abc import Iterable
 from datetime import date, datetime
+from functools import lru_cache
 from typing import Any
 
 DATE_OUTPUT_FORMAT = "%m-%d-%Y"
@@ -13,6 +15,11 @@ _DEFAULT_INPUT_FORMATS: tuple[str, ...] = (
     "%d/%m/%Y",
     "%d-%m-%Y",
 )
+# Shapes handled without the strptime cascade. The separator must repeat, as in
+# the cascade formats (e.g. 2024/01/02 or 1-2-2024, but not 2024-01/02).
+_YEAR_FIRST_PATTERN = re.compile(r"(\d{4})([-/])(\d{1,2})\2(\d{1,2})")
+_YEAR_LAST_PATTERN = re.compile(r"(\d{1,2})([-/])(\d{1,2})\2(\d{4})")
+PARSE_MEMO_SIZE = 4096
 
 
 def _is_sentinel_date(value: date | datetime) -> bool:
@@ -21,6 +28,30 @@ def _is_sentinel_date(value: date | datetime) -> bool:
     return value == date(1900, 1, 1)
 
 
+def _is_date_like_key(key: str) -> bool:
+    if not key:
+        return False
+    lowered = key.lower()
+    return (
+        "date" in lowered
+        or lowered.startswith("dt")
+        or lowered.endswith("dt")
+        or lowered.endswith("_dt")
+        or lowered.endswith("date")
+    )
+
+
+@lru_cache(maxsize=1024)
+def _date_column_plan(
+    columns: tuple[str, ...],
+    fields: frozenset[str] | None,
+) -> tuple[str, ...]:
+    """Decide once per result shape (and allow-list) which columns hold dates."""
+    if fields is not None:
+        return tuple(column for column in columns if column in fields)
+    return tuple(column for column in columns if _is_date_like_key(column))
+
+
 def format_records_dates(
     records: list[dict[str, Any]],
     *,
@@ -29,26 +60,17 @@ def format_records_dates(
     if not records:
         return records
 
-    field_set = set(fields) if fields is not None else None
+    field_key = frozenset(fields) if fields is not None else None
 
+    # Query results share one shape, so this is normally a single group.
+    groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
     for record in records:
-        for key in list(record.keys()):
-            if field_set is not None:
-                if key not in field_set:
-                    continue
-            else:
-                if not key:
-                    continue
-                lowered = key.lower()
-                if not (
-                    "date" in lowered
-                    or lowered.startswith("dt")
-                    or lowered.endswith("dt")
-                    or lowered.endswith("_dt")
-                    or lowered.endswith("date")
-                ):
-                    continue
-            record[key] = format_date_value(record.get(key))
+        groups.setdefault(tuple(record), []).append(record)
+
+    for columns, rows in groups.items():
+        for key in _date_column_plan(columns, field_key):
+            for record in rows:
+                record[key] = format_date_value(record[key])
     return records
 
 
@@ -58,25 +80,10 @@ def normalize_payload_dates(
     fields: Iterable[str] | None = None,
 ) -> dict[str, Any]:
     normalized = dict(payload)
-    field_set = set(fields) if fields is not None else None
-
-    for key in list(normalized.keys()):
-        if field_set is not None:
-            if key not in field_set:
-                continue
-        else:
-            if not key:
-                continue
-            lowered = key.lower()
-            if not (
-                "date" in lowered
-                or lowered.startswith("dt")
-                or lowered.endswith("dt")
-                or lowered.endswith("_dt")
-                or lowered.endswith("date")
-            ):
-                continue
-        normalized[key] = parse_date_input(normalized.get(key))
+    field_key = frozenset(fields) if fields is not None else None
+
+    for key in _date_column_plan(tuple(normalized), field_key):
+        normalized[key] = parse_date_input(normalized[key])
     return normalized
 
 
@@ -132,12 +139,58 @@ def parse_date_input(value: Any) -> Any:
     return value
 
 
+def _build_datetime(year: int, month: int, day: int) -> datetime | None:
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def _sniff_date(text: str) -> datetime | None:
+    match = _YEAR_LAST_PATTERN.fullmatch(text)
+    if match:
+        first, second, year = int(match[1]), int(match[3]), int(match[4])
+        # Month-first wins when both readings are valid, as in the cascade order.
+        return _build_datetime(year, first, second) or _build_datetime(year, second, first)
+
+    match = _YEAR_FIRST_PATTERN.fullmatch(text)
+    if match:
+        return _build_datetime(int(match[1]), int(match[3]), int(match[4]))
+    return None
+
+
+def _sniff_datetime(text: str) -> datetime | None:
+    """
+    Parse the common shapes directly from their digits. Returns None when the
+    shape is not recognized (or the date is invalid) so the caller can fall back.
+    """
+    if len(text) <= 10:
+        return _sniff_date(text)
+
+    if text[4] == "-" and text[:4].isdigit():
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            pass
+
+    # Like the cascade, keep only the date before a time part it cannot parse.
+    for sep in ("T", " "):
+        if sep in text:
+            return _sniff_date(text.split(sep, 1)[0])
+    return None
+
+
+@lru_cache(maxsize=PARSE_MEMO_SIZE)
 def _try_parse_datetime(text: str) -> datetime | None:
     if not text:
         return None
 
     clean_text = text.rstrip("Z")
+    return _sniff_datetime(clean_text) or _parse_datetime_cascade(clean_text)
+
 
+def _parse_datetime_cascade(clean_text: str) -> datetime | None:
+    """Try ISO parsing, then each input format, then the date before a T/space."""
     try:
         return datetime.fromisoformat(clean_text)
     except ValueError:
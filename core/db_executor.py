@@ -0,0 +1,297 @@
+# core/db_executor.py
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, Token
+from functools import partial
+from typing import Any, Protocol, TypeVar
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DbCallTimeoutError(TimeoutError):
+    """Raised when a database call exceeds its per-call timeout."""
+
+
+class DbCallCancelledError(RuntimeError):
+    """Raised inside a worker when its call was cancelled before or while running."""
+
+
+class DbCall:
+    """
+    Tracks the cursors opened by one executor call so the call can be cancelled.
+
+    Cancelling issues `cursor.cancel()` on every open cursor, which aborts the
+    statement currently running on the server; the worker then fails with a
+    driver error and the connection is rolled back on return to the pool.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cursors: list[Any] = []
+        self.cancelled = False
+
+    def register_cursor(self, cursor: Any) -> Any:
+        with self._lock:
+            if self.cancelled:
+                raise DbCallCancelledError("Database call was cancelled")
+            self._cursors.append(cursor)
+        return cursor
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            cursors = list(self._cursors)
+
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception:
+                logger.debug("Cursor cancel failed", exc_info=True)
+
+
+_current_call: ContextVar[DbCall | None] = ContextVar("db_current_call", default=None)
+
+
+def current_call() -> DbCall | None:
+    """Return the executor call running on this thread, if any."""
+    return _current_call.get()
+
+
+class ConnectionOwner(Protocol):
+    """Keeps a pooled connection borrowed across several run_db calls."""
+
+    @property
+    def borrowed(self) -> bool: ...
+
+
+_connection_owner: ContextVar[ConnectionOwner | None] = ContextVar(
+    "db_connection_owner", default=None
+)
+
+
+def set_connection_owner(owner: ConnectionOwner | None) -> Token:
+    """
+    Route the caller's later run_db calls to the owner executor while `owner`
+    holds a connection. Returns a token for reset_connection_owner.
+    """
+    return _connection_owner.set(owner)
+
+
+def reset_connection_owner(token: Token) -> None:
+    _connection_owner.reset(token)
+
+
+class _ExecutorMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.max_queued = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def on_submit(self) -> None:
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+    def on_start(self, waited: float) -> None:
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def on_skip(self) -> None:
+        with self._lock:
+            self.queued -= 1
+
+    def on_finish(self, *, failed: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def on_timeout(self) -> None:
+        with self._lock:
+            self.timed_out += 1
+
+    def on_cancel(self) -> None:
+        with self._lock:
+            self.cancelled += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            started = self.submitted - self.queued
+            return {
+                "submitted": self.submitted,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "cancelled": self.cancelled,
+                "max_queued": self.max_queued,
+                "avg_wait_ms": (
+                    round(self.total_wait_seconds / started * 1000, 3) if started else 0.0
+                ),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_workers = 0
+_owner_executor: ThreadPoolExecutor | None = None
+_owner_workers = 0
+_executor_lock = threading.Lock()
+_metrics = _ExecutorMetrics()
+
+
+def _worker_count() -> int:
+    # One worker per pooled connection by default, so DB concurrency is tuned
+    # independently of Starlette's shared threadpool. These workers can still block
+    # on an exhausted pool while units of work hold connections between calls;
+    # those units run on the owner executor below, so they can always finish and
+    # release their connections.
+    return settings.DB_EXECUTOR_WORKERS or settings.DB_POOL_SIZE
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_workers
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor_workers = _worker_count()
+                _executor = ThreadPoolExecutor(
+                    max_workers=_executor_workers, thread_name_prefix="db-worker"
+                )
+    return _executor
+
+
+def get_owner_executor() -> ThreadPoolExecutor:
+    """
+    Executor for calls whose caller already holds a pooled connection. At most
+    DB_POOL_SIZE owners exist at once, so one worker per pooled connection means
+    these calls never wait behind calls that are blocked on the pool.
+    """
+    global _owner_executor, _owner_workers
+    if _owner_executor is None:
+        with _executor_lock:
+            if _owner_executor is None:
+                _owner_workers = settings.DB_POOL_SIZE
+                _owner_executor = ThreadPoolExecutor(
+                    max_workers=_owner_workers, thread_name_prefix="db-owner"
+                )
+    return _owner_executor
+
+
+def _executor_for_caller() -> ThreadPoolExecutor:
+    owner = _connection_owner.get()
+    if owner is not None and owner.borrowed:
+        return get_owner_executor()
+    return get_executor()
+
+
+def shutdown_executor() -> None:
+    global _executor, _owner_executor
+    with _executor_lock:
+        executors = (_executor, _owner_executor)
+        _executor = _owner_executor = None
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def executor_stats() -> dict[str, Any]:
+    """Backpressure metrics for the DB executor."""
+    return {"workers": _executor_workers, "owner_workers": _owner_workers, **_metrics.snapshot()}
+
+
+def _run_tracked(call: DbCall, submitted_at: float, func: Callable[[], T]) -> T:
+    if call.cancelled:
+        _metrics.on_skip()
+        raise DbCallCancelledError("Database call was cancelled before it started")
+
+    _metrics.on_start(time.monotonic() - submitted_at)
+    token = _current_call.set(call)
+    failed = True
+    try:
+        result = func()
+        failed = False
+        return result
+    finally:
+        _current_call.reset(token)
+        _metrics.on_finish(failed=failed)
+
+
+async def run_db(
+    func: Callable[..., T],
+    /,
+    *args: Any,
+    timeout: float | None = None,
+    **kwargs: Any,
+) -> T:
+    """
+    Run a blocking DB function on the dedicated DB executor.
+
+    - timeout: seconds before the call is cancelled and DbCallTimeoutError is raised.
+      Defaults to settings.DB_CALL_TIMEOUT; 0 or None disables the timeout.
+    - If the awaiting task is cancelled (e.g. client disconnect) the running
+      statement is cancelled too.
+    - The caller's context variables are visible to `func` (e.g. an open
+      db.unit_of_work). Calls from a unit of work that holds a connection run on
+      the owner executor.
+    """
+    if timeout is None:
+        timeout = settings.DB_CALL_TIMEOUT or None
+
+    call = DbCall()
+    loop = asyncio.get_running_loop()
+    _metrics.on_submit()
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(
+        _executor_for_caller(),
+        partial(
+            context.run,
+            _run_tracked,
+            call,
+            time.monotonic(),
+            partial(func, *args, **kwargs),
+        ),
+    )
+
+    try:
+        # Shield the executor future so a queued call still reaches _run_tracked,
+        # which observes the cancellation flag and keeps the metrics consistent.
+        if timeout:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        return await asyncio.shield(future)
+    except TimeoutError as exc:
+        if future.done() and not future.cancelled():
+            # The function itself raised a TimeoutError (e.g. pool exhaustion).
+            raise
+        call.cancel()
+        _metrics.on_timeout()
+        raise DbCallTimeoutError(f"Database call timed out after {timeout}s") from exc
+    except asyncio.CancelledError:
+        call.cancel()
+        _metrics.on_cancel()
+        raise
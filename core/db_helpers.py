@@ -2,39 +2,256 @@
 
 import logging
 import re
-from collections.abc import Iterable
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from functools import partial
 from typing import Any
 
-import pandas as pd
-from fastapi.concurrency import run_in_threadpool
-
+from core.config import settings
+from core.db_executor import current_call, run_db
+from core.pagination import build_page, decode_cursor, validate_page_size
 from db import db_connection
 
 logger = logging.getLogger(__name__)
 
 _IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_RESULT_COLUMN_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_ ]*$")
+_TRAILING_ORDER_BY_PATTERN = re.compile(r"\s+ORDER\s+BY\s+[^()]*$", re.IGNORECASE)
 _UPDATE_DATETIME_COLUMN = "UpdateDateTime"
 _INSERT_DATETIME_COLUMN = "InsertDateTime"
+STREAM_BATCH_SIZE = 500
+# SQL Server allows 2100 parameters per statement and 1000 rows per VALUES constructor.
+_MAX_STATEMENT_PARAMS = 2000
+_MAX_VALUES_ROWS = 1000
+_ROW_ORDINAL_COLUMN = "_source_row"
+# Filter keys may carry an operator suffix (CustomerNum__in=1,2,3); a bare
+# column name is an equality filter.
+FILTER_OPERATORS = frozenset({"in", "between", "gte", "lte", "prefix", "is_null"})
+_FILTER_OPERATOR_SEPARATOR = "__"
+_LIKE_WILDCARD_PATTERN = re.compile(r"([%_\[])")
 
 
 def _ensure_safe_identifier(identifier: str) -> None:
     if not identifier or not _IDENTIFIER_PATTERN.match(identifier):
         raise ValueError(f"Invalid column or table name: {identifier}")
+
+
+def _quote_result_column(column: str) -> str:
+    """Bracket-quote a result column alias such as `Customer Name`."""
+    if not column or not _RESULT_COLUMN_PATTERN.match(column):
+        raise ValueError(f"Invalid result column name: {column}")
+    return f"[{column}]"
+
+
+def _keyset_predicate(columns: list[str], values: list[Any]) -> tuple[str, list[Any]]:
+    """
+    Build a NULL-aware "row comes after `values`" predicate for ascending ORDER BY
+    `columns` (already quoted). SQL Server sorts NULLs first, so after a NULL every
+    non-NULL value follows, and nothing sorts after a non-NULL value but larger ones.
+    """
+    if len(columns) != len(values):
+        raise ValueError("Keyset values do not match the keyset columns")
+
+    branches: list[str] = []
+    params: list[Any] = []
+    for index, (column, value) in enumerate(zip(columns, values, strict=True)):
+        parts: list[str] = []
+        branch_params: list[Any] = []
+        for prior_column, prior_value in zip(columns[:index], values[:index], strict=True):
+            if prior_value is None:
+                parts.append(f"{prior_column} IS NULL")
+            else:
+                parts.append(f"{prior_column} = ?")
+                branch_params.append(prior_value)
+
+        if value is None:
+            parts.append(f"{column} IS NOT NULL")
+        else:
+            parts.append(f"{column} > ?")
+            branch_params.append(value)
+
+        branches.append("(" + " AND ".join(parts) + ")")
+        params.extend(branch_params)
+
+    return "(" + " OR ".join(branches) + ")", params
+
+
+def _strip_order_by(query: str) -> str:
+    """Drop a trailing semicolon and the outermost trailing ORDER BY clause."""
+    stripped = query.strip().rstrip(";").rstrip()
+    return _TRAILING_ORDER_BY_PATTERN.sub("", stripped)
+
+
+def build_keyset_page_query(
+    query: str,
+    keyset_columns: Sequence[str],
+    *,
+    page_size: int,
+    after: list[Any] | None = None,
+    params: list[Any] | None = None,
+) -> tuple[str, list[Any]]:
+    """
+    Wrap a SELECT so it returns one keyset page of `page_size + 1` rows.
+
+    `keyset_columns` are result column names (aliases); they must start with the
+    query's own ORDER BY columns and end with enough tie-breakers to make rows
+    unique. The extra row tells the caller whether another page exists.
+    """
+    if not keyset_columns:
+        raise ValueError("Keyset pagination requires at least one keyset column")
+
+    quoted = [_quote_result_column(column) for column in keyset_columns]
+    page_query = f"SELECT * FROM ({_strip_order_by(query)}) AS page_source"
+    page_params = list(params or [])
+
+    if after is not None:
+        predicate, predicate_params = _keyset_predicate(quoted, list(after))
+        page_query += f" WHERE {predicate}"
+        page_params.extend(predicate_params)
+
+    page_query += f" ORDER BY {', '.join(quoted)} OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+    page_params.append(page_size + 1)
+    return page_query, page_params
+
+
+def build_count_query(query: str) -> str:
+    """Wrap a SELECT to count its rows."""
+    return f"SELECT COUNT(*) AS total FROM ({_strip_order_by(query)}) AS count_source"
 
 
-def _table_has_update_datetime(cursor: Any, table: str) -> bool:
-    """Return whether the SQL Server table has the standard audit column."""
-    cursor.execute(
-        """
-SELECT 1
-FROM sys.columns
-WHERE object_id = OBJECT_ID(?) AND name = ?
-""",
-        [table, _UPDATE_DATETIME_COLUMN],
-    )
-    return cursor.fetchone() is not None
+@dataclass(frozen=True)
+class TableSchema:
+    """Column metadata for one table, as read from the SQL Server catalog."""
+
+    name: str
+    columns: dict[str, str] = field(default_factory=dict)  # column -> type, in ordinal order
+    identity_columns: tuple[str, ...] = ()
+
+    @property
+    def exists(self) -> bool:
+        return bool(self.columns)
+
+    @property
+    def supports_audit_columns(self) -> bool:
+        return self.has_column(_UPDATE_DATETIME_COLUMN)
+
+    def has_column(self, column: str) -> bool:
+        # Column names are case-insensitive under the database's default collation.
+        folded = column.casefold()
+        return any(name.casefold() == folded for name in self.columns)
+
+
+_TABLE_SCHEMA_QUERY = """
+SELECT c.name, ty.name, c.is_identity
+FROM sys.columns AS c
+JOIN sys.types AS ty ON ty.user_type_id = c.user_type_id
+WHERE c.object_id = OBJECT_ID(?)
+ORDER BY c.column_id
+"""
+
+_ALL_TABLE_SCHEMAS_QUERY = """
+SELECT t.name, c.name, ty.name, c.is_identity
+FROM sys.tables AS t
+JOIN sys.columns AS c ON c.object_id = t.object_id
+JOIN sys.types AS ty ON ty.user_type_id = c.user_type_id
+WHERE t.schema_id = SCHEMA_ID()
+ORDER BY t.name, c.column_id
+"""
+
+
+class _SchemaCache:
+    """Process-wide table schema cache with TTL expiry (DB_SCHEMA_CACHE_TTL)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[TableSchema, float]] = {}
+
+    def get(self, table: str) -> TableSchema | None:
+        ttl = settings.DB_SCHEMA_CACHE_TTL
+        if ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(table.casefold())
+        if entry is None or time.monotonic() - entry[1] > ttl:
+            return None
+        return entry[0]
+
+    def put(self, schema: TableSchema) -> None:
+        with self._lock:
+            self._entries[schema.name.casefold()] = (schema, time.monotonic())
+
+    def invalidate(self, table: str | None = None) -> None:
+        with self._lock:
+            if table is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(table.casefold(), None)
+
+
+_schema_cache = _SchemaCache()
+
+
+def _schema_from_rows(table: str, rows: Iterable[Sequence[Any]]) -> TableSchema:
+    columns: dict[str, str] = {}
+    identity: list[str] = []
+    for name, type_name, is_identity in rows:
+        columns[name] = type_name
+        if is_identity:
+            identity.append(name)
+    return TableSchema(name=table, columns=columns, identity_columns=tuple(identity))
+
+
+def get_table_schema(cursor: Any, table: str) -> TableSchema:
+    """
+    Return the cached schema for `table`, loading it through `cursor` on a miss.
+
+    Missing tables are cached too (with no columns) so they do not re-query.
+    """
+    _ensure_safe_identifier(table)
+    schema = _schema_cache.get(table)
+    if schema is None:
+        cursor.execute(_TABLE_SCHEMA_QUERY, [table])
+        schema = _schema_from_rows(table, cursor.fetchall())
+        _schema_cache.put(schema)
+    return schema
+
+
+def invalidate_schema_cache(table: str | None = None) -> None:
+    """Drop one table (or every table) from the schema cache, e.g. after a migration."""
+    _schema_cache.invalidate(table)
+
+
+def warm_schema_cache() -> int:
+    """Load every table in the default schema in one catalog query; returns the table count."""
+    from db import db_connection as _db_connection
+
+    with _db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_ALL_TABLE_SCHEMAS_QUERY)
+        by_table: dict[str, list[Sequence[Any]]] = {}
+        for table, *column in cursor.fetchall():
+            by_table.setdefault(table, []).append(column)
+
+    for table, rows in by_table.items():
+        _schema_cache.put(_schema_from_rows(table, rows))
+    return len(by_table)
+
+
+async def get_table_schema_async(table: str, *, timeout: float | None = None) -> TableSchema:
+    _ensure_safe_identifier(table)
+    schema = _schema_cache.get(table)
+    if schema is not None:
+        return schema
+
+    def _load() -> TableSchema:
+        from db import db_connection as _db_connection
+
+        with _db_connection() as conn:
+            return get_table_schema(conn.cursor(), table)
+
+    return await run_db(_load, timeout=timeout)
 
 
 def _utc_datetimeoffset_string() -> str:
@@ -56,7 +273,7 @@ def add_update_datetime_if_supported(
     latter is included only for write paths that can create a new row.
     """
     copied_records = [dict(record) for record in records]
-    if not copied_records or not _table_has_update_datetime(cursor, table):
+    if not copied_records or not get_table_schema(cursor, table).supports_audit_columns:
         return copied_records
 
     timestamp = _utc_datetimeoffset_string()
@@ -68,12 +285,97 @@ def add_update_datetime_if_supported(
     return copied_records
 
 
+def split_filter_key(key: str) -> tuple[str, str]:
+    """Split `Column__op` into (column, op); keys without a known operator are "eq"."""
+    column, separator, operator = key.rpartition(_FILTER_OPERATOR_SEPARATOR)
+    if separator and column and operator in FILTER_OPERATORS:
+        return column, operator
+    return key, "eq"
+
+
+def _filter_values(value: Any) -> list[Any]:
+    # Query strings carry lists as comma-separated text.
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    if isinstance(value, list | tuple | set | frozenset):
+        return list(value)
+    return [value]
+
+
+def _filter_flag(key: str, value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes"):
+        return True
+    if text in ("0", "false", "no"):
+        return False
+    raise ValueError(f"{key} must be true or false")
+
+
+def _escape_like(value: Any) -> str:
+    return _LIKE_WILDCARD_PATTERN.sub(r"[\1]", str(value))
+
+
+def compile_filter(key: str, value: Any) -> tuple[str, list[Any]]:
+    """
+    Compile one filter into a parametrized clause:
+
+    - Col=v -> Col = ?
+    - Col__in=a,b -> Col IN (?, ?)  (duplicates dropped)
+    - Col__between=a,b -> Col BETWEEN ? AND ?
+    - Col__gte=v / Col__lte=v -> Col >= ? / Col <= ?
+    - Col__prefix=a,b -> (Col LIKE 'a%' OR Col LIKE 'b%'), wildcards escaped
+    - Col__is_null=true|false -> Col IS NULL / Col IS NOT NULL
+    """
+    column, operator = split_filter_key(key)
+    _ensure_safe_identifier(column)
+
+    if operator == "eq":
+        return f"{column} = ?", [value]
+    if operator == "gte":
+        return f"{column} >= ?", [value]
+    if operator == "lte":
+        return f"{column} <= ?", [value]
+    if operator == "is_null":
+        return f"{column} IS {'' if _filter_flag(key, value) else 'NOT '}NULL", []
+
+    values = _filter_values(value)
+    if operator == "between":
+        if len(values) != 2:
+            raise ValueError(f"{key} requires exactly two values")
+        return f"{column} BETWEEN ? AND ?", values
+
+    if not values:
+        raise ValueError(f"{key} requires at least one value")
+    if operator == "prefix":
+        clauses = [f"{column} LIKE ?" for _ in values]
+        clause = clauses[0] if len(clauses) == 1 else f"({' OR '.join(clauses)})"
+        return clause, [f"{_escape_like(item)}%" for item in values]
+
+    unique = list(dict.fromkeys(values))
+    return f"{column} IN ({', '.join('?' for _ in unique)})", unique
+
+
+def compile_filters(filters: dict[str, Any] | None) -> tuple[list[str], list[Any]]:
+    """Compile a filters dict into WHERE clauses (to be AND-ed) and their parameters."""
+    clauses: list[str] = []
+    params: list[Any] = []
+    for key, value in (filters or {}).items():
+        clause, filter_params = compile_filter(key, value)
+        clauses.append(clause)
+        params.extend(filter_params)
+    return clauses, params
+
+
 def sanitize_filters(
     query_params: dict[str, Any] | None,
     allowed_fields: Iterable[str] | None = None,
 ) -> dict[str, Any]:
     """
     Validate incoming filters against an allow-list and identifier rules.
+
+    Operator keys (see compile_filter) are checked by their column name.
     """
     if not query_params:
         return {}
@@ -83,11 +385,12 @@ def sanitize_filters(
     disallowed: list[str] = []
 
     for key, value in query_params.items():
-        if allowed is not None and key not in allowed:
+        column, _ = split_filter_key(key)
+        if allowed is not None and column not in allowed:
             disallowed.append(key)
             continue
 
-        _ensure_safe_identifier(key)
+        _ensure_safe_identifier(column)
         sanitized[key] = value
 
     if disallowed:
@@ -96,64 +399,659 @@ def sanitize_filters(
     return sanitized
 
 
+@dataclass(frozen=True)
+class ColumnCondition:
+    """
+    A column predicate pushed into the WHERE clause of build_select_query.
+
+    - negate: match rows whose value differs (`<>`, or `IS NOT NULL` for a None value).
+    - include_nulls: NULL values match too; plain SQL comparisons never match NULL.
+    - normalized: compare LOWER(LTRIM(RTRIM(column))) against the lower-cased value.
+    """
+
+    column: str
+    value: Any = None
+    negate: bool = False
+    include_nulls: bool = False
+    normalized: bool = False
+
+    def to_sql(self, qualifier: str | None = None) -> tuple[str, list[Any]]:
+        _ensure_safe_identifier(self.column)
+        column = self.column
+        if qualifier is not None:
+            _ensure_safe_identifier(qualifier)
+            column = f"{qualifier}.{column}"
+
+        if self.value is None:
+            return f"{column} IS {'NOT ' if self.negate else ''}NULL", []
+
+        target, value = column, self.value
+        if self.normalized:
+            target = f"LOWER(LTRIM(RTRIM({column})))"
+            value = str(value).strip().lower()
+
+        clause = f"{target} {'<>' if self.negate else '='} ?"
+        if self.include_nulls:
+            clause = f"({column} IS NULL OR {clause})"
+        return clause, [value]
+
+
+# Rows whose Stage is 'Retired' (any case/padding) are hidden from list endpoints.
+NOT_RETIRED_STAGE = ColumnCondition(
+    "Stage", "retired", negate=True, include_nulls=True, normalized=True
+)
+
+
+def render_conditions(
+    conditions: Iterable[ColumnCondition] | None, qualifier: str | None = None
+) -> tuple[list[str], list[Any]]:
+    """Render conditions as WHERE clauses (to be AND-ed) and their parameters."""
+    clauses: list[str] = []
+    params: list[Any] = []
+    for condition in conditions or ():
+        clause, condition_params = condition.to_sql(qualifier)
+        clauses.append(clause)
+        params.extend(condition_params)
+    return clauses, params
+
+
+def select_list(columns: Sequence[str] | None) -> str:
+    """Render a projection for SELECT; None (or empty) selects every column."""
+    if not columns:
+        return "*"
+    for column in columns:
+        _ensure_safe_identifier(column)
+    return ", ".join(columns)
+
+
+async def resolve_projection(table: str, fields: str | Sequence[str] | None) -> list[str] | None:
+    """
+    Turn a `fields` request value (comma-separated or a list) into table columns.
+
+    Names are matched case-insensitively against the cached table schema and
+    returned with the schema's spelling, without duplicates. Returns None when no
+    fields were requested; raises ValueError for unknown columns.
+    """
+    if fields is None:
+        return None
+    raw = fields.split(",") if isinstance(fields, str) else list(fields)
+    requested = [name.strip() for name in raw if name and name.strip()]
+    if not requested:
+        return None
+
+    schema = await get_table_schema_async(table)
+    by_folded = {name.casefold(): name for name in schema.columns}
+    columns: list[str] = []
+    unknown: list[str] = []
+    for name in requested:
+        column = by_folded.get(name.casefold())
+        if column is None:
+            unknown.append(name)
+        elif column not in columns:
+            columns.append(column)
+
+    if unknown:
+        raise ValueError(f"Invalid field(s): {', '.join(unknown)}")
+    return columns
+
+
 def build_select_query(
     table: str,
     filters: dict[str, Any] | None = None,
-    order_by: str | None = None,
+    order_by: str | Sequence[str] | None = None,
+    *,
+    columns: Sequence[str] | None = None,
+    conditions: Sequence[ColumnCondition] | None = None,
+    page_size: int | None = None,
+    after: list[Any] | None = None,
 ) -> tuple[str, list[Any]]:
     """
     Build a parametrized SELECT query like:
     SELECT * FROM <table> WHERE col1 = ? AND col2 = ? ORDER BY <order_by>
+
+    Filter keys may use the operators described in compile_filter.
+    `columns` replaces `*` with a projection (see resolve_projection).
+    `conditions` adds ColumnCondition predicates (e.g. NOT_RETIRED_STAGE) after
+    the equality filters, so exclusions run server-side.
+
+    With `page_size`, `order_by` doubles as the keyset: rows after the `after`
+    values are returned, `page_size + 1` at a time (see core.pagination.build_page).
+    A projection must then include the keyset columns.
     """
     _ensure_safe_identifier(table)
-    base_query = f"SELECT * FROM {table}"
-    params: list[Any] = []
+    base_query = f"SELECT {select_list(columns)} FROM {table}"
+    clauses, params = compile_filters(filters)
+
+    condition_clauses, condition_params = render_conditions(conditions)
+    clauses.extend(condition_clauses)
+    params.extend(condition_params)
 
-    if filters:
-        clauses: list[str] = []
-        for key, value in filters.items():
-            _ensure_safe_identifier(key)
-            clauses.append(f"{key} = ?")
-            params.append(value)
+    order_columns = [order_by] if isinstance(order_by, str) else list(order_by or [])
+    for column in order_columns:
+        _ensure_safe_identifier(column)
 
-        if clauses:
-            base_query += " WHERE " + " AND ".join(clauses)
+    if page_size is not None and not order_columns:
+        raise ValueError("Pagination requires order_by columns")
 
-    if order_by:
-        _ensure_safe_identifier(order_by)
-        base_query += f" ORDER BY {order_by}"
+    if page_size is not None and columns:
+        missing = [column for column in order_columns if column not in columns]
+        if missing:
+            raise ValueError(f"Projection is missing keyset column(s): {', '.join(missing)}")
+
+    if after is not None:
+        if page_size is None:
+            raise ValueError("A page cursor requires page_size")
+        predicate, predicate_params = _keyset_predicate(order_columns, list(after))
+        clauses.append(predicate)
+        params.extend(predicate_params)
+
+    if clauses:
+        base_query += " WHERE " + " AND ".join(clauses)
+
+    if order_columns:
+        base_query += f" ORDER BY {', '.join(order_columns)}"
+
+    if page_size is not None:
+        base_query += " OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+        params.append(page_size + 1)
 
     return base_query, params
 
 
+def cursor_columns(cursor: Any) -> list[str]:
+    """Return the result-set column names of an executed cursor."""
+    if cursor.description is None:
+        return []
+    return [column[0] for column in cursor.description]
+
+
+def rows_to_records(
+    cursor: Any,
+    rows: Iterable[Any] | None = None,
+    *,
+    columns: Iterable[str] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Materialize cursor rows as list[dict] straight from the driver.
+
+    `cursor.description` is read once per call. pyodbc already returns NULLs as
+    None, so no post-processing is needed. Pass `rows` to convert a batch that was
+    fetched separately (e.g. with fetchmany); otherwise all remaining rows are
+    fetched. `columns` keeps only the named result columns, in that order.
+    """
+    names = cursor_columns(cursor)
+    if not names:
+        return []
+
+    if rows is None:
+        rows = cursor.fetchall()
+
+    if columns is None:
+        return [dict(zip(names, row, strict=True)) for row in rows]
+
+    positions = {name: index for index, name in enumerate(names)}
+    selected = list(columns)
+    missing = [name for name in selected if name not in positions]
+    if missing:
+        raise ValueError(f"Unknown result column(s): {', '.join(missing)}")
+
+    indexes = [positions[name] for name in selected]
+    pairs = list(zip(selected, indexes, strict=True))
+    return [{name: row[index] for name, index in pairs} for row in rows]
+
+
 def fetch_records(
     table: str,
     filters: dict[str, Any] | None = None,
-    order_by: str | None = None,
+    order_by: str | Sequence[str] | None = None,
+    *,
+    columns: Sequence[str] | None = None,
+    conditions: Sequence[ColumnCondition] | None = None,
+    page_size: int | None = None,
+    after: list[Any] | None = None,
 ) -> list[dict[str, Any]]:
     """
-    Run a SELECT on <table> using filters and optional ORDER BY,
-    return rows as list[dict].
+    Run a SELECT on <table> using filters, conditions and optional ORDER BY,
+    return rows as list[dict]. See build_select_query for projection and paging.
+
+    When an `__in` filter pushes the statement past SQL Server's parameter limit,
+    the list is split across several statements on one connection; the combined
+    rows are then re-sorted by `order_by` (NULLs first, strings case-insensitive).
     """
-    query, params = build_select_query(table, filters, order_by)
+    query, params = build_select_query(
+        table,
+        filters,
+        order_by,
+        columns=columns,
+        conditions=conditions,
+        page_size=page_size,
+        after=after,
+    )
+    if len(params) <= _MAX_STATEMENT_PARAMS:
+        return run_raw_query(query, params)
 
+    if page_size is not None:
+        raise ValueError("Pagination is not supported for IN filters split across queries")
+
+    statements = [
+        build_select_query(table, chunk, order_by, columns=columns, conditions=conditions)
+        for chunk in _split_in_filter(filters or {}, len(params))
+    ]
+    records: list[dict[str, Any]] = []
     with db_connection() as conn:
-        df = pd.read_sql(query, conn, params=params)
+        cursor = conn.cursor()
+        for statement, statement_params in statements:
+            cursor.execute(statement, statement_params)
+            records.extend(rows_to_records(cursor))
+
+    order_columns = [order_by] if isinstance(order_by, str) else list(order_by or [])
+    if order_columns:
+        records.sort(key=lambda record: [_sort_value(record.get(c)) for c in order_columns])
+    return records
+
+
+def _split_in_filter(filters: dict[str, Any], total_params: int) -> list[dict[str, Any]]:
+    """Split the largest `__in` filter so each statement fits _MAX_STATEMENT_PARAMS."""
+    in_values = {
+        key: list(dict.fromkeys(_filter_values(value)))
+        for key, value in filters.items()
+        if split_filter_key(key)[1] == "in"
+    }
+    if not in_values:
+        raise ValueError("Too many filter values for one query")
+
+    key = max(in_values, key=lambda name: len(in_values[name]))
+    values = in_values[key]
+    budget = _MAX_STATEMENT_PARAMS - (total_params - len(values))
+    if budget < 1:
+        raise ValueError("Too many filter values for one query")
+
+    return [
+        {**filters, key: values[start : start + budget]}
+        for start in range(0, len(values), budget)
+    ]
+
 
-    # Replace NaN with None for JSON
-    df = df.astype(object).where(pd.notna(df), None)
-    return df.to_dict(orient="records")
+def _sort_value(value: Any) -> tuple[bool, Any]:
+    # Mirror SQL Server's default ordering: NULLs first, case-insensitive text.
+    if value is None:
+        return (False, 0)
+    return (True, value.casefold() if isinstance(value, str) else value)
 
 
-def run_raw_query(query: str, params: list[Any] | None = None) -> list[dict[str, Any]]:
+def run_raw_query(
+    query: str,
+    params: list[Any] | None = None,
+    *,
+    columns: Iterable[str] | None = None,
+) -> list[dict[str, Any]]:
     """
     Generic helper to run any SELECT query (used later e.g. for search queries).
     """
     with db_connection() as conn:
-        df = pd.read_sql(query, conn, params=params or [])
+        cursor = conn.cursor()
+        cursor.execute(query, params or [])
+        return rows_to_records(cursor, columns=columns)
+
+
+def run_raw_query_sets(statements: Sequence[tuple[str, list[Any]]]) -> list[list[dict[str, Any]]]:
+    """
+    Run several SELECT statements as one batch on a single connection.
+
+    Returns one record list per statement, in order, by walking the result sets
+    with `cursor.nextset()`. Statements must each produce exactly one result set.
+    """
+    if not statements:
+        return []
+
+    batch = ";\n".join(query.strip().rstrip(";") for query, _ in statements)
+    params = [param for _, statement_params in statements for param in statement_params]
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(batch, params)
+        results = [rows_to_records(cursor)]
+        while cursor.nextset():
+            results.append(rows_to_records(cursor))
+
+    if len(results) != len(statements):
+        raise ValueError(f"Expected {len(statements)} result sets, got {len(results)}")
+    return results
+
+
+def iter_raw_query_batches(
+    query: str,
+    params: list[Any] | None = None,
+    *,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Run a SELECT and yield its rows as list[dict] batches pulled with fetchmany.
+
+    The pooled connection is held until the generator is exhausted or closed.
+    When resumed from a different executor call (as stream_raw_query_async does
+    per batch), the cursor is registered with that call so its timeout or
+    cancellation aborts the fetch in flight.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params or [])
+        registered_with = current_call()
+        while True:
+            call = current_call()
+            if call is not None and call is not registered_with:
+                call.register_cursor(cursor)
+                registered_with = call
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows_to_records(cursor, rows)
+
+
+def _quote_plain(identifier: str) -> str:
+    _ensure_safe_identifier(identifier)
+    return identifier
+
+
+def _group_rows_by_columns(
+    rows: Iterable[dict[str, Any]],
+) -> dict[tuple[str, ...], list[dict[str, Any]]]:
+    """Group rows by their column signature, preserving first-seen order."""
+    groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+    for row in rows:
+        if row:
+            groups.setdefault(tuple(row.keys()), []).append(row)
+    return groups
+
+
+def _chunk_rows(rows: list[Any], params_per_row: int) -> Iterator[list[Any]]:
+    """Split rows so each statement stays under SQL Server's parameter and VALUES limits."""
+    size = max(1, min(_MAX_VALUES_ROWS, _MAX_STATEMENT_PARAMS // max(params_per_row, 1)))
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def _collation_key(value: Any) -> Any:
+    # Match strings the way the database's default collation compares them:
+    # case-insensitively and ignoring trailing spaces.
+    return value.rstrip(" ").casefold() if isinstance(value, str) else value
+
+
+def _dedupe_by_key(rows: list[dict[str, Any]], key_columns: list[str]) -> list[dict[str, Any]]:
+    # A set-based MERGE may not touch the same target row twice; keep the last
+    # occurrence of each key, matching the old row-by-row "last write wins" result.
+    # Keys that differ only by case or trailing spaces hit the same row.
+    latest: dict[tuple[Any, ...], dict[str, Any]] = {}
+    for row in rows:
+        latest[tuple(_collation_key(row.get(key)) for key in key_columns)] = row
+    return list(latest.values())
+
+
+def execute_merge_batches(
+    cursor: Any,
+    table: str,
+    data_list: list[dict[str, Any]],
+    key_columns: list[str],
+    *,
+    exclude_key_columns_from_insert: bool = False,
+    quote: Callable[[str], str] = _quote_plain,
+) -> int:
+    """
+    Upsert rows with one set-based MERGE per column signature (chunked by
+    SQL Server limits), using a multi-row VALUES table as the source.
+
+    InsertDateTime is written on insert only. Returns the statements executed.
+    """
+    quoted_table = quote(table)
+    quoted_keys = [quote(key) for key in key_columns]
+    on_clause = " AND ".join(f"target.{key} = source.{key}" for key in quoted_keys)
+    statements = 0
+
+    for columns, rows in _group_rows_by_columns(data_list).items():
+        quoted_columns = {column: quote(column) for column in columns}
+
+        update_cols = [
+            col for col in columns if col not in key_columns and col != _INSERT_DATETIME_COLUMN
+        ]
+        update_section = ""
+        if update_cols:
+            update_set = ", ".join(
+                f"{quoted_columns[col]} = source.{quoted_columns[col]}" for col in update_cols
+            )
+            update_section = f"""
+WHEN MATCHED THEN
+    UPDATE SET {update_set}
+"""
+
+        insert_columns = (
+            [col for col in columns if col not in key_columns]
+            if exclude_key_columns_from_insert
+            else list(columns)
+        )
+        if not insert_columns:
+            raise ValueError("No columns available for insert operation")
+
+        insert_columns_sql = ", ".join(quoted_columns[col] for col in insert_columns)
+        insert_values_sql = ", ".join(f"source.{quoted_columns[col]}" for col in insert_columns)
+        source_columns_sql = ", ".join(quoted_columns[col] for col in columns)
+        row_placeholder = "(" + ", ".join(["?"] * len(columns)) + ")"
+
+        for chunk in _chunk_rows(_dedupe_by_key(rows, key_columns), len(columns)):
+            merge_query = f"""
+MERGE INTO {quoted_table} AS target
+USING (VALUES {", ".join([row_placeholder] * len(chunk))}) AS source ({source_columns_sql})
+ON {on_clause}
+{update_section}WHEN NOT MATCHED THEN
+    INSERT ({insert_columns_sql})
+    VALUES ({insert_values_sql});
+"""
+            values = [row[col] for row in chunk for col in columns]
+            cursor.execute(merge_query, values)
+            statements += 1
 
-    df = df.astype(object).where(pd.notna(df), None)
-    return df.to_dict(orient="records")
+    return statements
+
+
+def execute_insert_batches(
+    cursor: Any,
+    table: str,
+    records: list[dict[str, Any]],
+    *,
+    quote: Callable[[str], str] = _quote_plain,
+) -> int:
+    """
+    Insert rows with one `fast_executemany` batch per column signature.
+
+    Empty records are skipped. Returns the statements executed.
+    """
+    quoted_table = quote(table)
+    statements = 0
+
+    for columns, rows in _group_rows_by_columns(records).items():
+        column_clause = ", ".join(quote(col) for col in columns)
+        placeholders = ", ".join(["?"] * len(columns))
+        query = f"INSERT INTO {quoted_table} ({column_clause}) VALUES ({placeholders})"
+
+        # Parameter arrays are sent in a single round trip per group.
+        cursor.fast_executemany = True
+        cursor.executemany(query, [[row[col] for col in columns] for row in rows])
+        statements += 1
+
+    return statements
+
+
+# Table variable types for OUTPUT ... INTO. Catalog type names carry no length, so
+# variable-length types are widened to (max) to fit any value of the source column.
+_OUTPUT_WIDENED_TYPES = {
+    "char": "nvarchar(max)",
+    "varchar": "nvarchar(max)",
+    "nchar": "nvarchar(max)",
+    "nvarchar": "nvarchar(max)",
+    "sysname": "nvarchar(max)",
+    "binary": "varbinary(max)",
+    "varbinary": "varbinary(max)",
+    "timestamp": "binary(8)",
+    "rowversion": "binary(8)",
+}
+
+
+def _output_column_type(schema: TableSchema, column: str) -> str:
+    folded = column.casefold()
+    for name, type_name in schema.columns.items():
+        if name.casefold() != folded:
+            continue
+        base = type_name.lower()
+        if base in ("decimal", "numeric"):
+            # Precision and scale are unknown; only identity columns are known to be
+            # whole numbers.
+            if name in schema.identity_columns:
+                return f"{base}(38, 0)"
+            raise ValueError(f"Cannot return non-identity {base} column {column}")
+        return _OUTPUT_WIDENED_TYPES.get(base, type_name)
+    raise ValueError(f"Unknown column {column} on {schema.name}")
+
+
+def execute_insert_returning(
+    cursor: Any,
+    table: str,
+    records: list[dict[str, Any]],
+    returning: Sequence[str],
+    *,
+    quote: Callable[[str], str] = _quote_plain,
+) -> list[dict[str, Any] | None]:
+    """
+    Insert rows and return their `returning` columns (e.g. the identity) from the
+    same statements, one dict per input record in input order (None when empty).
+
+    A plain INSERT ... OUTPUT does not promise VALUES order, so rows go through
+    MERGE ... ON 1 = 0, whose OUTPUT can carry the source row number. The output
+    goes INTO a table variable (typed from the cached table schema) and is read
+    back from it, since SQL Server rejects a bare OUTPUT on tables with triggers.
+    """
+    if not returning:
+        raise ValueError("returning requires at least one column")
+
+    schema = get_table_schema(cursor, table)
+    quoted_table = quote(table)
+    quoted_returning = [quote(column) for column in returning]
+    declare_sql = ", ".join(
+        [f"{_ROW_ORDINAL_COLUMN} int"]
+        + [
+            f"{quoted} {_output_column_type(schema, column)}"
+            for column, quoted in zip(returning, quoted_returning, strict=True)
+        ]
+    )
+    output_sql = ", ".join(f"INSERTED.{quoted}" for quoted in quoted_returning)
+    into_sql = ", ".join([_ROW_ORDINAL_COLUMN, *quoted_returning])
+    results: list[dict[str, Any] | None] = [None] * len(records)
+
+    groups: dict[tuple[str, ...], list[tuple[int, dict[str, Any]]]] = {}
+    for index, record in enumerate(records):
+        if record:
+            groups.setdefault(tuple(record.keys()), []).append((index, record))
+
+    for columns, rows in groups.items():
+        quoted_columns = [quote(column) for column in columns]
+        columns_sql = ", ".join(quoted_columns)
+        values_sql = ", ".join(f"source.{column}" for column in quoted_columns)
+        row_placeholder = "(" + ", ".join(["?"] * (len(columns) + 1)) + ")"
+
+        for chunk in _chunk_rows(rows, len(columns) + 1):
+            query = f"""
+DECLARE @inserted TABLE ({declare_sql});
+MERGE INTO {quoted_table} AS target
+USING (VALUES {", ".join([row_placeholder] * len(chunk))}) AS source ({columns_sql}, {_ROW_ORDINAL_COLUMN})
+ON 1 = 0
+WHEN NOT MATCHED THEN
+    INSERT ({columns_sql})
+    VALUES ({values_sql})
+OUTPUT source.{_ROW_ORDINAL_COLUMN}, {output_sql} INTO @inserted ({into_sql});
+SELECT {into_sql} FROM @inserted;
+"""
+            values = [
+                value for index, row in chunk for value in (*(row[col] for col in columns), index)
+            ]
+            cursor.execute(query, values)
+            # Skip the MERGE row count to reach the SELECT's result set.
+            while cursor.description is None and cursor.nextset():
+                pass
+            for ordinal, *output in cursor.fetchall():
+                results[ordinal] = dict(zip(returning, output, strict=True))
+
+    return results
+
+
+def execute_delete_batches(
+    cursor: Any,
+    table: str,
+    data_list: list[dict[str, Any]],
+    key_columns: list[str],
+    *,
+    quote: Callable[[str], str] = _quote_plain,
+) -> int:
+    """
+    Delete rows matching key_columns with set-based `DELETE ... WHERE EXISTS`
+    statements against a VALUES key set. Returns the statements executed.
+    """
+    for data in data_list:
+        for key in key_columns:
+            if key not in data:
+                raise ValueError(f"{key} is required for deletion")
+
+    quoted_table = quote(table)
+    quoted_keys = [quote(key) for key in key_columns]
+    match_clause = " AND ".join(f"target.{key} = doomed.{key}" for key in quoted_keys)
+    row_placeholder = "(" + ", ".join(["?"] * len(key_columns)) + ")"
+    key_rows = list(dict.fromkeys(tuple(data[key] for key in key_columns) for data in data_list))
+    statements = 0
+
+    for chunk in _chunk_rows(key_rows, len(key_columns)):
+        delete_query = (
+            f"DELETE target FROM {quoted_table} AS target WHERE EXISTS ("
+            f"SELECT 1 FROM (VALUES {', '.join([row_placeholder] * len(chunk))}) "
+            f"AS doomed ({', '.join(quoted_keys)}) WHERE {match_clause})"
+        )
+        cursor.execute(delete_query, [value for key_row in chunk for value in key_row])
+        statements += 1
+
+    return statements
+
+
+def select_existing_keys(
+    cursor: Any,
+    table: str,
+    key_rows: list[tuple[Any, ...]],
+    key_columns: list[str],
+    *,
+    lock: bool = False,
+    quote: Callable[[str], str] = _quote_plain,
+) -> set[tuple[Any, ...]]:
+    """
+    Return the key_rows already present in the table, with one set-based
+    `WHERE EXISTS` query per chunk against a VALUES key set.
+
+    The requested values are echoed back (not the stored ones), so matches under
+    a case- or padding-insensitive collation still compare equal in Python.
+    With `lock`, the matched range stays locked until the transaction ends.
+    """
+    quoted_table = quote(table)
+    quoted_keys = [quote(key) for key in key_columns]
+    hint = " WITH (UPDLOCK, HOLDLOCK)" if lock else ""
+    select_sql = ", ".join(f"wanted.{key}" for key in quoted_keys)
+    match_clause = " AND ".join(f"target.{key} = wanted.{key}" for key in quoted_keys)
+    row_placeholder = "(" + ", ".join(["?"] * len(key_columns)) + ")"
+    existing: set[tuple[Any, ...]] = set()
+
+    for chunk in _chunk_rows(list(dict.fromkeys(key_rows)), len(key_columns)):
+        query = (
+            f"SELECT {select_sql} FROM (VALUES {', '.join([row_placeholder] * len(chunk))}) "
+            f"AS wanted ({', '.join(quoted_keys)}) WHERE EXISTS ("
+            f"SELECT 1 FROM {quoted_table} AS target{hint} WHERE {match_clause})"
+        )
+        cursor.execute(query, [value for key_row in chunk for value in key_row])
+        existing.update(tuple(row) for row in cursor.fetchall())
+
+    return existing
 
 
 def merge_upsert_records(
@@ -169,6 +1067,8 @@ def merge_upsert_records(
     - table: target table name
     - data_list: list of rows (dicts) to upsert
     - key_columns: columns used to match existing rows (ON clause)
+
+    Rows sharing the same columns are merged in one set-based statement.
     """
     if not data_list:
         return {"message": "No data provided", "count": 0}
@@ -187,53 +1087,13 @@ def merge_upsert_records(
                 include_insert_datetime=True,
             )
 
-            for data in data_list:
-                columns = list(data.keys())
-                for column in columns:
-                    _ensure_safe_identifier(column)
-
-                using_cols = ", ".join([f"? AS {col}" for col in columns])
-
-                on_clauses = [f"target.{key} = source.{key}" for key in key_columns]
-                on_clause = " AND ".join(on_clauses)
-                for key in key_columns:
-                    _ensure_safe_identifier(key)
-
-                update_cols = [
-                    col
-                    for col in columns
-                    if col not in key_columns and col != _INSERT_DATETIME_COLUMN
-                ]
-                update_set = (
-                    ", ".join([f"{col} = source.{col}" for col in update_cols])
-                    if update_cols
-                    else ""
-                )
-                update_section = ""
-                if update_set:
-                    update_section = f"""
-WHEN MATCHED THEN
-    UPDATE SET {update_set}
-"""
-
-                insert_columns = (
-                    [col for col in columns if col not in key_columns]
-                    if exclude_key_columns_from_insert
-                    else columns
-                )
-                if not insert_columns:
-                    raise ValueError("No columns available for insert operation")
-
-                merge_query = f"""
-MERGE INTO {table} AS target
-USING (SELECT {using_cols}) AS source
-ON {on_clause}
-{update_section}WHEN NOT MATCHED THEN
-    INSERT ({", ".join(insert_columns)})
-    VALUES ({", ".join(["source." + col for col in insert_columns])});
-"""
-                values = list(data.values())
-                cursor.execute(merge_query, values)
+            execute_merge_batches(
+                cursor,
+                table,
+                data_list,
+                key_columns,
+                exclude_key_columns_from_insert=exclude_key_columns_from_insert,
+            )
 
             conn.commit()
 
@@ -255,9 +1115,15 @@ ON {on_clause}
 def insert_records(
     table: str,
     records: list[dict[str, Any]],
+    *,
+    returning: Sequence[str] | None = None,
 ) -> dict[str, Any]:
     """
     Insert multiple records into a table. Useful when identity columns are generated by the DB.
+
+    With `returning` (e.g. ["PK_Number"]) the response also carries "inserted":
+    the generated values for every record, in input order, read back from the
+    insert statements themselves (see execute_insert_returning).
     """
     if not records:
         return {"message": "No data provided for insertion", "count": 0}
@@ -276,26 +1142,71 @@ def insert_records(
                 include_insert_datetime=True,
             )
 
-            for record in records:
-                if not record:
-                    continue
+            if returning:
+                inserted = execute_insert_returning(cursor, table, records, returning)
+            else:
+                execute_insert_batches(cursor, table, records)
+
+            conn.commit()
+    except Exception:
+        logger.error(f"Error inserting records into {table}", exc_info=True)
+        raise
+
+    response: dict[str, Any] = {"message": "Insertion successful", "count": len(records)}
+    if returning:
+        response["inserted"] = inserted
+    return response
+
+
+def insert_missing_records(
+    table: str,
+    records: list[dict[str, Any]],
+    key_columns: list[str],
+) -> dict[str, Any]:
+    """
+    Insert only the records whose key_columns are not in the table yet.
 
-                columns = list(record.keys())
-                for column in columns:
-                    _ensure_safe_identifier(column)
+    One locked existence query over the whole key set, then one insert batch,
+    in a single transaction: a concurrent writer can't slip the same keys in
+    between. Duplicate keys in `records` keep their first occurrence.
+    """
+    if not records:
+        return {"message": "No data provided for insertion", "count": 0}
+
+    _ensure_safe_identifier(table)
+    for record in records:
+        for key in key_columns:
+            if key not in record:
+                raise ValueError(f"{key} is required for insertion")
 
-                placeholders = ", ".join(["?"] * len(columns))
-                column_clause = ", ".join(columns)
-                query = f"INSERT INTO {table} ({column_clause}) VALUES ({placeholders})"
-                values = [record[col] for col in columns]
-                cursor.execute(query, values)
+    from db import db_connection as _db_connection
+
+    unique: dict[tuple[Any, ...], dict[str, Any]] = {}
+    for record in records:
+        unique.setdefault(tuple(record[key] for key in key_columns), record)
+
+    try:
+        with _db_connection() as conn:
+            cursor = conn.cursor()
+            existing = select_existing_keys(cursor, table, list(unique), key_columns, lock=True)
+            missing = [record for key, record in unique.items() if key not in existing]
+            if not missing:
+                return {"message": "No new records to insert", "count": 0}
+
+            missing = add_update_datetime_if_supported(
+                cursor,
+                table,
+                missing,
+                include_insert_datetime=True,
+            )
+            execute_insert_batches(cursor, table, missing)
 
             conn.commit()
     except Exception:
-        logger.error(f"Error inserting records into {table}", exc_info=True)
+        logger.error(f"Error inserting missing records into {table}", exc_info=True)
         raise
 
-    return {"message": "Insertion successful", "count": len(records)}
+    return {"message": "Insertion successful", "count": len(missing)}
 
 
 def delete_records(
@@ -322,22 +1233,7 @@ def delete_records(
         with _db_connection() as conn:
             cursor = conn.cursor()
 
-            for data in data_list:
-                # Validate keys exist
-                for key in key_columns:
-                    if key not in data:
-                        raise ValueError(f"{key} is required for deletion")
-
-                where_clause_parts = []
-                for key in key_columns:
-                    _ensure_safe_identifier(key)
-                    where_clause_parts.append(f"{key} = ?")
-
-                where_clause = " AND ".join(where_clause_parts)
-                delete_query = f"DELETE FROM {table} WHERE {where_clause}"
-
-                values = [data[key] for key in key_columns]
-                cursor.execute(delete_query, values)
+            execute_delete_batches(cursor, table, data_list, key_columns)
 
             conn.commit()
 
@@ -356,18 +1252,154 @@ def delete_records(
 async def fetch_records_async(
     table: str,
     filters: dict[str, Any] | None = None,
-    order_by: str | None = None,
+    order_by: str | Sequence[str] | None = None,
+    *,
+    columns: Sequence[str] | None = None,
+    conditions: Sequence[ColumnCondition] | None = None,
+    page_size: int | None = None,
+    after: list[Any] | None = None,
+    timeout: float | None = None,
 ) -> list[dict[str, Any]]:
     """
-    Threadpool wrapper around fetch_records to keep blocking DB calls off the event loop.
+    Run fetch_records on the DB executor to keep blocking DB calls off the event loop.
     """
-    return await run_in_threadpool(
-        partial(fetch_records, table=table, filters=filters, order_by=order_by)
+    return await run_db(
+        fetch_records,
+        table=table,
+        filters=filters,
+        order_by=order_by,
+        columns=columns,
+        conditions=conditions,
+        page_size=page_size,
+        after=after,
+        timeout=timeout,
     )
 
 
-async def run_raw_query_async(query: str, params: list[Any] | None = None) -> list[dict[str, Any]]:
-    return await run_in_threadpool(partial(run_raw_query, query=query, params=params or []))
+async def run_raw_query_async(
+    query: str,
+    params: list[Any] | None = None,
+    *,
+    timeout: float | None = None,
+) -> list[dict[str, Any]]:
+    return await run_db(run_raw_query, query=query, params=params or [], timeout=timeout)
+
+
+async def run_raw_query_sets_async(
+    statements: Sequence[tuple[str, list[Any]]],
+    *,
+    timeout: float | None = None,
+) -> list[list[dict[str, Any]]]:
+    return await run_db(run_raw_query_sets, statements, timeout=timeout)
+
+
+class StreamLimitError(RuntimeError):
+    """Raised when the maximum number of streams already hold pooled connections."""
+
+
+class _StreamSlots:
+    """Counts open streams; each holds a pooled connection until it finishes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.active = 0
+
+    @staticmethod
+    def limit() -> int:
+        return settings.DB_STREAM_LIMIT or max(1, settings.DB_POOL_SIZE // 2)
+
+    def acquire(self) -> None:
+        with self._lock:
+            limit = self.limit()
+            if self.active >= limit:
+                raise StreamLimitError(f"Too many concurrent streams (limit {limit})")
+            self.active += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+
+_stream_slots = _StreamSlots()
+
+
+async def stream_raw_query_async(
+    query: str,
+    params: list[Any] | None = None,
+    *,
+    batch_size: int = STREAM_BATCH_SIZE,
+    timeout: float | None = None,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Async counterpart of iter_raw_query_batches; each fetchmany runs on the DB executor.
+    `timeout` applies per batch.
+
+    A stream keeps its pooled connection while the client reads, so at most
+    settings.DB_STREAM_LIMIT streams (default half of DB_POOL_SIZE) run at once;
+    beyond that StreamLimitError is raised before a connection is borrowed.
+    """
+    _stream_slots.acquire()
+    batches = iter_raw_query_batches(query, params, batch_size=batch_size)
+    # A fetch that timed out or was cancelled keeps its worker until the driver
+    # returns; the lock makes close() wait for it rather than fail with "generator
+    # already executing" and leave the connection borrowed.
+    stepping = threading.Lock()
+
+    def fetch_batch() -> list[dict[str, Any]] | None:
+        with stepping:
+            return next(batches, None)
+
+    def close_batches() -> None:
+        with stepping:
+            batches.close()
+
+    try:
+        while True:
+            batch = await run_db(fetch_batch, timeout=timeout)
+            if batch is None:
+                break
+            yield batch
+    finally:
+        try:
+            await run_db(close_batches, timeout=0)
+        finally:
+            _stream_slots.release()
+
+
+async def run_keyset_page_async(
+    query: str,
+    keyset_columns: Sequence[str],
+    *,
+    page_size: Any,
+    cursor: str | None = None,
+    include_total: bool = False,
+    params: list[Any] | None = None,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """
+    Fetch one keyset page of a SELECT. Returns
+    {"items": [...], "next_cursor": str | None, "page_size": int[, "total": int]}.
+
+    Raises ValueError for an invalid page size or cursor.
+    """
+    size = validate_page_size(page_size)
+    keyset = list(keyset_columns)
+    after = decode_cursor(cursor, len(keyset)) if cursor else None
+    page_query, page_params = build_keyset_page_query(
+        query, keyset, page_size=size, after=after, params=params
+    )
+
+    rows = await run_raw_query_async(page_query, page_params, timeout=timeout)
+    items, next_cursor = build_page(rows, keyset, size)
+    page: dict[str, Any] = {"items": items, "next_cursor": next_cursor, "page_size": size}
+
+    if include_total:
+        totals = await run_raw_query_async(
+            build_count_query(query), list(params or []), timeout=timeout
+        )
+        page["total"] = totals[0]["total"] if totals else 0
+
+    return page
 
 
 async def merge_upsert_records_async(
@@ -376,34 +1408,163 @@ async def merge_upsert_records_async(
     key_columns: list[str],
     *,
     exclude_key_columns_from_insert: bool = False,
+    timeout: float | None = None,
 ) -> dict[str, Any]:
-    return await run_in_threadpool(
-        partial(
-            merge_upsert_records,
-            table=table,
-            data_list=data_list,
-            key_columns=key_columns,
-            exclude_key_columns_from_insert=exclude_key_columns_from_insert,
-        )
+    return await run_db(
+        merge_upsert_records,
+        table=table,
+        data_list=data_list,
+        key_columns=key_columns,
+        exclude_key_columns_from_insert=exclude_key_columns_from_insert,
+        timeout=timeout,
     )
 
 
 async def insert_records_async(
     table: str,
     records: list[dict[str, Any]],
+    *,
+    returning: Sequence[str] | None = None,
+    timeout: float | None = None,
 ) -> dict[str, Any]:
-    return await run_in_threadpool(partial(insert_records, table=table, records=records))
+    return await run_db(
+        insert_records, table=table, records=records, returning=returning, timeout=timeout
+    )
+
+
+async def insert_record_returning_async(
+    table: str,
+    record: dict[str, Any],
+    column: str,
+    *,
+    timeout: float | None = None,
+) -> Any | None:
+    """
+    Insert one record and return its generated `column` (e.g. the identity), read
+    back from the insert statement itself. None when nothing was inserted.
+    """
+    result = await insert_records_async(
+        table=table, records=[record], returning=[column], timeout=timeout
+    )
+    inserted = result.get("inserted") or [None]
+    return inserted[0][column] if inserted[0] else None
+
+
+async def insert_missing_records_async(
+    table: str,
+    records: list[dict[str, Any]],
+    key_columns: list[str],
+    *,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    return await run_db(
+        insert_missing_records,
+        table=table,
+        records=records,
+        key_columns=key_columns,
+        timeout=timeout,
+    )
 
 
 async def delete_records_async(
     table: str,
     data_list: list[dict[str, Any]],
     key_columns: list[str],
+    *,
+    timeout: float | None = None,
 ) -> dict[str, Any]:
-    return await run_in_threadpool(
-        partial(delete_records, table=table, data_list=data_list, key_columns=key_columns)
+    return await run_db(
+        delete_records,
+        table=table,
+        data_list=data_list,
+        key_columns=key_columns,
+        timeout=timeout,
     )
 
+
+def _group_updates(
+    updates: list[dict[str, Any]],
+) -> list[tuple[str, str, dict[Any, tuple[Any, Any]]]]:
+    """
+    Group updates by (fieldName, updateVia) into {key: (updateViaValue, fieldValue)}
+    maps, keyed by the collation key of updateViaValue.
+
+    Later values for the same key win, as they would when run one by one; values
+    differing only by case or trailing spaces match the same rows, so they share
+    a key. An update may only join an existing group if no later group writes the
+    same field or matches on it, and no group from that one on writes its
+    updateVia column (a group that writes its own match column takes no more
+    updates); otherwise a new group keeps the writes in payload order.
+    """
+    groups: list[tuple[str, str, dict[Any, tuple[Any, Any]]]] = []
+    open_groups: dict[tuple[str, str], int] = {}
+    last_group_for_field: dict[str, int] = {}
+    last_group_matching_on: dict[str, int] = {}
+
+    for update in updates:
+        field_name = update["fieldName"]
+        update_via = update["updateVia"]
+        _ensure_safe_identifier(field_name)
+        _ensure_safe_identifier(update_via)
+
+        index = open_groups.get((field_name, update_via))
+        if (
+            index is None
+            or last_group_for_field[field_name] != index
+            or last_group_for_field.get(update_via, -1) >= index
+            or last_group_matching_on.get(field_name, -1) >= index
+        ):
+            index = len(groups)
+            groups.append((field_name, update_via, {}))
+            open_groups[(field_name, update_via)] = index
+            last_group_for_field[field_name] = index
+            last_group_matching_on[update_via] = index
+
+        match_value = update["updateViaValue"]
+        groups[index][2][_collation_key(match_value)] = (match_value, update["fieldValue"])
+
+    return groups
+
+
+def execute_update_batches(
+    cursor: Any,
+    table: str,
+    updates: list[dict[str, Any]],
+    *,
+    quote: Callable[[str], str] = _quote_plain,
+) -> list[dict[str, Any]]:
+    """
+    Apply field updates with one set-based `UPDATE ... FROM` per (fieldName,
+    updateVia) group (chunked by SQL Server limits), joined to a VALUES list of
+    (match value, new value) rows.
+
+    Returns one {"fieldName", "updateVia", "count"} entry per group, where count
+    is the number of rows the group's statements affected.
+    """
+    quoted_table = quote(table)
+    results: list[dict[str, Any]] = []
+
+    for field_name, update_via, values in _group_updates(updates):
+        query_prefix = (
+            f"UPDATE target SET target.{quote(field_name)} = staged.field_value "
+            f"FROM {quoted_table} AS target JOIN (VALUES "
+        )
+        query_suffix = (
+            f") AS staged (match_value, field_value) "
+            f"ON target.{quote(update_via)} = staged.match_value"
+        )
+        count = 0
+        for chunk in _chunk_rows(list(values.values()), 2):
+            query = query_prefix + ", ".join(["(?, ?)"] * len(chunk)) + query_suffix
+            cursor.execute(query, [value for pair in chunk for value in pair])
+            if cursor.rowcount and cursor.rowcount > 0:
+                count += cursor.rowcount
+
+        results.append({"fieldName": field_name, "updateVia": update_via, "count": count})
+
+    return results
+
+
 def update_records(
     table: str,
     updates: list[dict[str, Any]],
@@ -418,6 +1579,10 @@ def update_records(
         "updateVia": "...",
         "updateViaValue": "..."
     }
+
+    Items sharing (fieldName, updateVia) run as one set-based statement (see
+    execute_update_batches); all groups commit together. The response carries
+    the total affected row count and a per-group breakdown under "groups".
     """
     if not updates:
         return {"message": "No data provided", "count": 0}
@@ -432,31 +1597,7 @@ def update_records(
         with _db_connection() as conn:
             cursor = conn.cursor()
 
-            total_count = 0
-
-            for update in updates:
-                field_name = update["fieldName"]
-                update_via = update["updateVia"]
-
-                _ensure_safe_identifier(field_name)
-                _ensure_safe_identifier(update_via)
-
-                query = f"""
-                    UPDATE {table}
-                    SET {field_name} = ?
-                    WHERE {update_via} = ?
-                """
-
-                cursor.execute(
-                    query,
-                    (
-                        update["fieldValue"],
-                        update["updateViaValue"],
-                    ),
-                )
-
-                if cursor.rowcount and cursor.rowcount > 0:
-                    total_count += cursor.rowcount
+            groups = execute_update_batches(cursor, table, updates)
 
             conn.commit()
 
@@ -472,14 +1613,15 @@ def update_records(
 
     return {
         "message": "Update successful",
-        "count": total_count,
+        "count": sum(group["count"] for group in groups),
+        "groups": groups,
     }
 
 
 async def update_records_async(
     table: str,
     updates: list[dict[str, Any]],
+    *,
+    timeout: float | None = None,
 ) -> dict[str, Any]:
-    return await run_in_threadpool(
-        partial(update_records, table=table, updates=updates)
-    )
+    return await run_db(update_records, table=table, updates=updates, timeout=timeout)
@@ -0,0 +1,52 @@
+# core/http_cache.py
+
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def cache_headers(etag: str, last_modified: datetime) -> dict[str, str]:
+    # no-cache lets browsers keep the body but forces a revalidation round trip.
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against a resource."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def conditional_json_response(
+    request: Request,
+    payload: Any,
+    *,
+    etag: str,
+    last_modified: datetime,
+) -> Response:
+    """Return a 304 when the client's validators still match, else the JSON payload."""
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jsonable_encoder(payload), headers=headers)
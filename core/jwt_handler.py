@@ -1,14 +1,42 @@
+import time
 from datetime import UTC, datetime, timedelta
+from typing import Any
 
 import jwt
 from fastapi import HTTPException
 
 from core.config import settings
+from core.ttl_cache import TTLCache
 
 SECRET_KEY = settings.SECRET_KEY
 ACCESS_TOKEN_VALIDITY = settings.ACCESS_TOKEN_VALIDITY
 REFRESH_TOKEN_VALIDITY = settings.REFRESH_TOKEN_VALIDITY
 
+# Already-verified tokens -> claims, keyed by (token type, token). Entries never
+# outlive the token's own `exp`, so expired tokens still fail verification.
+_decode_cache: TTLCache[tuple[str, str], dict[str, Any]] = TTLCache(
+    settings.JWT_DECODE_CACHE_SIZE, settings.JWT_DECODE_CACHE_TTL
+)
+
+
+def _cached_claims(kind: str, token: str) -> dict[str, Any] | None:
+    claims = _decode_cache.get((kind, token))
+    return dict(claims) if claims is not None else None
+
+
+def _remember_claims(kind: str, token: str, payload: dict[str, Any]) -> None:
+    exp = payload.get("exp")
+    lifetime = exp - time.time() if isinstance(exp, int | float) else None
+    _decode_cache.set((kind, token), dict(payload), ttl=lifetime)
+
+
+def decode_cache_stats() -> dict[str, Any]:
+    return _decode_cache.stats()
+
+
+def clear_decode_cache() -> None:
+    _decode_cache.clear()
+
 
 def create_access_token(user_id, role=None):
     expire = datetime.now(UTC) + timedelta(minutes=ACCESS_TOKEN_VALIDITY)
@@ -29,11 +57,16 @@ def create_refresh_token(user_id, role=None):
 
 
 def decode_access_token(token):
+    cached = _cached_claims("access", token)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
         token_type = payload.get("type")
         if token_type and token_type != "access":
             raise HTTPException(status_code=403, detail="Invalid token")
+        _remember_claims("access", token, payload)
         return payload
     except jwt.ExpiredSignatureError as exc:
         raise HTTPException(status_code=401, detail="Token expired") from exc
@@ -42,10 +75,15 @@ def decode_access_token(token):
 
 
 def decode_refresh_token(token):
+    cached = _cached_claims("refresh", token)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
         if payload.get("type") != "refresh":
             raise HTTPException(status_code=403, detail="Invalid refresh token")
+        _remember_claims("refresh", token, payload)
         return payload
     except jwt.ExpiredSignatureError as exc:
         raise HTTPException(status_code=401, detail="Refresh token expired") from exc
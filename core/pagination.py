@@ -0,0 +1,100 @@
+# core/pagination.py
+
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _encode_value(value: Any) -> list[Any]:
+    # Tag non-JSON types so keyset values round-trip as the same Python types
+    # (and bind as the same SQL parameter types) when the cursor comes back.
+    if value is None or isinstance(value, bool | int | float | str):
+        return ["v", value]
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, date):
+        return ["d", value.isoformat()]
+    if isinstance(value, time):
+        return ["t", value.isoformat()]
+    if isinstance(value, Decimal):
+        return ["n", str(value)]
+    return ["v", str(value)]
+
+
+def _decode_value(item: Any) -> Any:
+    if not isinstance(item, list) or len(item) != 2:
+        raise ValueError("Invalid page cursor")
+
+    tag, value = item
+    if tag == "v":
+        return value
+    if tag == "dt":
+        return datetime.fromisoformat(value)
+    if tag == "d":
+        return date.fromisoformat(value)
+    if tag == "t":
+        return time.fromisoformat(value)
+    if tag == "n":
+        return Decimal(value)
+    raise ValueError("Invalid page cursor")
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """Encode the keyset values of the last row on a page as an opaque token."""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, expected_length: int) -> list[Any]:
+    """Decode a token from encode_cursor; raises ValueError when it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        items = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values = [_decode_value(item) for item in items]
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid page cursor") from exc
+
+    if len(values) != expected_length:
+        raise ValueError("Invalid page cursor")
+    return values
+
+
+def validate_page_size(page_size: Any) -> int:
+    try:
+        size = int(page_size)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("page_size must be an integer") from exc
+
+    if size < 1 or size > MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+    return size
+
+
+def build_page(
+    rows: list[dict[str, Any]],
+    keyset_columns: list[str],
+    page_size: int,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """
+    Split a `page_size + 1` row fetch into the page items and the next cursor.
+
+    The cursor is computed from raw row values, so call this before any
+    presentation formatting (e.g. format_records_dates) mutates the rows.
+    """
+    items = rows[:page_size]
+    if len(rows) <= page_size or not items:
+        return items, None
+
+    last = items[-1]
+    return items, encode_cursor([last.get(column) for column in keyset_columns])
+
+
+def drop_columns(rows: list[dict[str, Any]], columns: tuple[str, ...]) -> list[dict[str, Any]]:
+    """Copy rows without `columns`, e.g. keyset tie-breakers that are not part of a response."""
+    return [{key: value for key, value in row.items() if key not in columns} for row in rows]
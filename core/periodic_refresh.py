@@ -0,0 +1,95 @@
+# core/periodic_refresh.py
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from core.config import settings
+from core.db_executor import run_db
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshableIndex:
+    """
+    Base for in-process copies of database tables that are reloaded in full.
+
+    Subclasses swap their data under `_lock`, then call `_mark_loaded()` (or
+    `_mark_unloaded()` on reset), and report their sizes from `_sizes()`. Until
+    the first successful load `loaded` is False and callers should read the
+    database instead.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.loaded_at: float | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def _mark_loaded(self) -> None:
+        self.loaded_at = time.monotonic()
+
+    def _mark_unloaded(self) -> None:
+        self.loaded_at = None
+
+    def _sizes(self) -> dict[str, int]:
+        return {}
+
+    def stats(self) -> dict[str, Any]:
+        loaded_at = self.loaded_at
+        return {
+            "loaded": loaded_at is not None,
+            **self._sizes(),
+            "age_seconds": (
+                round(time.monotonic() - loaded_at, 3) if loaded_at is not None else None
+            ),
+        }
+
+
+class PeriodicRefresh:
+    """
+    Loads an index at startup and reloads it every `interval_setting` seconds.
+
+    `load` is a blocking function that reloads the index and returns the number
+    of rows read; it runs on the DB executor. A failed reload is logged and the
+    index keeps serving its last good copy until the next cycle.
+    """
+
+    def __init__(self, name: str, load: Callable[[], int], interval_setting: str) -> None:
+        self.name = name
+        self._load = load
+        self.interval_setting = interval_setting
+
+    async def refresh(self) -> int:
+        return await run_db(self._load)
+
+    async def run(self, interval: float) -> None:
+        """Reload every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"{self.name} refresh failed - {str(e)}")
+
+    async def start(self) -> asyncio.Task | None:
+        """
+        Load the index and start the background refresher. Returns the refresher
+        task (cancel it on shutdown), or None when the interval setting is 0.
+        """
+        interval = getattr(settings, self.interval_setting)
+        if interval <= 0:
+            return None
+
+        try:
+            rows = await self.refresh()
+            logger.info(f"{self.name} loaded with {rows} rows")
+        except Exception as e:
+            logger.warning(f"{self.name} load failed - {str(e)}")
+
+        return asyncio.create_task(self.run(interval))
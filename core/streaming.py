@@ -0,0 +1,95 @@
+# core/streaming.py
+
+import json
+import logging
+from collections.abc import AsyncIterator, Callable
+from typing import Any, Literal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+StreamFormat = Literal["json", "ndjson"]
+Batch = list[dict[str, Any]]
+BatchTransform = Callable[[Batch], Batch]
+
+_MEDIA_TYPES: dict[str, str] = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _dumps(record: dict[str, Any]) -> str:
+    return json.dumps(jsonable_encoder(record), separators=(",", ":"))
+
+
+async def _encode_json_array(
+    first_batch: Batch,
+    batches: AsyncIterator[Batch],
+    transform: BatchTransform | None,
+) -> AsyncIterator[bytes]:
+    yield b"["
+    separator = ""
+    async for batch in _chain(first_batch, batches, transform):
+        if not batch:
+            continue
+        chunk = separator + ",".join(_dumps(record) for record in batch)
+        separator = ","
+        yield chunk.encode()
+    yield b"]"
+
+
+async def _encode_ndjson(
+    first_batch: Batch,
+    batches: AsyncIterator[Batch],
+    transform: BatchTransform | None,
+) -> AsyncIterator[bytes]:
+    async for batch in _chain(first_batch, batches, transform):
+        if batch:
+            yield "".join(_dumps(record) + "\n" for record in batch).encode()
+
+
+async def _chain(
+    first_batch: Batch,
+    batches: AsyncIterator[Batch],
+    transform: BatchTransform | None,
+) -> AsyncIterator[Batch]:
+    try:
+        yield transform(first_batch) if transform else first_batch
+        async for batch in batches:
+            yield transform(batch) if transform else batch
+    except Exception:
+        # Headers are already sent; the truncated body is the only signal left.
+        logger.error("Streaming response aborted mid-stream", exc_info=True)
+        raise
+    finally:
+        await batches.aclose()
+
+
+async def stream_records_response(
+    batches: AsyncIterator[Batch],
+    fmt: StreamFormat = "json",
+    *,
+    transform: BatchTransform | None = None,
+) -> StreamingResponse:
+    """
+    Wrap record batches in a chunked JSON-array or NDJSON StreamingResponse.
+
+    `transform` is applied to each batch before encoding (e.g. date formatting).
+    The first batch is pulled before the response starts, so query errors still
+    surface to the caller as exceptions (and HTTP error statuses).
+    """
+    if fmt not in _MEDIA_TYPES:
+        raise ValueError(f"Unsupported stream format: {fmt}")
+
+    try:
+        first_batch = await anext(batches)
+    except StopAsyncIteration:
+        first_batch = []
+    except BaseException:
+        await batches.aclose()
+        raise
+
+    encoder = _encode_json_array if fmt == "json" else _encode_ndjson
+    return StreamingResponse(encoder(first_batch, batches, transform), media_type=_MEDIA_TYPES[fmt])
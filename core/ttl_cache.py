@@ -0,0 +1,142 @@
+# core/ttl_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Thread-safe LRU cache whose entries also expire `ttl` seconds after being set.
+
+    A non-positive `maxsize` or `ttl` disables the cache: lookups always miss and
+    writes are dropped, so callers need no separate "cache enabled" branch.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING or not self.enabled:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V, *, ttl: float | None = None) -> None:
+        """Store `value`; `ttl` may shorten (never extend) the default lifetime."""
+        if not self.enabled:
+            return
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + lifetime)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict_where(self, predicate: Callable[[K], bool]) -> int:
+        with self._lock:
+            doomed = [key for key in self._entries if predicate(key)]
+            for key in doomed:
+                del self._entries[key]
+        return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class InvalidationLog(Generic[K]):
+    """
+    Tells a cache loader whether its key was invalidated while the load ran, so a
+    value read before a write is not cached after it.
+
+    Call `start()` before loading and `unchanged(key, token)` before caching.
+    Only the latest `maxsize` invalidated keys are remembered; a load that began
+    before a forgotten invalidation counts as stale, so memory stays bounded
+    without ever caching an outdated value.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = max(1, maxsize)
+        self._lock = threading.Lock()
+        self._tick = 0
+        self._invalidated: OrderedDict[K, int] = OrderedDict()
+        self._forgotten_at = 0
+        self._cleared_at = 0
+
+    def start(self) -> int:
+        with self._lock:
+            return self._tick
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._tick += 1
+            self._invalidated[key] = self._tick
+            self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.maxsize:
+                _key, self._forgotten_at = self._invalidated.popitem(last=False)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._tick += 1
+            self._cleared_at = self._tick
+            self._invalidated.clear()
+
+    def unchanged(self, key: K, token: int) -> bool:
+        with self._lock:
+            latest = max(self._cleared_at, self._forgotten_at, self._invalidated.get(key, 0))
+            return latest <= token
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._invalidated)
@@ -1,18 +1,28 @@
 # db.py
 
+import logging
 import struct
-import warnings
-from contextlib import contextmanager
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
+from typing import Any
 
 import pyodbc
 
 from core.config import settings
-
-warnings.filterwarnings(
-    "ignore", category=UserWarning, message="pandas only supports SQLAlchemy connectable"
+from core.db_executor import (
+    current_call,
+    reset_connection_owner,
+    run_db,
+    set_connection_owner,
 )
 
+logger = logging.getLogger(__name__)
+
 
 # Build SQL connection string
 def _build_connection_string() -> str:
@@ -68,17 +78,388 @@ def get_raw_connection() -> pyodbc.Connection:
     return conn
 
 
+class PoolTimeoutError(TimeoutError):
+    """Raised when no pooled connection becomes available within the borrow timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of pyodbc connections.
+
+    - At most `max_size` connections exist at once (idle + borrowed).
+    - Idle connections older than `recycle_seconds` are closed instead of reused.
+    - With `pre_ping`, a borrowed connection is checked with `SELECT 1` and
+      transparently replaced when the check fails.
+    - Borrowers wait up to `timeout` seconds when the pool is exhausted.
+    """
+
+    def __init__(
+        self,
+        creator: Callable[[], pyodbc.Connection],
+        *,
+        max_size: int,
+        timeout: float,
+        recycle_seconds: float,
+        pre_ping: bool = True,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("Connection pool max_size must be at least 1")
+
+        self._creator = creator
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle_seconds = recycle_seconds
+        self.pre_ping = pre_ping
+
+        self._condition = threading.Condition()
+        self._idle: deque[tuple[pyodbc.Connection, float]] = deque()
+        self._created_at: dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.recycle_seconds > 0 and time.monotonic() - created_at > self.recycle_seconds
+
+    @staticmethod
+    def _close_quietly(conn: pyodbc.Connection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            logger.debug("Ignoring error while closing pooled connection", exc_info=True)
+
+    @staticmethod
+    def _ping(conn: pyodbc.Connection) -> bool:
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn: pyodbc.Connection) -> None:
+        self._close_quietly(conn)
+        with self._condition:
+            self._created_at.pop(id(conn), None)
+            self._size -= 1
+            self._condition.notify()
+
+    def _create(self) -> pyodbc.Connection:
+        try:
+            conn = self._creator()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def acquire(self) -> pyodbc.Connection:
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"(pool size {self.max_size})"
+                        )
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                else:
+                    self._size += 1
+                    conn = None
+
+            if conn is None:
+                return self._create()
+
+            if self._is_expired(created_at) or (self.pre_ping and not self._ping(conn)):
+                self._discard(conn)
+                continue
+
+            return conn
+
+    def release(self, conn: pyodbc.Connection, *, discard: bool = False) -> None:
+        if not discard:
+            try:
+                # Never hand the next borrower a connection with an open transaction.
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._condition:
+            created_at = self._created_at.get(id(conn))
+            if created_at is None:
+                # Not ours (e.g. pool was disposed while the connection was borrowed).
+                self._close_quietly(conn)
+                return
+            if not discard and not self._closed and not self._is_expired(created_at):
+                self._idle.append((conn, created_at))
+                self._condition.notify()
+                return
+
+        self._discard(conn)
+
+    def dispose(self) -> None:
+        """Close idle connections and stop handing out new ones."""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            for conn, _created_at in idle:
+                self._created_at.pop(id(conn), None)
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for conn, _created_at in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> dict[str, Any]:
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+            }
+
+
+class _CallTrackingConnection:
+    """Connection proxy that registers cursors with the running DB executor call."""
+
+    __slots__ = ("_conn", "_call")
+
+    def __init__(self, conn: pyodbc.Connection, call: Any) -> None:
+        self._conn = conn
+        self._call = call
+
+    def cursor(self) -> pyodbc.Cursor:
+        return self._call.register_cursor(self._conn.cursor())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class UnitOfWorkRollbackError(RuntimeError):
+    """Raised when a unit of work marked rollback-only is asked to commit."""
+
+
+class _UnitOfWorkConnection:
+    """
+    Connection proxy handed to helpers inside a unit of work. Their own commits are
+    deferred to the unit of work, which owns the transaction; a rollback marks the
+    unit rollback-only, so work that failed halfway can never be committed later.
+    """
+
+    __slots__ = ("_unit", "_conn", "_call")
+
+    def __init__(self, unit: "UnitOfWork", conn: pyodbc.Connection, call: Any) -> None:
+        self._unit = unit
+        self._conn = conn
+        self._call = call
+
+    def cursor(self) -> pyodbc.Cursor:
+        cursor = self._conn.cursor()
+        return self._call.register_cursor(cursor) if self._call is not None else cursor
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        self._unit.rollback_only = True
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class UnitOfWork:
+    """
+    One pooled connection and transaction shared by the DB calls made inside
+    `async with unit_of_work()`. The connection is borrowed on first use.
+    """
+
+    def __init__(self, pool: ConnectionPool) -> None:
+        self._pool = pool
+        # Reentrant: a helper may open db_connection() again on the same thread.
+        self._lock = threading.RLock()
+        self._conn: pyodbc.Connection | None = None
+        self._closed = False
+        # Set when a helper rolls back; the transaction can then only roll back.
+        self.rollback_only = False
+
+    @property
+    def borrowed(self) -> bool:
+        return self._conn is not None
+
+    @contextmanager
+    def borrow(self) -> Iterator[_UnitOfWorkConnection]:
+        # Calls are serialized: a pyodbc connection must not run two statements at once.
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Unit of work is already closed")
+            if self._conn is None:
+                self._conn = self._pool.acquire()
+            yield _UnitOfWorkConnection(self, self._conn, current_call())
+
+    def _end_transaction(self, *, commit: bool) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            if commit and not self.rollback_only:
+                self._conn.commit()
+                return
+            self._conn.rollback()
+            if commit:
+                self.rollback_only = False
+                raise UnitOfWorkRollbackError(
+                    "Unit of work was rolled back because a call inside it failed"
+                )
+            self.rollback_only = False
+
+    def _close(self) -> None:
+        with self._lock:
+            self._closed = True
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    async def commit(self) -> None:
+        """
+        Commit the work so far; later calls run in a new transaction. When the unit
+        is rollback-only the work is rolled back and UnitOfWorkRollbackError raised.
+        """
+        if self.borrowed:
+            await run_db(self._end_transaction, commit=True)
+
+    async def rollback(self) -> None:
+        """Roll back the work so far; later calls run in a new transaction."""
+        if self.borrowed:
+            await run_db(self._end_transaction, commit=False)
+
+
+_active_unit: ContextVar[UnitOfWork | None] = ContextVar("db_unit_of_work", default=None)
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    # Resolve at call time so get_raw_connection can be swapped in tests.
+                    lambda: get_raw_connection(),
+                    max_size=settings.DB_POOL_SIZE,
+                    timeout=settings.DB_POOL_TIMEOUT,
+                    recycle_seconds=settings.DB_POOL_RECYCLE,
+                    pre_ping=settings.DB_POOL_PRE_PING,
+                )
+    return _pool
+
+
+def dispose_pool() -> None:
+    """Close all idle pooled connections. A new pool is created on next use."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.dispose()
+
+
 # Context Manager
 @contextmanager
 def db_connection():
     """
+    Borrow a pooled connection for the duration of the block.
+
     Usage:
         with db_connection() as conn:
             cursor = conn.cursor()
             ...
+
+    Uncommitted work is rolled back when the connection is returned to the pool.
+    Inside a unit of work the unit's connection is yielded instead.
     """
-    conn = get_raw_connection()
+    unit = _active_unit.get()
+    if unit is not None:
+        with unit.borrow() as conn:
+            yield conn
+        return
+
+    pool = get_pool()
+    conn = pool.acquire()
+    call = current_call()
+    try:
+        yield _CallTrackingConnection(conn, call) if call is not None else conn
+    finally:
+        pool.release(conn)
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[UnitOfWork]:
+    """
+    Run several DB helper calls on one pooled connection and one transaction.
+
+    Usage:
+        async with unit_of_work():
+            existing = await fetch_records_async(...)
+            await insert_records_async(...)
+
+    Helper calls made in the block (through run_db, which carries the context
+    into the DB executor) share the connection, and their own commits are
+    deferred. The work commits when the block exits cleanly and rolls back when
+    it raises. `commit()` / `rollback()` end the transaction early; later calls
+    start a new one. A nested unit_of_work joins the outer one.
+
+    A helper that fails inside the block rolls back and marks the unit
+    rollback-only. Catching its exception does not save the work: the block then
+    rolls back on exit and raises UnitOfWorkRollbackError.
+
+    Once the unit holds a connection its calls run on the DB executor's owner
+    workers, so they are never starved by calls waiting for a pooled connection.
+    """
+    current = _active_unit.get()
+    if current is not None:
+        yield current
+        return
+
+    unit = UnitOfWork(get_pool())
+    token = _active_unit.set(unit)
+    owner_token = set_connection_owner(unit)
     try:
-        yield conn
+        yield unit
+        await unit.commit()
+    except BaseException:
+        try:
+            await unit.rollback()
+        except Exception:
+            logger.error("Rollback failed in unit_of_work", exc_info=True)
+        raise
     finally:
-        conn.close()
+        _active_unit.reset(token)
+        try:
+            if unit.borrowed:
+                try:
+                    await run_db(unit._close)
+                except BaseException:
+                    # Never leak the pooled connection, even when cancelled mid-release.
+                    unit._close()
+                    raise
+        finally:
+            reset_connection_owner(owner_token)
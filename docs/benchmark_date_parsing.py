@@ -0,0 +1,69 @@
+"""
+Compare the sniffing date parser against the original strptime cascade.
+
+Run from the repository root:
+
+    python docs/benchmark_date_parsing.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import date_utils  # noqa: E402
+
+SAMPLES = [
+    "2024-01-02",
+    "2024/01/02",
+    "01/02/2024",
+    "13/01/2024",
+    "1-2-2024",
+    "2024-01-02T08:30:00Z",
+    "2024-01-02 08:30:00.123",
+    "01/02/2024 08:30 AM",
+    "not-a-date",
+]
+DISTINCT_VALUES = [f"{month:02d}/{day:02d}/2024" for month in range(1, 13) for day in range(1, 29)]
+NUMBER = 20_000
+
+
+def _cascade(text: str):
+    return date_utils._parse_datetime_cascade(text.rstrip("Z"))
+
+
+def _sniff_uncached(text: str):
+    return date_utils._try_parse_datetime.__wrapped__(text)
+
+
+def _time(func, values) -> float:
+    return min(
+        timeit.repeat(
+            lambda: [func(value) for value in values], number=NUMBER // len(values), repeat=5
+        )
+    )
+
+
+def main() -> None:
+    for value in SAMPLES + DISTINCT_VALUES:
+        assert _cascade(value) == _sniff_uncached(value), value
+
+    date_utils._try_parse_datetime.cache_clear()
+    rows = [
+        ("mixed shapes", SAMPLES),
+        ("distinct m/d/Y values", DISTINCT_VALUES),
+    ]
+    for label, values in rows:
+        cascade = _time(_cascade, values)
+        sniff = _time(_sniff_uncached, values)
+        memo = _time(date_utils._try_parse_datetime, values)
+        print(
+            f"{label:<24} cascade {cascade * 1000:8.1f} ms | "
+            f"sniff {sniff * 1000:7.1f} ms ({cascade / sniff:4.1f}x) | "
+            f"memoized {memo * 1000:6.1f} ms ({cascade / memo:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,15 @@ from fastapi import HTTPException
 
 from core.date_utils import format_records_dates, normalize_payload_dates
 from core.db_helpers import (
+    NOT_RETIRED_STAGE,
     _ensure_safe_identifier,
     fetch_records_async,
-    insert_records_async,
+    insert_record_returning_async,
     merge_upsert_records_async,
+    render_conditions,
     run_raw_query_async,
 )
+from db import unit_of_work
 from services.validations.affinity_validations import (
     apply_affinity_policy_type_defaults,
     validate_affinity_policy_type_payload,
@@ -20,29 +23,7 @@ logger = logging.getLogger(__name__)
 
 TABLE_NAME = "tblAffinityPolicyType"
 AGENTS_TABLE = "tblAffinityAgents"
-NOT_RETIRED_CONDITION = (
-    f"({TABLE_NAME}.Stage IS NULL OR LOWER(LTRIM(RTRIM({TABLE_NAME}.Stage))) <> 'Retired')"
-)
-
-
-async def _lookup_pk_number(record: dict[str, Any]) -> int | None:
-    """
-    Fetch the latest PK_Number for a policy type identified by its natural key fields.
-    Used after inserts to return the new identity value.
-    """
-    try:
-        query = """
-            SELECT TOP 1 PK_Number
-            FROM tblAffinityPolicyType
-            WHERE ProgramName = ? AND PolicyType = ?
-            ORDER BY PK_Number DESC
-        """
-        params = [record.get("ProgramName"), record.get("PolicyType")]
-        rows = await run_raw_query_async(query, params)
-        return rows[0]["PK_Number"] if rows else None
-    except Exception as exc:
-        logger.warning("Failed to fetch PK_Number for new affinity policy type row: %s", exc)
-        return None
+DEFAULT_CONDITIONS = [NOT_RETIRED_STAGE]
 
 
 async def get_affinity_policy_types(query_params: dict[str, Any]):
@@ -53,8 +34,8 @@ async def get_affinity_policy_types(query_params: dict[str, Any]):
     """
 
     try:
-        filters: list[str] = []
-        params: list[Any] = []
+        # Qualified, since the ProgramName query joins a table with its own columns.
+        filters, params = render_conditions(DEFAULT_CONDITIONS, qualifier=TABLE_NAME)
         for key, value in query_params.items():
             _ensure_safe_identifier(key)
             filters.append(f"{TABLE_NAME}.{key} = ?")
@@ -86,8 +67,7 @@ async def get_affinity_policy_types(query_params: dict[str, Any]):
                  AND primary_agents.rn = 1
             """
             params.insert(0, "yes")
-            conditions = [NOT_RETIRED_CONDITION, *filters]
-            query += " WHERE " + " AND ".join(conditions)
+            query += " WHERE " + " AND ".join(filters)
         else:
             primary_agt = query_params.get("PrimaryAgt")
             if primary_agt not in (None, ""):
@@ -102,13 +82,10 @@ async def get_affinity_policy_types(query_params: dict[str, Any]):
                     )
                 """
                 params.insert(0, primary_agt)
-                query += f" AND {NOT_RETIRED_CONDITION}"
-                if filters:
-                    query += " AND " + " AND ".join(filters)
+                query += " AND " + " AND ".join(filters)
             else:
                 query = f"SELECT {TABLE_NAME}.* FROM {TABLE_NAME}"
-                conditions = [NOT_RETIRED_CONDITION, *filters]
-                query += " WHERE " + " AND ".join(conditions)
+                query += " WHERE " + " AND ".join(filters)
 
         records = await run_raw_query_async(query, params)
         return format_records_dates(records)
@@ -133,55 +110,58 @@ async def upsert_affinity_policy_types(data: dict[str, Any]):
         pk_value = normalized.get("PK_Number")
         pk_response: int | None = None
         if pk_value not in (None, ""):
-            existing = await fetch_records_async(
-                table=TABLE_NAME,
-                filters={"PK_Number": pk_value},
-            )
-            if not existing:
-                raise HTTPException(
-                    status_code=404,
-                    detail={"error": f"Primary key {pk_value} not found"},
-                )
-            existing_row = existing[0]
-            existing_policy_type = existing_row.get("PolicyType")
-            incoming_policy_type = normalized.get("PolicyType")
-
-            if existing_policy_type is not None:
-                existing_policy_type = str(existing_policy_type).strip().lower()
-                if existing_policy_type == "":
-                    existing_policy_type = None
-            if incoming_policy_type is not None:
-                incoming_policy_type = str(incoming_policy_type).strip().lower()
-                if incoming_policy_type == "":
-                    incoming_policy_type = None
-
-            if (
-                incoming_policy_type is not None
-                and existing_policy_type is not None
-                and incoming_policy_type != existing_policy_type
-            ):
-                # PolicyType changed: insert a new row by cloning current DB row
-                # and overlaying incoming edits from the payload.
-                cloned_record = {k: v for k, v in existing_row.items() if k != "PK_Number"}
-                for key, value in normalized.items():
-                    if key != "PK_Number":
-                        cloned_record[key] = value
-
-                await insert_records_async(table=TABLE_NAME, records=[cloned_record])
-                pk_response = await _lookup_pk_number(cloned_record)
-            else:
-                await merge_upsert_records_async(
+            async with unit_of_work():
+                existing = await fetch_records_async(
                     table=TABLE_NAME,
-                    data_list=[normalized],
-                    key_columns=["PK_Number"],
-                    exclude_key_columns_from_insert=True,
+                    filters={"PK_Number": pk_value},
                 )
-                pk_response = pk_value
+                if not existing:
+                    raise HTTPException(
+                        status_code=404,
+                        detail={"error": f"Primary key {pk_value} not found"},
+                    )
+                existing_row = existing[0]
+                existing_policy_type = existing_row.get("PolicyType")
+                incoming_policy_type = normalized.get("PolicyType")
+
+                if existing_policy_type is not None:
+                    existing_policy_type = str(existing_policy_type).strip().lower()
+                    if existing_policy_type == "":
+                        existing_policy_type = None
+                if incoming_policy_type is not None:
+                    incoming_policy_type = str(incoming_policy_type).strip().lower()
+                    if incoming_policy_type == "":
+                        incoming_policy_type = None
+
+                if (
+                    incoming_policy_type is not None
+                    and existing_policy_type is not None
+                    and incoming_policy_type != existing_policy_type
+                ):
+                    # PolicyType changed: insert a new row by cloning current DB row
+                    # and overlaying incoming edits from the payload.
+                    cloned_record = {k: v for k, v in existing_row.items() if k != "PK_Number"}
+                    for key, value in normalized.items():
+                        if key != "PK_Number":
+                            cloned_record[key] = value
+
+                    pk_response = await insert_record_returning_async(
+                        TABLE_NAME, cloned_record, "PK_Number"
+                    )
+                else:
+                    await merge_upsert_records_async(
+                        table=TABLE_NAME,
+                        data_list=[normalized],
+                        key_columns=["PK_Number"],
+                        exclude_key_columns_from_insert=True,
+                    )
+                    pk_response = pk_value
         else:
             sanitized = {k: v for k, v in normalized.items() if k != "PK_Number"}
             if sanitized:
-                await insert_records_async(table=TABLE_NAME, records=[sanitized])
-                pk_response = await _lookup_pk_number(sanitized)
+                pk_response = await insert_record_returning_async(
+                    TABLE_NAME, sanitized, "PK_Number"
+                )
 
         return {"message": "Transaction successful", "count": 1, "pk": pk_response}
     except HTTPException:
@@ -6,9 +6,10 @@ from fastapi import HTTPException
 
 from core.date_utils import format_records_dates, normalize_payload_dates
 from core.db_helpers import (
+    NOT_RETIRED_STAGE,
     fetch_records_async,
     merge_upsert_records_async,
-    run_raw_query_async,
+    resolve_projection,
     sanitize_filters,
 )
 from services.validations.affinity_validations import validate_affinity_program_payload
@@ -18,54 +19,31 @@ logger = logging.getLogger(__name__)
 TABLE_NAME = "tblAcctAffinityProgram"
 PRIMARY_KEY = "AcctAffinityProgramKey"
 KEY_COLUMNS = ["ProgramName"]
+DEFAULT_CONDITIONS = [NOT_RETIRED_STAGE]
 
 
-def _exclude_retired_stage(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    return [
-        record for record in records if str(record.get("Stage", "")).strip().lower() != "retired"
-    ]
-
-
-async def get_affinity_program(query_params: dict[str, Any]):
+async def get_affinity_program(query_params: dict[str, Any], fields: str | None = None):
     """
     Fetch account(s) from tblAcctAffinityProgram.
     If query_params is provided, filters by given key/value.
+    `fields` limits the returned columns (comma-separated).
     Returns a list of dicts (records).
     """
 
     try:
         filters = sanitize_filters(query_params)
+        columns = await resolve_projection(TABLE_NAME, fields)
         branch_filter = filters.pop("BranchVal", None)
-
-        if not branch_filter:
-            records = await fetch_records_async(table=TABLE_NAME, filters=filters)
-            records = _exclude_retired_stage(records)
-            return format_records_dates(records)
-
-        branch_terms = [term for term in re.split(r"[ ,&]+", str(branch_filter)) if term.strip()]
-
-        if not branch_terms:
-            records = await fetch_records_async(table=TABLE_NAME, filters=filters)
-            records = _exclude_retired_stage(records)
-            return format_records_dates(records)
-
-        clauses: list[str] = []
-        params: list[Any] = []
-
-        for key, value in filters.items():
-            clauses.append(f"{key} = ?")
-            params.append(value)
-
-        branch_clauses = ["BranchVal LIKE ?" for _ in branch_terms]
-        clauses.append(f"({' OR '.join(branch_clauses)})")
-        params.extend(f"{term}%" for term in branch_terms)
-
-        query = f"SELECT * FROM {TABLE_NAME}"
-        if clauses:
-            query += " WHERE " + " AND ".join(clauses)
-
-        records = await run_raw_query_async(query, list(params))
-        records = _exclude_retired_stage(records)
+        if branch_filter:
+            branch_terms = [
+                term for term in re.split(r"[ ,&]+", str(branch_filter)) if term.strip()
+            ]
+            if branch_terms:
+                filters["BranchVal__prefix"] = branch_terms
+
+        records = await fetch_records_async(
+            table=TABLE_NAME, filters=filters, columns=columns, conditions=DEFAULT_CONDITIONS
+        )
         return format_records_dates(records)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail={"error": str(exc)}) from exc
@@ -3,7 +3,14 @@ import logging
 from fastapi import HTTPException
 
 from core.date_utils import format_records_dates
-from core.db_helpers import run_raw_query_async
+from core.db_helpers import (
+    StreamLimitError,
+    run_keyset_page_async,
+    run_raw_query_async,
+    stream_raw_query_async,
+)
+from core.pagination import drop_columns
+from core.streaming import BatchTransform, StreamFormat, stream_records_response
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +20,8 @@ SEARCH_QUERIES = {
         SELECT
             tblAcctAffinityProgram.ProgramName AS [Program Name],
             tblAcctAffinityProgram.OnBoardDt AS [On Board Date],
-            tblAcctAffinityProgram.AcctStatus AS [Account Status]
+            tblAcctAffinityProgram.AcctStatus AS [Account Status],
+            tblAcctAffinityProgram.AcctAffinityProgramKey AS [Program Key]
         FROM tblAcctAffinityProgram
         WHERE tblAcctAffinityProgram.Stage = 'Admin' AND tblAcctAffinityProgram.IsSubmitted = 1
         ORDER BY tblAcctAffinityProgram.ProgramName;
@@ -22,9 +30,11 @@ SEARCH_QUERIES = {
         SELECT
             tblAffinityAgents.AgentCode AS [Agent Code],
             tblAcctAffinityProgram.ProgramName AS [Program Name],
-            tblAffinityAgents.AgentName AS [Agent Name],     
+            tblAffinityAgents.AgentName AS [Agent Name],
             tblAcctAffinityProgram.OnBoardDt AS [On Board Date],
-            tblAcctAffinityProgram.AcctStatus AS [Account Status]
+            tblAcctAffinityProgram.AcctStatus AS [Account Status],
+            tblAcctAffinityProgram.AcctAffinityProgramKey AS [Program Key],
+            tblAffinityAgents.PK_Number AS [Agent Key]
         FROM tblAcctAffinityProgram LEFT JOIN tblAffinityAgents
         ON tblAcctAffinityProgram.ProgramName=tblAffinityAgents.ProgramName
         WHERE tblAffinityAgents.AgentCode IS NOT NULL
@@ -34,6 +44,36 @@ SEARCH_QUERIES = {
     """,
 }
 
+# Keyset columns per search: the query's ORDER BY column first, then the remaining
+# output columns as tie-breakers, ending with the primary keys of the joined rows.
+# These queries have no GROUP BY, so only the keys make a row's keyset unique.
+SEARCH_KEYSETS = {
+    "ProgramName": ["Program Name", "On Board Date", "Account Status", "Program Key"],
+    "ProducerCode": [
+        "Program Name",
+        "Agent Code",
+        "Agent Name",
+        "On Board Date",
+        "Account Status",
+        "Program Key",
+        "Agent Key",
+    ],
+}
+
+# Tie-breakers selected only so keysets are unique; responses keep their original columns.
+KEYSET_ONLY_COLUMNS = {
+    "ProgramName": ("Program Key",),
+    "ProducerCode": ("Program Key", "Agent Key"),
+}
+
+
+def _response_transform(search_by: str) -> BatchTransform:
+    """Format dates and drop keyset-only columns from rows before they are returned."""
+    hidden = KEYSET_ONLY_COLUMNS.get(search_by)
+    if not hidden:
+        return format_records_dates
+    return lambda records: drop_columns(format_records_dates(records), hidden)
+
 
 async def search_affinity_program_records(search_by: str):
     """
@@ -46,7 +86,58 @@ async def search_affinity_program_records(search_by: str):
     try:
         query = SEARCH_QUERIES[search_by]
         records = await run_raw_query_async(query)
-        return format_records_dates(records)
+        return _response_transform(search_by)(records)
+    except Exception as e:
+        logger.warning(f"Error running search for {search_by} - {str(e)}")
+        raise HTTPException(status_code=500, detail={"error": str(e)}) from e
+
+
+async def stream_affinity_program_records(search_by: str, fmt: StreamFormat = "json"):
+    """
+    Streaming variant of search_affinity_program_records: rows are fetched in batches,
+    date-formatted per batch and written as a chunked JSON array or NDJSON.
+    """
+    if search_by not in SEARCH_QUERIES:
+        raise HTTPException(status_code=400, detail={"error": "Invalid search type"})
+
+    try:
+        return await stream_records_response(
+            stream_raw_query_async(SEARCH_QUERIES[search_by]),
+            fmt,
+            transform=_response_transform(search_by),
+        )
+    except StreamLimitError as e:
+        raise HTTPException(status_code=503, detail={"error": str(e)}) from e
+    except Exception as e:
+        logger.warning(f"Error running search for {search_by} - {str(e)}")
+        raise HTTPException(status_code=500, detail={"error": str(e)}) from e
+
+
+async def search_affinity_program_page(
+    search_by: str,
+    page_size: int,
+    cursor: str | None = None,
+    include_total: bool = False,
+):
+    """
+    Keyset-paginated variant of search_affinity_program_records.
+    Returns {"items", "next_cursor", "page_size"} and "total" when requested.
+    """
+    if search_by not in SEARCH_QUERIES:
+        raise HTTPException(status_code=400, detail={"error": "Invalid search type"})
+
+    try:
+        page = await run_keyset_page_async(
+            SEARCH_QUERIES[search_by],
+            SEARCH_KEYSETS[search_by],
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
+        )
+        page["items"] = _response_transform(search_by)(page["items"])
+        return page
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail={"error": str(exc)}) from exc
     except Exception as e:
         logger.warning(f"Error running search for {search_by} - {str(e)}")
         raise HTTPException(status_code=500, detail={"error": str(e)}) from e
@@ -0,0 +1,196 @@
+from collections import deque
+from collections.abc import Iterable
+from typing import Any
+
+from core.db_executor import run_db
+from core.db_helpers import run_raw_query
+from core.periodic_refresh import PeriodicRefresh, RefreshableIndex
+
+Pair = tuple[str, str]
+
+SAC_ASSOCIATIONS_TABLE = "tblSACAccountAssociations"
+HCM_ASSOCIATIONS_TABLE = "tblHcmAccountAssociations"
+
+
+def _account(value: Any) -> str:
+    return str(value).strip() if value is not None else ""
+
+
+def _pairs_from_rows(rows: Iterable[dict[str, Any]]) -> list[Pair]:
+    pairs: list[Pair] = []
+    for row in rows:
+        parent = _account(row.get("ParentAccount"))
+        child = _account(row.get("AssociatedAccount"))
+        if parent and child and parent != child:
+            pairs.append((parent, child))
+    return pairs
+
+
+class AssociationGraph(RefreshableIndex):
+    """
+    In-process adjacency copy of an account associations table.
+
+    Rows are directed (ParentAccount -> AssociatedAccount) but traversal follows
+    them both ways, so a one-sided row still links two accounts. Until the first
+    successful load `loaded` is False and callers should read the table instead.
+    Writes made while a reload is in flight are replayed over the fresh rows.
+    """
+
+    def __init__(self, table: str) -> None:
+        super().__init__()
+        self.table = table
+        self._rows: set[Pair] = set()
+        self._adjacency: dict[str, set[str]] = {}
+        self._pending: list[tuple[bool, list[Pair]]] | None = None
+
+    def _link(self, parent: str, child: str) -> None:
+        self._rows.add((parent, child))
+        self._adjacency.setdefault(parent, set()).add(child)
+        self._adjacency.setdefault(child, set()).add(parent)
+
+    def _unlink(self, parent: str, child: str) -> None:
+        self._rows.discard((parent, child))
+        if (child, parent) in self._rows:
+            return
+        for account, other in ((parent, child), (child, parent)):
+            neighbors = self._adjacency.get(account)
+            if neighbors is not None:
+                neighbors.discard(other)
+                if not neighbors:
+                    del self._adjacency[account]
+
+    def _apply(self, added: bool, pairs: list[Pair]) -> None:
+        for parent, child in pairs:
+            if added:
+                self._link(parent, child)
+            else:
+                self._unlink(parent, child)
+
+    def begin_reload(self) -> None:
+        """Start journaling writes; call before reading the table."""
+        with self._lock:
+            self._pending = []
+
+    def replace(self, rows: list[dict[str, Any]]) -> None:
+        pairs = _pairs_from_rows(rows)
+        with self._lock:
+            pending, self._pending = self._pending or [], None
+            self._rows = set()
+            self._adjacency = {}
+            self._apply(True, pairs)
+            for added, journaled in pending:
+                self._apply(added, journaled)
+            self._mark_loaded()
+
+    def abort_reload(self) -> None:
+        with self._lock:
+            self._pending = None
+
+    def _record(self, added: bool, pairs: Iterable[Pair]) -> None:
+        normalized = _pairs_from_rows(
+            {"ParentAccount": parent, "AssociatedAccount": child} for parent, child in pairs
+        )
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((added, normalized))
+            if self.loaded:
+                self._apply(added, normalized)
+
+    def add_pairs(self, pairs: Iterable[Pair]) -> None:
+        """Mirror committed inserts; a no-op (beyond journaling) before the first load."""
+        self._record(True, pairs)
+
+    def remove_pairs(self, pairs: Iterable[Pair]) -> None:
+        """Mirror committed deletes; a no-op (beyond journaling) before the first load."""
+        self._record(False, pairs)
+
+    def neighborhood(self, account: str, max_hops: int | None = None) -> dict[str, int]:
+        """
+        Accounts reachable from `account` mapped to their hop distance, excluding
+        `account` itself. `max_hops=None` returns the whole connected component.
+        """
+        start = _account(account)
+        distances = {start: 0}
+        frontier = deque([start])
+        with self._lock:
+            while frontier:
+                current = frontier.popleft()
+                hops = distances[current]
+                if max_hops is not None and hops >= max_hops:
+                    continue
+                for neighbor in self._adjacency.get(current, ()):
+                    if neighbor not in distances:
+                        distances[neighbor] = hops + 1
+                        frontier.append(neighbor)
+        del distances[start]
+        return distances
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rows = set()
+            self._adjacency = {}
+            self._pending = None
+            self._mark_unloaded()
+
+    def _sizes(self) -> dict[str, int]:
+        return {"accounts": len(self._adjacency), "rows": len(self._rows)}
+
+
+sac_association_graph = AssociationGraph(SAC_ASSOCIATIONS_TABLE)
+hcm_association_graph = AssociationGraph(HCM_ASSOCIATIONS_TABLE)
+association_graphs = (sac_association_graph, hcm_association_graph)
+
+
+def _read_association_rows(table: str) -> list[dict[str, Any]]:
+    return run_raw_query(f"SELECT ParentAccount, AssociatedAccount FROM {table}", [])
+
+
+def refresh_association_graph(graph: AssociationGraph) -> int:
+    """Reload the graph from its table; returns the number of rows read."""
+    graph.begin_reload()
+    try:
+        rows = _read_association_rows(graph.table)
+    except BaseException:
+        graph.abort_reload()
+        raise
+    graph.replace(rows)
+    return len(rows)
+
+
+def refresh_association_graphs() -> int:
+    return sum(refresh_association_graph(graph) for graph in association_graphs)
+
+
+# The periodic reload also picks up writes made by other worker processes.
+association_graph_refresh = PeriodicRefresh(
+    "Association graphs", refresh_association_graphs, "ASSOCIATION_GRAPH_REFRESH_SECONDS"
+)
+start_association_graphs = association_graph_refresh.start
+
+
+def parse_max_hops(value: Any) -> int | None:
+    """Parse the `hops` query parameter; empty means the whole connected component."""
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        hops = int(value)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("hops must be a positive integer") from exc
+    if hops < 1:
+        raise ValueError("hops must be a positive integer")
+    return hops
+
+
+async def account_neighborhood(
+    graph: AssociationGraph, account: str, max_hops: int | None = None
+) -> dict[str, int]:
+    """
+    Answer from the in-memory graph, or from a one-off copy of the table when the
+    graph is not loaded (disabled, or the startup load failed).
+    """
+    if graph.loaded:
+        return graph.neighborhood(account, max_hops)
+
+    snapshot = AssociationGraph(graph.table)
+    snapshot.replace(await run_db(_read_association_rows, graph.table))
+    return snapshot.neighborhood(account, max_hops)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from datetime import UTC, datetime, timedelta
 from typing import Any
@@ -5,6 +6,7 @@ from typing import Any
 from fastapi import HTTPException, Request, Response
 
 from core.config import settings
+from core.db_executor import run_db
 from core.db_helpers import run_raw_query
 from core.jwt_handler import (
     ACCESS_TOKEN_VALIDITY,
@@ -14,6 +16,11 @@ from core.jwt_handler import (
     decode_access_token,
     decode_refresh_token,
 )
+from core.ttl_cache import InvalidationLog, TTLCache
+from services.branch_mapping_service import (
+    branch_mapping_index,
+    refresh_branch_mapping_index_async,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +48,16 @@ REFRESH_COOKIE_OPTIONS = {
     "path": "/auth/refresh",
 }
 
+PrincipalKey = tuple[str, str | None]
+
+# Resolved user payloads keyed by (token subject, token role).
+_principal_cache: TTLCache[PrincipalKey, dict[str, Any]] = TTLCache(
+    settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL
+)
+_principal_loads: dict[PrincipalKey, asyncio.Future] = {}
+# Evictions that landed while a principal was loading keep it out of the cache.
+_principal_invalidations: InvalidationLog[str] = InvalidationLog(settings.PRINCIPAL_CACHE_SIZE)
+
 
 def _set_session_cookie(response: Response, token: str) -> None:
     response.set_cookie(
@@ -212,6 +229,9 @@ def get_branch_name_by_email(email: str) -> str | None:
     if not normalized_email:
         return None
 
+    if branch_mapping_index.loaded:
+        return branch_mapping_index.branch_for_email(normalized_email)
+
     query = """
         SELECT TOP 1 BranchName
         FROM tblBranchMapping
@@ -235,6 +255,9 @@ def get_branch_name_by_user_identifier(user_identifier: str) -> str | None:
     if not normalized_user_identifier:
         return None
 
+    if branch_mapping_index.loaded:
+        return branch_mapping_index.branch_for_user_id(normalized_user_identifier)
+
     query = """
         SELECT TOP 1 BranchName
         FROM tblBranchMapping
@@ -257,6 +280,78 @@ def get_branch_name_by_user_identifier(user_identifier: str) -> str | None:
     return results[0].get("BranchName")
 
 
+# -------------------------
+# PRINCIPAL RESOLUTION
+# -------------------------
+
+
+def _load_principal(user_id: str, role: str | None) -> dict[str, Any]:
+    user_record = None
+    if user_id.isdigit():
+        user_record = get_user_by_id(int(user_id))
+
+    if user_record:
+        return _build_db_user_payload(user_record)
+    return _build_f5_user_payload(user_id, role)
+
+
+async def _load_and_cache_principal(key: PrincipalKey) -> dict[str, Any]:
+    token = _principal_invalidations.start()
+    user = await run_db(_load_principal, *key)
+    # Skip caching if the subject was evicted (e.g. role change) or the whole
+    # cache was cleared (e.g. branch mapping refresh) while loading.
+    if _principal_invalidations.unchanged(key[0], token):
+        _principal_cache.set(key, user)
+    return user
+
+
+async def resolve_principal(user_id: str | int, token_role: str | None) -> dict[str, Any]:
+    """
+    Resolve the user payload for a token subject off the event loop.
+
+    Results are cached briefly (PRINCIPAL_CACHE_TTL), and concurrent requests for
+    the same subject share one lookup instead of each hitting the database.
+    """
+    key = (str(user_id), _normalize_role(token_role))
+    cached = _principal_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    pending = _principal_loads.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(_load_and_cache_principal(key))
+        _principal_loads[key] = pending
+        pending.add_done_callback(lambda _done: _principal_loads.pop(key, None))
+
+    # Shield so one cancelled request does not cancel the lookup others await.
+    return dict(await asyncio.shield(pending))
+
+
+def evict_principal(user_id: str | int) -> None:
+    """Drop cached principals for a subject; call after its role or profile changes."""
+    subject = str(user_id)
+    _principal_invalidations.invalidate(subject)
+    _principal_cache.evict_where(lambda key: key[0] == subject)
+
+
+def clear_principal_cache() -> None:
+    _principal_invalidations.invalidate_all()
+    _principal_cache.clear()
+
+
+async def refresh_branch_mappings() -> dict[str, Any]:
+    """Reload the tblBranchMapping index now instead of waiting for the next cycle."""
+    try:
+        rows = await refresh_branch_mapping_index_async()
+    except Exception as e:
+        logger.warning(f"Branch mapping refresh failed - {str(e)}")
+        raise HTTPException(status_code=500, detail={"error": str(e)}) from e
+
+    # Cached principals carry a resolved branch; drop them so changes apply at once.
+    clear_principal_cache()
+    return {"message": "Branch mappings refreshed", "count": rows}
+
+
 # -------------------------
 # AUTH SERVICE FUNCTIONS
 # -------------------------
@@ -286,6 +381,7 @@ async def login_user(login_data: dict[str, Any], response: Response):
         raise HTTPException(status_code=401, detail={"error": "Wrong password"})
 
     user = _build_db_user_payload(user_record)
+    evict_principal(user["id"])
     result = _create_login_response(response, token_subject=user["id"], user=user)
 
     logger.info(f"User {email} logged in successfully")
@@ -327,6 +423,8 @@ async def f5_login_user(login_data: dict[str, Any], response: Response):
         )
 
     user = _build_f5_user_payload(user_identifier, role)
+    # Group membership is re-read on every F5 login, so the role may have changed.
+    evict_principal(user_identifier)
     result = _create_login_response(
         response,
         token_subject=user_identifier,
@@ -355,15 +453,7 @@ async def get_current_user_from_token(request: Request):
             user_id = payload["user"].get("id")
         if not user_id:
             raise HTTPException(status_code=401, detail={"error": "Invalid token"})
-        user_record = None
-        if str(user_id).isdigit():
-            user_record = get_user_by_id(int(str(user_id)))
-
-        if user_record:
-            user = _build_db_user_payload(user_record)
-        else:
-            role = _normalize_role(payload.get("role"))
-            user = _build_f5_user_payload(str(user_id), role)
+        user = await resolve_principal(user_id, payload.get("role"))
     except Exception as e:
         logger.error(f"Token decode failed: {e}")
         raise HTTPException(status_code=401, detail={"error": "Invalid token"}) from e
@@ -371,10 +461,33 @@ async def get_current_user_from_token(request: Request):
     return {"message": "User authenticated", "user": user, "token": token}
 
 
-async def logout_user(response: Response):
+async def require_admin(request: Request):
     """
-    Deletes auth cookies.
+    Dependency for admin-only routes: authenticates like get_current_user_from_token
+    and rejects users whose role list does not include Admin.
     """
+    current_user = await get_current_user_from_token(request)
+    role = str(current_user["user"].get("role") or "")
+    roles = {item.strip().casefold() for item in role.split(",")}
+    if "admin" not in roles:
+        raise HTTPException(status_code=403, detail={"error": "Admin role required"})
+    return current_user
+
+
+async def logout_user(response: Response, request: Request | None = None):
+    """
+    Deletes auth cookies and evicts the cached principal for the session.
+    """
+    token = request.cookies.get(SESSION_COOKIE_NAME) if request is not None else None
+    if token:
+        try:
+            user_id = decode_access_token(token).get("sub")
+        except Exception:
+            # Expired or invalid sessions age out of the cache on their own.
+            user_id = None
+        if user_id:
+            evict_principal(user_id)
+
     _clear_auth_cookies(response)
     logger.info("User logged out successfully")
     return {"message": "Logged out successfully"}
@@ -417,6 +530,8 @@ async def refresh_user_token(request: Request, response: Response, token: str |
 
     # Fixed refresh token strategy: only issue a new access token.
     new_token = create_access_token(user_id, role)
+    # The new token may carry a different role; re-resolve on the next request.
+    evict_principal(user_id)
 
     _set_session_cookie(response, new_token)
 
@@ -0,0 +1,77 @@
+from typing import Any
+
+from core.db_helpers import run_raw_query
+from core.periodic_refresh import PeriodicRefresh, RefreshableIndex
+
+DEFAULT_BRANCH = "All"
+
+_BRANCH_MAPPING_QUERY = """
+    SELECT Email, UserID, BranchName
+    FROM tblBranchMapping
+"""
+
+
+def _fold(value: Any) -> str:
+    return str(value or "").strip().casefold()
+
+
+class BranchMappingIndex(RefreshableIndex):
+    """
+    In-process copy of tblBranchMapping keyed by case-folded Email and UserID.
+
+    Lookups are plain dict reads. Until the first successful load `loaded` is
+    False and callers should fall back to querying the table directly.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._by_email: dict[str, str | None] = {}
+        self._by_user_id: dict[str, str | None] = {}
+
+    def replace(self, rows: list[dict[str, Any]]) -> None:
+        by_email: dict[str, str | None] = {}
+        by_user_id: dict[str, str | None] = {}
+        for row in rows:
+            branch = row.get("BranchName")
+            # First row wins, like the TOP 1 lookups this replaces.
+            if email := _fold(row.get("Email")):
+                by_email.setdefault(email, branch)
+            if user_id := _fold(row.get("UserID")):
+                by_user_id.setdefault(user_id, branch)
+
+        with self._lock:
+            self._by_email = by_email
+            self._by_user_id = by_user_id
+            self._mark_loaded()
+
+    def branch_for_email(self, email: str) -> str | None:
+        return self._by_email.get(_fold(email), DEFAULT_BRANCH)
+
+    def branch_for_user_id(self, user_id: str) -> str | None:
+        return self._by_user_id.get(_fold(user_id), DEFAULT_BRANCH)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._by_email = {}
+            self._by_user_id = {}
+            self._mark_unloaded()
+
+    def _sizes(self) -> dict[str, int]:
+        return {"emails": len(self._by_email), "user_ids": len(self._by_user_id)}
+
+
+branch_mapping_index = BranchMappingIndex()
+
+
+def refresh_branch_mapping_index() -> int:
+    """Reload the index from tblBranchMapping; returns the number of rows read."""
+    rows = run_raw_query(_BRANCH_MAPPING_QUERY, [])
+    branch_mapping_index.replace(rows)
+    return len(rows)
+
+
+branch_mapping_refresh = PeriodicRefresh(
+    "Branch mapping index", refresh_branch_mapping_index, "BRANCH_MAPPING_REFRESH_SECONDS"
+)
+refresh_branch_mapping_index_async = branch_mapping_refresh.refresh
+start_branch_mapping_index = branch_mapping_refresh.start
@@ -1,13 +1,28 @@
+import hashlib
+import json
 import logging
+import math
 import re
-from functools import partial
+from dataclasses import dataclass
+from datetime import UTC, datetime
 from typing import Any
 
 from fastapi import HTTPException
-from fastapi.concurrency import run_in_threadpool
-
-from core.db_helpers import add_update_datetime_if_supported, run_raw_query_async
+from fastapi.encoders import jsonable_encoder
+
+from core.config import settings
+from core.db_executor import run_db
+from core.db_helpers import (
+    add_update_datetime_if_supported,
+    execute_delete_batches,
+    execute_insert_batches,
+    execute_merge_batches,
+    run_raw_query_async,
+    run_raw_query_sets_async,
+)
+from core.ttl_cache import TTLCache
 from db import db_connection
+from services.name_email_index_service import refresh_name_email_index_after_write
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +96,19 @@ SELECT tblLossCtrl.PK_Number, tblLossCtrl.RepName, tblLossCtrl.LCEmail
 """,
 }
 
+_DYNAMIC_DROPDOWN_QUERY = """
+        SELECT DD_Key, DD_Value, DD_SortOrder
+        FROM tblDropDowns
+        WHERE DD_Type = ?
+        ORDER BY COALESCE(DD_SortOrder, 0), DD_Value
+    """
+
+_ALL_DROPDOWNS_QUERY = """
+        SELECT DD_Key, DD_Type, DD_Value, DD_SortOrder
+        FROM tblDropDowns
+        ORDER BY DD_Type, COALESCE(DD_SortOrder, 0), DD_Value
+    """
+
 _DROPDOWN_DEFINITIONS: dict[str, dict[str, Any]] = {
     "SAC_Contact1": {
         "table": "tblMGTUsers",
@@ -147,6 +175,67 @@ _DROPDOWN_DEFINITIONS: dict[str, dict[str, Any]] = {
 _IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_ ]*$")
 _IDENTITY_PRIMARY_KEYS = {"DD_Key", "PK_Number", "ID"}
 _UNSUPPORTED_DROPDOWN_NAMES = {"users"}
+_DYNAMIC_DROPDOWN_TABLE = "tblDropDowns"
+_ALL_DROPDOWNS_KEY = "all"
+MAX_BUNDLE_SIZE = 50
+
+
+@dataclass(frozen=True)
+class DropdownEntry:
+    """A cached dropdown result with its HTTP validators."""
+
+    rows: list[dict[str, Any]]
+    etag: str
+    last_modified: datetime
+
+
+Validators = tuple[str, datetime]
+
+
+class _DropdownCache:
+    """
+    Bounded in-process dropdown cache keyed by dropdown name.
+
+    Writes invalidate every entry read from the written table. Each table has a
+    generation counter, so a load that overlaps a write is not cached stale.
+    The validators of expired entries are kept in their own LRU, so a reload
+    with unchanged rows keeps its Last-Modified.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._entries: TTLCache[str, DropdownEntry] = TTLCache(maxsize, ttl)
+        self._validators: TTLCache[str, Validators] = TTLCache(maxsize, math.inf)
+        self._generations: dict[str, int] = {}
+
+    def get(self, key: str) -> DropdownEntry | None:
+        return self._entries.get(key)
+
+    def previous(self, key: str) -> Validators | None:
+        return self._validators.get(key)
+
+    def generation(self, table: str) -> int:
+        return self._generations.get(table, 0)
+
+    def put(self, key: str, table: str, entry: DropdownEntry, generation: int) -> None:
+        if self.generation(table) == generation:
+            self._entries.set(key, entry)
+            self._validators.set(key, (entry.etag, entry.last_modified))
+
+    def invalidate_table(self, table: str) -> None:
+        self._generations[table] = self.generation(table) + 1
+        for cache in (self._entries, self._validators):
+            cache.evict_where(lambda key: _dropdown_table(key) == table)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._validators.clear()
+        self._generations.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return self._entries.stats()
+
+
+_dropdown_cache = _DropdownCache(settings.DROPDOWN_CACHE_SIZE, settings.DROPDOWN_CACHE_TTL)
 
 
 def _ensure_safe_identifier(identifier: str) -> None:
@@ -282,64 +371,14 @@ def _merge_upsert_dropdown_records(
                 include_insert_datetime=True,
             )
 
-            for data in data_list:
-                columns = list(data.keys())
-                for column in columns:
-                    _ensure_safe_identifier(column)
-
-                using_cols = ", ".join([f"? AS {_quote_identifier(col)}" for col in columns])
-                on_clause = " AND ".join(
-                    [
-                        f"target.{_quote_identifier(key)} = source.{_quote_identifier(key)}"
-                        for key in key_columns
-                    ]
-                )
-
-                update_cols = [
-                    col
-                    for col in columns
-                    if col not in key_columns and col != "InsertDateTime"
-                ]
-                update_set = (
-                    ", ".join(
-                        [
-                            f"{_quote_identifier(col)} = source.{_quote_identifier(col)}"
-                            for col in update_cols
-                        ]
-                    )
-                    if update_cols
-                    else ""
-                )
-                update_section = ""
-                if update_set:
-                    update_section = f"""
-WHEN MATCHED THEN
-    UPDATE SET {update_set}
-"""
-
-                insert_columns = (
-                    [col for col in columns if col not in key_columns]
-                    if exclude_key_columns_from_insert
-                    else columns
-                )
-                if not insert_columns:
-                    raise ValueError("No columns available for insert operation")
-
-                insert_columns_sql = ", ".join([_quote_identifier(col) for col in insert_columns])
-                insert_values_sql = ", ".join(
-                    [f"source.{_quote_identifier(col)}" for col in insert_columns]
-                )
-
-                merge_query = f"""
-MERGE INTO {_quote_identifier(table)} AS target
-USING (SELECT {using_cols}) AS source
-ON {on_clause}
-{update_section}WHEN NOT MATCHED THEN
-    INSERT ({insert_columns_sql})
-    VALUES ({insert_values_sql});
-"""
-                values = [data[col] for col in columns]
-                cursor.execute(merge_query, values)
+            execute_merge_batches(
+                cursor,
+                table,
+                data_list,
+                key_columns,
+                exclude_key_columns_from_insert=exclude_key_columns_from_insert,
+                quote=_quote_identifier,
+            )
 
             conn.commit()
     except Exception as exc:
@@ -379,19 +418,7 @@ def _insert_dropdown_records(
                 include_insert_datetime=True,
             )
 
-            for record in records:
-                if not record:
-                    continue
-
-                columns = list(record.keys())
-                for column in columns:
-                    _ensure_safe_identifier(column)
-
-                placeholders = ", ".join(["?"] * len(columns))
-                column_clause = ", ".join([_quote_identifier(col) for col in columns])
-                query = f"INSERT INTO {_quote_identifier(table)} ({column_clause}) VALUES ({placeholders})"
-                values = [record[col] for col in columns]
-                cursor.execute(query, values)
+            execute_insert_batches(cursor, table, records, quote=_quote_identifier)
 
             conn.commit()
     except Exception as exc:
@@ -425,12 +452,9 @@ def _delete_dropdown_records(
         with db_connection() as conn:
             cursor = conn.cursor()
 
-            for data in data_list:
-                if key_column not in data:
-                    raise ValueError(f"{key_column} is required for deletion")
-
-                delete_query = f"DELETE FROM {_quote_identifier(table)} WHERE {_quote_identifier(key_column)} = ?"
-                cursor.execute(delete_query, [data[key_column]])
+            execute_delete_batches(
+                cursor, table, data_list, [key_column], quote=_quote_identifier
+            )
 
             conn.commit()
     except Exception as exc:
@@ -455,14 +479,12 @@ async def _merge_upsert_dropdown_records_async(
     *,
     exclude_key_columns_from_insert: bool = False,
 ) -> dict[str, Any]:
-    return await run_in_threadpool(
-        partial(
-            _merge_upsert_dropdown_records,
-            table=table,
-            data_list=data_list,
-            key_columns=key_columns,
-            exclude_key_columns_from_insert=exclude_key_columns_from_insert,
-        )
+    return await run_db(
+        _merge_upsert_dropdown_records,
+        table=table,
+        data_list=data_list,
+        key_columns=key_columns,
+        exclude_key_columns_from_insert=exclude_key_columns_from_insert,
     )
 
 
@@ -470,7 +492,7 @@ async def _insert_dropdown_records_async(
     table: str,
     records: list[dict[str, Any]],
 ) -> dict[str, Any]:
-    return await run_in_threadpool(partial(_insert_dropdown_records, table=table, records=records))
+    return await run_db(_insert_dropdown_records, table=table, records=records)
 
 
 async def _delete_dropdown_records_async(
@@ -478,23 +500,31 @@ async def _delete_dropdown_records_async(
     data_list: list[dict[str, Any]],
     key_column: str,
 ) -> dict[str, Any]:
-    return await run_in_threadpool(
-        partial(_delete_dropdown_records, table=table, data_list=data_list, key_column=key_column)
+    return await run_db(
+        _delete_dropdown_records, table=table, data_list=data_list, key_column=key_column
     )
 
 
-async def get_dropdown_values(name: str) -> list[dict[str, Any]]:
-    normalized_name = name.strip()
+def _dropdown_table(name: str) -> str:
+    definition = _DROPDOWN_DEFINITIONS.get(name)
+    return definition["table"] if definition else _DYNAMIC_DROPDOWN_TABLE
 
-    if not normalized_name:
-        raise HTTPException(status_code=400, detail={"error": "Dropdown type is required"})
 
-    if normalized_name.lower() == "all":
-        return await get_all_dropdowns()
+def _build_entry(rows: list[dict[str, Any]], previous: Validators | None) -> DropdownEntry:
+    payload = json.dumps(jsonable_encoder(rows), sort_keys=True, separators=(",", ":"))
+    etag = f'"{hashlib.sha256(payload.encode()).hexdigest()[:32]}"'
+    if previous is not None and previous[0] == etag:
+        last_modified = previous[1]
+    else:
+        last_modified = datetime.now(UTC).replace(microsecond=0)
+    return DropdownEntry(rows=rows, etag=etag, last_modified=last_modified)
 
-    _ensure_supported_dropdown_name(normalized_name)
 
-    query_def = _DROPDOWN_QUERIES.get(normalized_name)
+async def _load_dropdown(name: str) -> list[dict[str, Any]]:
+    if name == _ALL_DROPDOWNS_KEY:
+        return await get_all_dropdowns()
+
+    query_def = _DROPDOWN_QUERIES.get(name)
 
     if query_def:
         query, params = _normalize_query_definition(query_def)
@@ -504,7 +534,138 @@ async def get_dropdown_values(name: str) -> list[dict[str, Any]]:
             logger.warning(f"Error fetching dropdown '{name}': {exc}")
             raise HTTPException(status_code=500, detail={"error": str(exc)}) from exc
 
-    return await _fetch_dynamic_dropdown(normalized_name)
+    return await _fetch_dynamic_dropdown(name)
+
+
+async def get_dropdown_entry(name: str) -> DropdownEntry:
+    """Return the (cached) rows for a dropdown along with their ETag/Last-Modified."""
+    normalized_name = _normalize_dropdown_name(name)
+
+    entry = _dropdown_cache.get(normalized_name)
+    if entry is not None:
+        return entry
+
+    table = _dropdown_table(normalized_name)
+    generation = _dropdown_cache.generation(table)
+    rows = await _load_dropdown(normalized_name)
+    entry = _build_entry(rows, _dropdown_cache.previous(normalized_name))
+    _dropdown_cache.put(normalized_name, table, entry, generation)
+    return entry
+
+
+def invalidate_dropdown_cache(name: str | None = None) -> None:
+    """Drop cached dropdowns read from `name`'s table, or everything when name is None."""
+    if name is None:
+        _dropdown_cache.clear()
+    else:
+        _dropdown_cache.invalidate_table(_dropdown_table(name.strip()))
+
+
+async def get_dropdown_values(name: str) -> list[dict[str, Any]]:
+    entry = await get_dropdown_entry(name)
+    # Copy so callers cannot mutate the cached rows.
+    return [dict(row) for row in entry.rows]
+
+
+def _normalize_dropdown_name(name: str) -> str:
+    normalized_name = name.strip()
+    if not normalized_name:
+        raise HTTPException(status_code=400, detail={"error": "Dropdown type is required"})
+    if normalized_name.lower() == _ALL_DROPDOWNS_KEY:
+        return _ALL_DROPDOWNS_KEY
+    _ensure_supported_dropdown_name(normalized_name)
+    return normalized_name
+
+
+def _bundle_statements(names: list[str]) -> list[tuple[str, list[Any]]]:
+    """One statement per static/"all" dropdown plus one IN query for every dynamic type."""
+    statements: list[tuple[str, list[Any]]] = []
+    dynamic = [
+        name for name in names if name != _ALL_DROPDOWNS_KEY and name not in _DROPDOWN_QUERIES
+    ]
+    for name in names:
+        if name == _ALL_DROPDOWNS_KEY:
+            statements.append((_ALL_DROPDOWNS_QUERY, []))
+        elif name in _DROPDOWN_QUERIES:
+            statements.append(_normalize_query_definition(_DROPDOWN_QUERIES[name]))
+    if dynamic:
+        placeholders = ", ".join(["?"] * len(dynamic))
+        statements.append(
+            (
+                f"""
+        SELECT DD_Type, DD_Key, DD_Value, DD_SortOrder
+        FROM tblDropDowns
+        WHERE DD_Type IN ({placeholders})
+        ORDER BY DD_Type, COALESCE(DD_SortOrder, 0), DD_Value
+    """,
+                dynamic,
+            )
+        )
+    return statements
+
+
+async def get_dropdown_bundle(names: list[str]) -> dict[str, DropdownEntry]:
+    """
+    Return several dropdowns keyed by name. Cached ones are served from memory;
+    the rest are fetched together as one multi-result-set batch.
+    """
+    ordered = list(dict.fromkeys(_normalize_dropdown_name(name) for name in names if name.strip()))
+    if not ordered:
+        raise HTTPException(
+            status_code=400, detail={"error": "At least one dropdown type is required"}
+        )
+    if len(ordered) > MAX_BUNDLE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": f"At most {MAX_BUNDLE_SIZE} dropdown types can be requested"},
+        )
+
+    entries = {name: _dropdown_cache.get(name) for name in ordered}
+    misses = [name for name, entry in entries.items() if entry is None]
+    if not misses:
+        return entries
+
+    generations = {name: _dropdown_cache.generation(_dropdown_table(name)) for name in misses}
+    try:
+        result_sets = await run_raw_query_sets_async(_bundle_statements(misses))
+    except Exception as exc:
+        logger.warning(f"Error fetching dropdown bundle: {exc}")
+        raise HTTPException(status_code=500, detail={"error": str(exc)}) from exc
+
+    loaded = iter(result_sets)
+    rows_by_name: dict[str, list[dict[str, Any]]] = {}
+    for name in misses:
+        if name == _ALL_DROPDOWNS_KEY or name in _DROPDOWN_QUERIES:
+            rows_by_name[name] = next(loaded)
+
+    dynamic_rows = next(loaded, [])
+    # DD_Type comparisons are case-insensitive in SQL Server; group the same way.
+    # Spellings differing only by case (names=Foo,foo) each get the same rows.
+    dynamic_names: dict[str, list[str]] = {}
+    for name in misses:
+        if name not in rows_by_name:
+            dynamic_names.setdefault(name.casefold(), []).append(name)
+    for spellings in dynamic_names.values():
+        for name in spellings:
+            rows_by_name[name] = []
+    for row in dynamic_rows:
+        spellings = dynamic_names.get(str(row.pop("DD_Type", "")).casefold(), [])
+        for name in spellings:
+            rows_by_name[name].append(dict(row))
+
+    for name in misses:
+        entry = _build_entry(rows_by_name[name], _dropdown_cache.previous(name))
+        _dropdown_cache.put(name, _dropdown_table(name), entry, generations[name])
+        entries[name] = entry
+    return entries
+
+
+def bundle_validators(entries: dict[str, DropdownEntry]) -> tuple[str, datetime]:
+    """Combine member validators into an ETag/Last-Modified pair for the bundle."""
+    digest = hashlib.sha256(
+        "|".join(f"{name}={entry.etag}" for name, entry in entries.items()).encode()
+    ).hexdigest()[:32]
+    return f'"{digest}"', max(entry.last_modified for entry in entries.values())
 
 
 def _normalize_query_definition(query_def: DropdownQuery) -> tuple[str, list[Any]]:
@@ -516,27 +677,16 @@ def _normalize_query_definition(query_def: DropdownQuery) -> tuple[str, list[Any
 
 
 async def _fetch_dynamic_dropdown(dd_type: str) -> list[dict[str, Any]]:
-    query = """
-        SELECT DD_Key, DD_Value, DD_SortOrder
-        FROM tblDropDowns
-        WHERE DD_Type = ?
-        ORDER BY COALESCE(DD_SortOrder, 0), DD_Value
-    """
     try:
-        return await run_raw_query_async(query, [dd_type])
+        return await run_raw_query_async(_DYNAMIC_DROPDOWN_QUERY, [dd_type])
     except Exception as exc:
         logger.warning(f"Error fetching dynamic dropdown '{dd_type}': {exc}")
         raise HTTPException(status_code=500, detail={"error": str(exc)}) from exc
 
 
 async def get_all_dropdowns() -> list[dict[str, Any]]:
-    query = """
-        SELECT DD_Key, DD_Type, DD_Value, DD_SortOrder
-        FROM tblDropDowns
-        ORDER BY DD_Type, COALESCE(DD_SortOrder, 0), DD_Value
-    """
     try:
-        return await run_raw_query_async(query, [])
+        return await run_raw_query_async(_ALL_DROPDOWNS_QUERY, [])
     except Exception as exc:
         logger.warning(f"Error fetching all dropdowns: {exc}")
         raise HTTPException(status_code=500, detail={"error": str(exc)}) from exc
@@ -590,6 +740,10 @@ async def upsert_dropdown_values(name: str, rows: list[dict[str, Any]]) -> dict[
     except Exception as exc:
         logger.warning(f"Upsert failed for dropdown '{name}': {exc}")
         raise HTTPException(status_code=500, detail={"error": str(exc)}) from exc
+    finally:
+        # Invalidate even on failure: an earlier statement may already have committed.
+        _dropdown_cache.invalidate_table(table)
+        await refresh_name_email_index_after_write(table)
 
 
 async def delete_dropdown_values(name: str, rows: list[dict[str, Any]]) -> dict[str, Any]:
@@ -619,3 +773,6 @@ async def delete_dropdown_values(name: str, rows: list[dict[str, Any]]) -> dict[
     except Exception as exc:
         logger.warning(f"Deletion failed for dropdown '{name}': {exc}")
         raise HTTPException(status_code=500, detail={"error": str(exc)}) from exc
+    finally:
+        _dropdown_cache.invalidate_table(table)
+        await refresh_name_email_index_after_write(table)
@@ -5,11 +5,15 @@ from fastapi import HTTPException
 
 from core.db_helpers import (
     delete_records_async,
-    fetch_records_async,
-    insert_records_async,
+    insert_missing_records_async,
     run_raw_query_async,
     sanitize_filters,
 )
+from services.association_graph_service import (
+    account_neighborhood,
+    hcm_association_graph,
+    parse_max_hops,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -48,32 +52,22 @@ async def add_associations(payload: dict[str, Any]):
         if not normalized_children:
             return {"message": "No new associations to add", "count": 0}
 
-        parents_to_check = [parent_account, *normalized_children]
-        existing_pairs: set[tuple[str, str]] = set()
-        for parent in parents_to_check:
-            existing = await fetch_records_async(
-                table=TABLE_NAME, filters={"ParentAccount": parent}
-            )
-            for row in existing:
-                associated = row.get("AssociatedAccount")
-                associated = str(associated).strip() if associated is not None else ""
-                if associated:
-                    existing_pairs.add((parent, associated))
-
         pairs: list[tuple[str, str]] = []
         for child in normalized_children:
             pairs.append((parent_account, child))
             pairs.append((child, parent_account))
 
-        to_insert = [
-            {"ParentAccount": parent, "AssociatedAccount": child}
-            for parent, child in pairs
-            if (parent, child) not in existing_pairs
-        ]
-        if not to_insert:
+        result = await insert_missing_records_async(
+            table=TABLE_NAME,
+            records=[
+                {"ParentAccount": parent, "AssociatedAccount": child} for parent, child in pairs
+            ],
+            key_columns=["ParentAccount", "AssociatedAccount"],
+        )
+        hcm_association_graph.add_pairs(pairs)
+        if not result["count"]:
             return {"message": "No new associations to add", "count": 0}
-
-        return await insert_records_async(table=TABLE_NAME, records=to_insert)
+        return result
     except HTTPException:
         raise
     except Exception as e:
@@ -106,11 +100,13 @@ async def delete_associations(payload: dict[str, Any]):
         data_list = [
             {"ParentAccount": parent, "AssociatedAccount": child} for parent, child in pairs
         ]
-        return await delete_records_async(
+        result = await delete_records_async(
             table=TABLE_NAME,
             data_list=data_list,
             key_columns=["ParentAccount", "AssociatedAccount"],
         )
+        hcm_association_graph.remove_pairs(pairs)
+        return result
     except HTTPException:
         raise
     except Exception as e:
@@ -147,3 +143,30 @@ async def get_associations(query_params: dict[str, Any]):
     except Exception as e:
         logger.warning(f"HCM account associations fetch failed - {str(e)}")
         raise HTTPException(status_code=500, detail={"error": str(e)}) from e
+
+
+async def get_account_family(query_params: dict[str, Any]):
+    """
+    Accounts linked to ParentAccount through any chain of associations, with
+    their hop distance. `hops` limits the search depth.
+    """
+    try:
+        params = dict(query_params)
+        max_hops = parse_max_hops(params.pop("hops", None))
+        filters = sanitize_filters(params, ALLOWED_FILTERS)
+        parent_account = filters.get("ParentAccount")
+        if not parent_account:
+            raise HTTPException(status_code=400, detail={"error": "ParentAccount is required"})
+
+        reachable = await account_neighborhood(hcm_association_graph, parent_account, max_hops)
+        return [
+            {"ParentAccount": parent_account, "AssociatedAccount": account, "Hops": hops}
+            for account, hops in sorted(reachable.items(), key=lambda item: (item[1], item[0]))
+        ]
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail={"error": str(exc)}) from exc
+    except Exception as e:
+        logger.warning(f"HCM account family fetch failed - {str(e)}")
+        raise HTTPException(status_code=500, detail={"error": str(e)}) from e
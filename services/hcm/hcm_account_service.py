@@ -8,6 +8,7 @@ from core.db_helpers import (
     fetch_records_async,
     insert_records_async,
     merge_upsert_records_async,
+    resolve_projection,
     sanitize_filters,
 )
 
@@ -33,10 +34,11 @@ def _sanitize_account_record(record: dict[str, Any]) -> dict[str, Any]:
     return {k: v for k, v in record.items() if k not in EXCLUDE_COLUMNS}
 
 
-async def get_hcm_account(query_params: dict[str, Any]):
+async def get_hcm_account(query_params: dict[str, Any], fields: str | None = None):
     try:
         filters = sanitize_filters(query_params)
-        records = await fetch_records_async(table=TABLE_NAME, filters=filters)
+        columns = await resolve_projection(TABLE_NAME, fields)
+        records = await fetch_records_async(table=TABLE_NAME, filters=filters, columns=columns)
         return format_records_dates(records, fields=_DATE_FIELDS)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail={"error": str(exc)}) from exc
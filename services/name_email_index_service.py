@@ -0,0 +1,114 @@
+import logging
+from typing import Any
+
+from core.db_helpers import run_raw_query_sets
+from core.periodic_refresh import PeriodicRefresh, RefreshableIndex
+
+logger = logging.getLogger(__name__)
+
+NAME_EMAIL_TABLES = frozenset({"tblUnderwriters", "tblMGTUsers"})
+
+_UNDERWRITERS_QUERY = """
+    SELECT
+        CAST([UW Name] AS VARCHAR(MAX)) AS Name,
+        CAST([UW Email] AS VARCHAR(MAX)) AS Email
+    FROM tblUnderwriters
+"""
+
+_SAC_USERS_QUERY = """
+    SELECT
+        CAST(SACName AS VARCHAR(MAX)) AS Name,
+        CAST(EMailID AS VARCHAR(MAX)) AS Email
+    FROM tblMGTUsers
+"""
+
+
+def normalize_name(value: Any) -> str:
+    """Match key for names, equivalent to SQL `UPPER(LTRIM(RTRIM(...)))`."""
+    return str(value or "").strip().upper()
+
+
+def _emails_by_name(rows: list[dict[str, Any]]) -> dict[str, tuple[str, ...]]:
+    emails: dict[str, dict[str, None]] = {}
+    for row in rows:
+        name = normalize_name(row.get("Name"))
+        if not name:
+            continue
+        # Names without an email are kept so they still resolve (to nothing).
+        found = emails.setdefault(name, {})
+        if email := str(row.get("Email") or "").strip():
+            found.setdefault(email)
+    return {name: tuple(found) for name, found in emails.items()}
+
+
+class NameEmailIndex(RefreshableIndex):
+    """
+    In-process name -> email directories for underwriters (tblUnderwriters, which
+    also lists UW managers) and SAC users (tblMGTUsers), keyed by normalized name.
+
+    A name may map to several emails, as it would through a SQL join. Until the
+    first successful load `loaded` is False and callers should join in SQL.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._underwriters: dict[str, tuple[str, ...]] = {}
+        self._sac_users: dict[str, tuple[str, ...]] = {}
+
+    def replace(
+        self, underwriter_rows: list[dict[str, Any]], sac_user_rows: list[dict[str, Any]]
+    ) -> None:
+        underwriters = _emails_by_name(underwriter_rows)
+        sac_users = _emails_by_name(sac_user_rows)
+        with self._lock:
+            self._underwriters = underwriters
+            self._sac_users = sac_users
+            self._mark_loaded()
+
+    def underwriter_emails(self, name: Any) -> tuple[str, ...]:
+        return self._underwriters.get(normalize_name(name), ())
+
+    def sac_user_emails(self, name: Any) -> tuple[str, ...]:
+        return self._sac_users.get(normalize_name(name), ())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._underwriters = {}
+            self._sac_users = {}
+            self._mark_unloaded()
+
+    def _sizes(self) -> dict[str, int]:
+        return {"underwriters": len(self._underwriters), "sac_users": len(self._sac_users)}
+
+
+name_email_index = NameEmailIndex()
+
+
+def refresh_name_email_index() -> int:
+    """Reload both directories in one batch; returns the number of rows read."""
+    underwriter_rows, sac_user_rows = run_raw_query_sets(
+        [(_UNDERWRITERS_QUERY, []), (_SAC_USERS_QUERY, [])]
+    )
+    name_email_index.replace(underwriter_rows, sac_user_rows)
+    return len(underwriter_rows) + len(sac_user_rows)
+
+
+name_email_refresh = PeriodicRefresh(
+    "Name/email index", refresh_name_email_index, "NAME_EMAIL_INDEX_REFRESH_SECONDS"
+)
+start_name_email_index = name_email_refresh.start
+
+
+async def refresh_name_email_index_after_write(table: str) -> None:
+    """
+    Reload the index after a write to one of its tables so lookups see the change
+    at once. If the reload fails the index is reset, and callers join in SQL until
+    the next periodic refresh succeeds.
+    """
+    if table not in NAME_EMAIL_TABLES or not name_email_index.loaded:
+        return
+    try:
+        await name_email_refresh.refresh()
+    except Exception as e:
+        logger.warning(f"Name/email index reload after {table} write failed - {str(e)}")
+        name_email_index.reset()
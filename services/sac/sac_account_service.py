@@ -11,10 +11,11 @@ from core.date_utils import (
     normalize_payload_dates,
 )
 from core.db_helpers import (
+    NOT_RETIRED_STAGE,
     fetch_records_async,
     insert_records_async,
     merge_upsert_records_async,
-    run_raw_query_async,
+    resolve_projection,
     sanitize_filters,
 )
 
@@ -43,53 +44,25 @@ _DATE_FIELDS = {
     "NCMEndDt",
     "EffectiveDate",
 }
+DEFAULT_CONDITIONS = [NOT_RETIRED_STAGE]
 
 
-def _exclude_retired_stage(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    return [
-        record for record in records if str(record.get("Stage", "")).strip().lower() != "retired"
-    ]
-
-
-async def get_sac_account(query_params: dict[str, Any]):
+async def get_sac_account(query_params: dict[str, Any], fields: str | None = None):
     try:
         filters = sanitize_filters(query_params, ALLOWED_FILTERS)
+        columns = await resolve_projection(TABLE_NAME, fields)
         branch_filter = filters.pop("BranchName", None)
-
-        if not branch_filter:
-            records = await fetch_records_async(table=TABLE_NAME, filters=filters)
-            records = _exclude_retired_stage(records)
-            if not records:
-                return []
-            return format_records_dates(records, fields=_DATE_FIELDS)
-
-        branch_terms = [term for term in re.split(r"[ ,&]+", str(branch_filter)) if term.strip()]
-
-        # Fall back to simple filtering if nothing usable came from the branch filter.
-        if not branch_terms:
-            records = await fetch_records_async(table=TABLE_NAME, filters=filters)
-            records = _exclude_retired_stage(records)
-            if not records:
-                return []
-            return format_records_dates(records, fields=_DATE_FIELDS)
-
-        clauses: list[str] = []
-        params: list[Any] = []
-
-        for key, value in filters.items():
-            clauses.append(f"{key} = ?")
-            params.append(value)
-
-        branch_clauses = ["BranchName LIKE ?" for _ in branch_terms]
-        clauses.append(f"({' OR '.join(branch_clauses)})")
-        params.extend(f"{term}%" for term in branch_terms)
-
-        query = f"SELECT * FROM {TABLE_NAME}"
-        if clauses:
-            query += " WHERE " + " AND ".join(clauses)
-
-        records = await run_raw_query_async(query, list(params))
-        records = _exclude_retired_stage(records)
+        if branch_filter:
+            branch_terms = [
+                term for term in re.split(r"[ ,&]+", str(branch_filter)) if term.strip()
+            ]
+            # Fall back to simple filtering if nothing usable came from the branch filter.
+            if branch_terms:
+                filters["BranchName__prefix"] = branch_terms
+
+        records = await fetch_records_async(
+            table=TABLE_NAME, filters=filters, columns=columns, conditions=DEFAULT_CONDITIONS
+        )
         if not records:
             return []
         return format_records_dates(records, fields=_DATE_FIELDS)
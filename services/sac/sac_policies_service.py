@@ -1,25 +1,33 @@
 import logging
+from collections.abc import Iterable
+from itertools import product
 from typing import Any
 
 from fastapi import HTTPException
 from fastapi.concurrency import run_in_threadpool
 
+from core.config import settings
 from core.date_utils import (
     format_records_dates,
     normalize_payload_dates,
     parse_date_input,
 )
 from core.db_helpers import (
+    NOT_RETIRED_STAGE,
     _ensure_safe_identifier,
+    compile_filters,
     fetch_records_async,
-    insert_records_async,
+    insert_record_returning_async,
     merge_upsert_records_async,
+    resolve_projection,
     run_raw_query_async,
     sanitize_filters,
     update_records_async,
 )
 from core.models.sac_policies import normalize_money_string
-from db import db_connection
+from core.ttl_cache import InvalidationLog, TTLCache
+from db import db_connection, unit_of_work
+from services.name_email_index_service import name_email_index
 
 logger = logging.getLogger(__name__)
 
@@ -27,39 +35,119 @@ TABLE_NAME = "tblPolicies"
 PRIMARY_KEY = "PK_Number"
 ALLOWED_FILTERS = {"CustomerNum", "PolicyNum", "PolMod", "PK_Number", "PolPref"}
 PREMIUM_ALLOWED_FILTERS = {"CustomerNum", "PolicyNum", "PolMod","PolPref", "PolicyStatus"}
+DEFAULT_CONDITIONS = [NOT_RETIRED_STAGE]
+MAX_PREMIUM_CUSTOMERS = 1000
+# Columns that feed the active-premium total; writes to other columns keep the cache.
+_PREMIUM_COLUMNS = {"CustomerNum", "PremiumAmt", "PolicyStatus"}
+
+# Active-policy premium totals keyed by CustomerNum (see get_premium).
+_premium_cache: TTLCache[str, Any] = TTLCache(
+    settings.PREMIUM_CACHE_SIZE, settings.PREMIUM_CACHE_TTL
+)
+# Writes that landed while a total was being summed keep it out of the cache.
+_premium_invalidations: InvalidationLog[str] = InvalidationLog(settings.PREMIUM_CACHE_SIZE)
+
+# Fallback for get_underwriter_details while the name/email index is not loaded.
+_UNDERWRITER_DETAILS_JOIN_QUERY = """
+    SELECT
+        CAST(m.EMailID AS VARCHAR(MAX)) AS AcctOwnerEmail,
+
+        CAST(p.UnderwriterName AS VARCHAR(MAX)) AS UnderwriterName,
+        CAST(uw.[UW Email] AS VARCHAR(MAX)) AS UnderwriterEmail,
+
+        CAST(p.UWMgr AS VARCHAR(MAX)) AS UWMgr,
+        CAST(uwmgr.[UW Email] AS VARCHAR(MAX)) AS UWMgrEmail
+
+    FROM tblAcctSpecial a
+
+    LEFT JOIN tblPolicies p
+        ON a.CustomerNum = p.CustomerNum
+
+    LEFT JOIN tblUnderwriters uw
+        ON UPPER(LTRIM(RTRIM(p.UnderwriterName)))
+         = UPPER(LTRIM(RTRIM(uw.[UW Name])))
+
+    LEFT JOIN tblUnderwriters uwmgr
+        ON UPPER(LTRIM(RTRIM(CAST(p.UWMgr AS VARCHAR(MAX)))))
+         = UPPER(LTRIM(RTRIM(CAST(uwmgr.[UW Name] AS VARCHAR(MAX)))))
 
+    LEFT JOIN tblMGTUsers m
+        ON UPPER(LTRIM(RTRIM(CAST(a.AcctOwner AS VARCHAR(MAX)))))
+         = UPPER(LTRIM(RTRIM(CAST(m.SACName AS VARCHAR(MAX)))))
 
-def _exclude_retired_stage(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    return [
-        record for record in records if str(record.get("Stage", "")).strip().lower() != "retired"
-    ]
+    WHERE a.CustomerNum = ?
+"""
 
+_POLICY_CONTACT_NAMES_QUERY = """
+    SELECT
+        CAST(a.AcctOwner AS VARCHAR(MAX)) AS AcctOwner,
+        CAST(p.UnderwriterName AS VARCHAR(MAX)) AS UnderwriterName,
+        CAST(p.UWMgr AS VARCHAR(MAX)) AS UWMgr
+    FROM tblAcctSpecial a
+    LEFT JOIN tblPolicies p
+        ON a.CustomerNum = p.CustomerNum
+    WHERE a.CustomerNum = ?
+"""
 
-async def _lookup_pk_number(record: dict[str, Any]) -> int | None:
+
+def _customer_key(value: Any) -> str:
+    return str(value).strip() if value is not None else ""
+
+
+def evict_premiums(customer_nums: Iterable[Any] | None = None) -> None:
     """
-    Fetch the latest PK_Number for a policy identified by its natural key fields.
-    Used after inserts to return the new identity value.
+    Drop cached premium totals for the given customers, or for all customers when
+    None. Call after any write to tblPolicies that can change PremiumAmt,
+    PolicyStatus or CustomerNum.
     """
+    if customer_nums is None:
+        _premium_invalidations.invalidate_all()
+        _premium_cache.clear()
+        return
+
+    for customer_num in {_customer_key(value) for value in customer_nums}:
+        _premium_invalidations.invalidate(customer_num)
+        _premium_cache.pop(customer_num)
+
+
+def premium_cache_stats() -> dict[str, Any]:
+    return _premium_cache.stats()
+
+
+def clear_premium_cache() -> None:
+    _premium_invalidations.invalidate_all()
+    _premium_cache.clear()
+
+
+def _evict_premiums_for_updates(updates: list[dict[str, Any]]) -> None:
+    touched = [update for update in updates if update["fieldName"] in _PREMIUM_COLUMNS]
+    if not touched:
+        return
+    if all(
+        update["updateVia"] == "CustomerNum" and update["fieldName"] != "CustomerNum"
+        for update in touched
+    ):
+        evict_premiums(update["updateViaValue"] for update in touched)
+    else:
+        # Matched by another column, or rows moved between customers.
+        evict_premiums()
+
+
+async def _update_policies(updates: list[dict[str, Any]]) -> dict[str, Any]:
     try:
-        query = """
-            SELECT TOP 1 PK_Number
-            FROM tblPolicies
-            WHERE CustomerNum = ? AND PolicyNum = ? AND PolMod = ?
-            ORDER BY PK_Number DESC
-        """
-        params = [record["CustomerNum"], record["PolicyNum"], record["PolMod"]]
-        rows = await run_raw_query_async(query, params)
-        return rows[0]["PK_Number"] if rows else None
-    except Exception as exc:
-        logger.warning("Failed to fetch PK_Number for new policy row: %s", exc)
-        return None
+        return await update_records_async(table=TABLE_NAME, updates=updates)
+    finally:
+        # Also on failure: a timed-out call may still have committed.
+        _evict_premiums_for_updates(updates)
 
 
-async def get_sac_policies(query_params: dict[str, Any]):
+async def get_sac_policies(query_params: dict[str, Any], fields: str | None = None):
     try:
         filters = sanitize_filters(query_params, ALLOWED_FILTERS)
-        records = await fetch_records_async(table=TABLE_NAME, filters=filters)
-        records = _exclude_retired_stage(records)
+        columns = await resolve_projection(TABLE_NAME, fields)
+        records = await fetch_records_async(
+            table=TABLE_NAME, filters=filters, columns=columns, conditions=DEFAULT_CONDITIONS
+        )
         formatted = format_records_dates(records)
         for record in formatted:
             if "PremiumAmt" in record:
@@ -73,6 +161,7 @@ async def get_sac_policies(query_params: dict[str, Any]):
 
 
 async def upsert_sac_policies(data: dict[str, Any]):
+    touched_customers = [data.get("CustomerNum")]
     try:
         normalized = normalize_payload_dates(data)
         pk_value = normalized.get(PRIMARY_KEY)
@@ -81,50 +170,62 @@ async def upsert_sac_policies(data: dict[str, Any]):
         if pk_value in (None, ""):
             sanitized_record = {k: v for k, v in normalized.items() if k != PRIMARY_KEY}
             if sanitized_record:
-                await insert_records_async(table=TABLE_NAME, records=[sanitized_record])
-                pk_response = await _lookup_pk_number(sanitized_record)
-        else:
-            existing = await fetch_records_async(table=TABLE_NAME, filters={PRIMARY_KEY: pk_value})
-            existing_row = existing[0] if existing else None
-
-            # If incoming mod differs from stored mod, treat this as a "new mod" clone and insert
-            existing_mod = None
-            if existing_row and existing_row.get("PolMod") is not None:
-                existing_mod = str(existing_row.get("PolMod"))
-            incoming_mod = None
-            if normalized.get("PolMod") is not None:
-                incoming_mod = str(normalized.get("PolMod"))
-
-            if existing_row is None:
-                logger.info("PK_Number %s not found; inserting new policy row", pk_value)
-                sanitized_record = {k: v for k, v in normalized.items() if k != PRIMARY_KEY}
-                if sanitized_record:
-                    await insert_records_async(table=TABLE_NAME, records=[sanitized_record])
-                    pk_response = await _lookup_pk_number(sanitized_record)
-            elif incoming_mod is not None and incoming_mod != existing_mod:
-                logger.info(
-                    "Detected new mod for policy PK_Number %s (old %s -> new %s); inserting clone",
-                    pk_value,
-                    existing_mod,
-                    incoming_mod,
+                pk_response = await insert_record_returning_async(
+                    TABLE_NAME, sanitized_record, PRIMARY_KEY
                 )
-                sanitized_record = {k: v for k, v in normalized.items() if k != PRIMARY_KEY}
-                if sanitized_record:
-                    await insert_records_async(table=TABLE_NAME, records=[sanitized_record])
-                    pk_response = await _lookup_pk_number(sanitized_record)
-            else:
-                await merge_upsert_records_async(
-                    table=TABLE_NAME,
-                    data_list=[normalized],
-                    key_columns=[PRIMARY_KEY],
-                    exclude_key_columns_from_insert=True,
+        else:
+            async with unit_of_work():
+                existing = await fetch_records_async(
+                    table=TABLE_NAME, filters={PRIMARY_KEY: pk_value}
                 )
-                pk_response = pk_value
+                existing_row = existing[0] if existing else None
+                if existing_row is not None:
+                    touched_customers.append(existing_row.get("CustomerNum"))
+
+                # If incoming mod differs from stored mod, treat this as a "new mod" clone
+                # and insert
+                existing_mod = None
+                if existing_row and existing_row.get("PolMod") is not None:
+                    existing_mod = str(existing_row.get("PolMod"))
+                incoming_mod = None
+                if normalized.get("PolMod") is not None:
+                    incoming_mod = str(normalized.get("PolMod"))
+
+                if existing_row is None:
+                    logger.info("PK_Number %s not found; inserting new policy row", pk_value)
+                    sanitized_record = {k: v for k, v in normalized.items() if k != PRIMARY_KEY}
+                    if sanitized_record:
+                        pk_response = await insert_record_returning_async(
+                            TABLE_NAME, sanitized_record, PRIMARY_KEY
+                        )
+                elif incoming_mod is not None and incoming_mod != existing_mod:
+                    logger.info(
+                        "Detected new mod for policy PK_Number %s (old %s -> new %s); "
+                        "inserting clone",
+                        pk_value,
+                        existing_mod,
+                        incoming_mod,
+                    )
+                    sanitized_record = {k: v for k, v in normalized.items() if k != PRIMARY_KEY}
+                    if sanitized_record:
+                        pk_response = await insert_record_returning_async(
+                            TABLE_NAME, sanitized_record, PRIMARY_KEY
+                        )
+                else:
+                    await merge_upsert_records_async(
+                        table=TABLE_NAME,
+                        data_list=[normalized],
+                        key_columns=[PRIMARY_KEY],
+                        exclude_key_columns_from_insert=True,
+                    )
+                    pk_response = pk_value
 
         return {"message": "Transaction successful", "count": 1, "pk": pk_response}
     except Exception as e:
         logger.warning(f"Upsert failed - {str(e)}")
         raise HTTPException(status_code=500, detail={"error": str(e)}) from e
+    finally:
+        evict_premiums(value for value in touched_customers if value is not None)
 
 
 async def update_field_for_all_policies(data: list[dict[str, Any]] | dict[str, Any]):
@@ -173,10 +274,7 @@ async def update_field_for_all_policies(data: list[dict[str, Any]] | dict[str, A
                 }
             )
 
-        return await update_records_async(
-            table=TABLE_NAME,
-            updates=normalized_updates,
-        )
+        return await _update_policies(normalized_updates)
 
     except ValueError as exc:
         raise HTTPException(
@@ -198,6 +296,9 @@ async def update_field_for_all_policies(data: list[dict[str, Any]] | dict[str, A
 async def get_premium(query_params: dict[str, Any]):
     """
     Fetch sum of premium of all active policies from tblPolicies.
+
+    Per-customer totals (CustomerNum as the only filter) are cached for
+    PREMIUM_CACHE_TTL seconds and evicted by the policy writers in this module.
     """
 
     try:
@@ -205,18 +306,24 @@ async def get_premium(query_params: dict[str, Any]):
         filters_input["PolicyStatus"] = "Active"
         filters = sanitize_filters(filters_input, PREMIUM_ALLOWED_FILTERS)
 
-        clauses = []
-        params = []
-        for key, value in filters.items():
-            clauses.append(f"{key} = ?")
-            params.append(value)
+        customer_num = None
+        if filters.keys() == {"CustomerNum", "PolicyStatus"}:
+            customer_num = _customer_key(filters["CustomerNum"])
+            cached = _premium_cache.get(customer_num)
+            if cached is not None:
+                return cached
+            token = _premium_invalidations.start()
+
+        clauses, params = compile_filters(filters)
 
         query = "SELECT COALESCE(SUM(PremiumAmt), 0) AS Premium FROM tblPolicies"
         if clauses:
             query += " WHERE " + " AND ".join(clauses)
-        print("QUERYY", query)
         rows = await run_raw_query_async(query, params)
         premium_value = rows[0]["Premium"] if rows else 0
+        # Skip caching if a write evicted this customer while the query ran.
+        if customer_num is not None and _premium_invalidations.unchanged(customer_num, token):
+            _premium_cache.set(customer_num, premium_value)
         return premium_value
 
     except ValueError as exc:
@@ -226,6 +333,79 @@ async def get_premium(query_params: dict[str, Any]):
         raise HTTPException(status_code=500, detail={"error": str(e)}) from e
 
 
+async def get_premiums(query_params: dict[str, Any]):
+    """
+    Active-policy premium totals for many customers in one call, keyed by
+    CustomerNum (comma-separated). Cached totals are served from memory; the
+    rest are summed in one grouped query. Unknown customers total 0.
+    """
+    try:
+        filters = sanitize_filters(query_params, {"CustomerNum"})
+        raw_values = str(filters.get("CustomerNum") or "").split(",")
+        customer_nums = list(dict.fromkeys(key for key in map(_customer_key, raw_values) if key))
+        if not customer_nums:
+            raise ValueError("CustomerNum is required")
+        if len(customer_nums) > MAX_PREMIUM_CUSTOMERS:
+            raise ValueError(f"At most {MAX_PREMIUM_CUSTOMERS} CustomerNum values are allowed")
+
+        premiums: dict[str, Any] = {}
+        misses: list[str] = []
+        for customer_num in customer_nums:
+            cached = _premium_cache.get(customer_num)
+            if cached is None:
+                misses.append(customer_num)
+            else:
+                premiums[customer_num] = cached
+
+        if misses:
+            token = _premium_invalidations.start()
+            clauses, params = compile_filters({"CustomerNum__in": misses, "PolicyStatus": "Active"})
+            query = (
+                "SELECT CustomerNum, COALESCE(SUM(PremiumAmt), 0) AS Premium "
+                f"FROM tblPolicies WHERE {' AND '.join(clauses)} GROUP BY CustomerNum"
+            )
+            rows = await run_raw_query_async(query, params)
+            totals = {_customer_key(row["CustomerNum"]): row["Premium"] for row in rows}
+            for customer_num in misses:
+                premium_value = totals.get(customer_num, 0)
+                premiums[customer_num] = premium_value
+                if _premium_invalidations.unchanged(customer_num, token):
+                    _premium_cache.set(customer_num, premium_value)
+
+        return {customer_num: premiums[customer_num] for customer_num in customer_nums}
+
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail={"error": str(exc)}) from exc
+    except Exception as e:
+        logger.warning(f"Error fetching SAC policy premiums - {str(e)}")
+        raise HTTPException(status_code=500, detail={"error": str(e)}) from e
+
+
+def _resolve_contact_emails(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Resolve raw policy contact names through the name/email index into the rows
+    _UNDERWRITER_DETAILS_JOIN_QUERY returns (one per email combination).
+    """
+    records: list[dict[str, Any]] = []
+    for row in rows:
+        owner_emails = name_email_index.sac_user_emails(row.get("AcctOwner")) or (None,)
+        underwriter_emails = name_email_index.underwriter_emails(row.get("UnderwriterName"))
+        manager_emails = name_email_index.underwriter_emails(row.get("UWMgr"))
+        for owner_email, underwriter_email, manager_email in product(
+            owner_emails, underwriter_emails or (None,), manager_emails or (None,)
+        ):
+            records.append(
+                {
+                    "AcctOwnerEmail": owner_email,
+                    "UnderwriterName": row.get("UnderwriterName"),
+                    "UnderwriterEmail": underwriter_email,
+                    "UWMgr": row.get("UWMgr"),
+                    "UWMgrEmail": manager_email,
+                }
+            )
+    return records
+
+
 async def get_underwriter_details(query_params: dict[str, Any]):
     try:
         filters = sanitize_filters(query_params, ALLOWED_FILTERS)
@@ -237,37 +417,11 @@ async def get_underwriter_details(query_params: dict[str, Any]):
                 detail={"error": "CustomerNum is required."},
             )
 
-        query = """
-            SELECT
-                CAST(m.EMailID AS VARCHAR(MAX)) AS AcctOwnerEmail,
-
-                CAST(p.UnderwriterName AS VARCHAR(MAX)) AS UnderwriterName,
-                CAST(uw.[UW Email] AS VARCHAR(MAX)) AS UnderwriterEmail,
-
-                CAST(p.UWMgr AS VARCHAR(MAX)) AS UWMgr,
-                CAST(uwmgr.[UW Email] AS VARCHAR(MAX)) AS UWMgrEmail
-
-            FROM tblAcctSpecial a
-
-            LEFT JOIN tblPolicies p
-                ON a.CustomerNum = p.CustomerNum
-
-            LEFT JOIN tblUnderwriters uw
-                ON UPPER(LTRIM(RTRIM(p.UnderwriterName)))
-                 = UPPER(LTRIM(RTRIM(uw.[UW Name])))
-
-            LEFT JOIN tblUnderwriters uwmgr
-                ON UPPER(LTRIM(RTRIM(CAST(p.UWMgr AS VARCHAR(MAX)))))
-                 = UPPER(LTRIM(RTRIM(CAST(uwmgr.[UW Name] AS VARCHAR(MAX)))))
-
-            LEFT JOIN tblMGTUsers m
-                ON UPPER(LTRIM(RTRIM(CAST(a.AcctOwner AS VARCHAR(MAX)))))
-                 = UPPER(LTRIM(RTRIM(CAST(m.SACName AS VARCHAR(MAX)))))
-
-            WHERE a.CustomerNum = ?
-        """
-
-        records = await run_raw_query_async(query, [customer_num])
+        if name_email_index.loaded:
+            rows = await run_raw_query_async(_POLICY_CONTACT_NAMES_QUERY, [customer_num])
+            records = _resolve_contact_emails(rows)
+        else:
+            records = await run_raw_query_async(_UNDERWRITER_DETAILS_JOIN_QUERY, [customer_num])
 
         if not records:
             return {
@@ -358,16 +512,15 @@ async def sync_account_name(data: dict[str, Any]):
                 detail={"error": "CustomerNum is required"},
             )
 
-        return await update_records_async(
-            table=TABLE_NAME,
-            updates=[
+        return await _update_policies(
+            [
                 {
                     "fieldName": "AccountName",
                     "fieldValue": account_name,
                     "updateVia": "CustomerNum",
                     "updateViaValue": customer_num,
                 }
-            ],
+            ]
         )
 
     except HTTPException:
@@ -3,7 +3,14 @@ import logging
 from fastapi import HTTPException
 
 from core.date_utils import format_records_dates
-from core.db_helpers import run_raw_query_async
+from core.db_helpers import (
+    StreamLimitError,
+    run_keyset_page_async,
+    run_raw_query_async,
+    stream_raw_query_async,
+)
+from core.pagination import drop_columns
+from core.streaming import BatchTransform, StreamFormat, stream_records_response
 
 logger = logging.getLogger(__name__)
 
@@ -107,6 +114,7 @@ SEARCH_QUERIES = {
       tblAcctSpecial.CustomerName AS [Customer Name],
         tblAcctSpecial.CustomerNum AS [Customer Number],
           tblAcctSpecial.OnBoardDate,
+            tblAcctSpecial.ServLevel AS [Service Level],
             tblAcctSpecial.AcctStatus AS [Account Status]
               FROM
                 tblAffiliates INNER JOIN tblAcctSpecial
@@ -116,6 +124,55 @@ SEARCH_QUERIES = {
                       ORDER BY tblAffiliates.AffiliateName;""",
 }
 
+# Keyset columns per search: the query's ORDER BY column first, then the remaining
+# output columns as tie-breakers. Every query groups by exactly its output columns,
+# so that combination is unique and no row can share a keyset with another.
+SEARCH_KEYSETS = {
+    "AccountName": ["Customer Name", "Customer Number", "On Board Date", "Account Status"],
+    "CustomerNum": ["Customer Number", "Customer Name", "On Board Date", "Account Status"],
+    "PolicyNum": [
+        "Policy Number",
+        "Customer Number",
+        "Customer Name",
+        "On Board Date",
+        "Account Status",
+    ],
+    "ProducerCode": [
+        "Producer Code",
+        "Producer",
+        "Customer Name",
+        "Inception Date",
+        "Customer Number",
+        "Account Status",
+    ],
+    "PolicyNameInsured": [
+        "Name Insured on Policy",
+        "Customer Name",
+        "Account Owner",
+        "Customer Number",
+        "Account Status",
+    ],
+    "AffiliateName": [
+        "Affiliate Name",
+        "Customer Name",
+        "Customer Number",
+        "OnBoardDate",
+        "Service Level",
+        "Account Status",
+    ],
+}
+
+# Tie-breakers selected only so keysets are unique; responses keep their original columns.
+KEYSET_ONLY_COLUMNS = {"AffiliateName": ("Service Level",)}
+
+
+def _response_transform(search_by: str) -> BatchTransform:
+    """Format dates and drop keyset-only columns from rows before they are returned."""
+    hidden = KEYSET_ONLY_COLUMNS.get(search_by)
+    if not hidden:
+        return format_records_dates
+    return lambda records: drop_columns(format_records_dates(records), hidden)
+
 
 async def search_sac_account_records(search_by: str):
     if search_by not in SEARCH_QUERIES:
@@ -124,7 +181,58 @@ async def search_sac_account_records(search_by: str):
     try:
         query = SEARCH_QUERIES[search_by]
         records = await run_raw_query_async(query)
-        return format_records_dates(records)
+        return _response_transform(search_by)(records)
+    except Exception as e:
+        logger.warning(f"Search failed - {str(e)}")
+        raise HTTPException(status_code=500, detail={"error": str(e)}) from e
+
+
+async def stream_sac_account_records(search_by: str, fmt: StreamFormat = "json"):
+    """
+    Streaming variant of search_sac_account_records: rows are fetched in batches,
+    date-formatted per batch and written as a chunked JSON array or NDJSON.
+    """
+    if search_by not in SEARCH_QUERIES:
+        raise HTTPException(status_code=400, detail={"error": "Invalid search type"})
+
+    try:
+        return await stream_records_response(
+            stream_raw_query_async(SEARCH_QUERIES[search_by]),
+            fmt,
+            transform=_response_transform(search_by),
+        )
+    except StreamLimitError as e:
+        raise HTTPException(status_code=503, detail={"error": str(e)}) from e
+    except Exception as e:
+        logger.warning(f"Search failed - {str(e)}")
+        raise HTTPException(status_code=500, detail={"error": str(e)}) from e
+
+
+async def search_sac_account_page(
+    search_by: str,
+    page_size: int,
+    cursor: str | None = None,
+    include_total: bool = False,
+):
+    """
+    Keyset-paginated variant of search_sac_account_records.
+    Returns {"items", "next_cursor", "page_size"} and "total" when requested.
+    """
+    if search_by not in SEARCH_QUERIES:
+        raise HTTPException(status_code=400, detail={"error": "Invalid search type"})
+
+    try:
+        page = await run_keyset_page_async(
+            SEARCH_QUERIES[search_by],
+            SEARCH_KEYSETS[search_by],
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
+        )
+        page["items"] = _response_transform(search_by)(page["items"])
+        return page
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail={"error": str(exc)}) from exc
     except Exception as e:
         logger.warning(f"Search failed - {str(e)}")
         raise HTTPException(status_code=500, detail={"error": str(e)}) from e
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import importlib
+import json
 
 import pytest
 from fastapi import Response
@@ -32,6 +33,7 @@ def test_hcm_account_association_routes_match_sac_contract():
     assert ("/hcm_account_associations/", frozenset({"GET"})) in routes
     assert ("/hcm_account_associations/add", frozenset({"POST"})) in routes
     assert ("/hcm_account_associations/delete", frozenset({"POST"})) in routes
+    assert ("/hcm_account_associations/family", frozenset({"GET"})) in routes
     assert not any(path == "/hcm_account_associations/upsert" for path, _ in routes)
 
 
@@ -43,15 +45,14 @@ GET_REQUEST_ENDPOINTS = [
     ("api.sac.deduct_bill_frequency", "get_frequency", "get_frequency_service"),
     ("api.sac.loss_run_frequency", "get_frequency", "get_frequency_service"),
     ("api.sac.hcm_users", "get_hcm_users", "get_hcm_users_service"),
-    ("api.hcm.hcm_account", "get_hcm_account", "get_hcm_account_service"),
     ("api.hcm.hcm_users", "get_hcm_users", "get_hcm_users_service"),
     ("api.hcm.hcm_account_associations", "get_associations", "get_associations_service"),
-    ("api.sac.sac_account", "get_sac_account", "get_sac_account_service"),
     ("api.sac.sac_account_associations", "get_associations", "get_associations_service"),
+    ("api.hcm.hcm_account_associations", "get_account_family", "get_account_family_service"),
+    ("api.sac.sac_account_associations", "get_account_family", "get_account_family_service"),
     ("api.sac.sac_affiliates", "get_affiliates", "get_affiliates_service"),
-    ("api.sac.sac_policies", "get_sac_policies", "get_sac_policies_service"),
     ("api.sac.sac_policies", "get_premium", "get_premium_service"),
-    ("api.affinity.affinity_program", "get_affinity_program", "get_affinity_program_service"),
+    ("api.sac.sac_policies", "get_premiums", "get_premiums_service"),
     ("api.affinity.affinity_agents", "get_affinity_agents", "get_affinity_agents_service"),
     ("api.affinity.affinity_policy_types", "get_affinity_policy_types", "get_affinity_policy_types_service"),
     ("api.affinity.claim_review_distribution", "get_distribution", "get_distribution_service"),
@@ -61,6 +62,13 @@ GET_REQUEST_ENDPOINTS = [
     ("api.affinity.loss_run_frequency", "get_frequency", "get_frequency_service"),
 ]
 
+PROJECTED_GET_ENDPOINTS = [
+    ("api.hcm.hcm_account", "get_hcm_account", "get_hcm_account_service"),
+    ("api.sac.sac_account", "get_sac_account", "get_sac_account_service"),
+    ("api.sac.sac_policies", "get_sac_policies", "get_sac_policies_service"),
+    ("api.affinity.affinity_program", "get_affinity_program", "get_affinity_program_service"),
+]
+
 QUERY_ENDPOINTS = [
     ("api.sac.search_sac_account", "get_sac_account_records", "get_sac_account_records_service"),
     ("api.hcm.search_hcm_account", "get_hcm_account_records", "get_hcm_account_records_service"),
@@ -121,6 +129,27 @@ def test_get_endpoints_pass_query_params(request_factory, monkeypatch, module_pa
     assert result == {"ok": module_path}
 
 
+@pytest.mark.parametrize("module_path, func_name, service_attr", PROJECTED_GET_ENDPOINTS)
+def test_projected_get_endpoints_split_fields_from_filters(
+    request_factory, monkeypatch, module_path, func_name, service_attr
+):
+    module = importlib.import_module(module_path)
+    captured = {}
+
+    async def fake_service(params, fields=None):
+        captured["params"] = params
+        captured["fields"] = fields
+        return {"ok": module_path}
+
+    monkeypatch.setattr(module, service_attr, fake_service)
+    request = request_factory({"foo": "bar", "fields": "A,B"})
+
+    result = asyncio.run(getattr(module, func_name)(request, fields="A,B"))
+
+    assert captured == {"params": {"foo": "bar"}, "fields": "A,B"}
+    assert result == {"ok": module_path}
+
+
 @pytest.mark.parametrize("module_path, func_name, service_attr", QUERY_ENDPOINTS)
 def test_query_endpoints_pass_search_by(monkeypatch, module_path, func_name, service_attr):
     module = importlib.import_module(module_path)
@@ -138,6 +167,29 @@ def test_query_endpoints_pass_search_by(monkeypatch, module_path, func_name, ser
     assert result == {"ok": "AccountName"}
 
 
+@pytest.mark.parametrize(
+    "module_path, func_name, service_attr",
+    [
+        ("api.sac.search_sac_account", "get_sac_account_records", "stream_sac_account_records_service"),
+        ("api.affinity.search_affinity_program", "get_affinity_program_records", "stream_affinity_program_records_service"),
+    ],
+)
+def test_search_endpoints_stream_when_requested(monkeypatch, module_path, func_name, service_attr):
+    module = importlib.import_module(module_path)
+    captured = {}
+
+    async def fake_service(search_by, fmt):
+        captured["args"] = (search_by, fmt)
+        return {"streamed": True}
+
+    monkeypatch.setattr(module, service_attr, fake_service)
+
+    result = asyncio.run(getattr(module, func_name)(search_by="ProducerCode", stream="ndjson"))
+
+    assert captured["args"] == ("ProducerCode", "ndjson")
+    assert result == {"streamed": True}
+
+
 @pytest.mark.parametrize("module_path, func_name, service_attr", LIST_PAYLOAD_ENDPOINTS)
 def test_list_payload_endpoints(monkeypatch, module_path, func_name, service_attr):
     module = importlib.import_module(module_path)
@@ -193,13 +245,14 @@ def test_affinity_agents_upsert_handles_list_and_single(monkeypatch):
     assert result == {"ok": True}
 
 
-def test_dropdown_endpoints(monkeypatch):
+def test_dropdown_endpoints(monkeypatch, request_factory):
     module = importlib.import_module("api.dropdowns")
     captured = {"get": None, "upsert": None, "delete": None}
+    dropdowns_service = importlib.import_module("services.dropdowns_service")
 
     async def fake_get(name):
         captured["get"] = name
-        return {"name": name}
+        return dropdowns_service._build_entry([{"name": name}], None)
 
     async def fake_upsert(name, payload):
         captured["upsert"] = (name, payload)
@@ -209,14 +262,30 @@ def test_dropdown_endpoints(monkeypatch):
         captured["delete"] = (name, payload)
         return {"count": len(payload)}
 
-    monkeypatch.setattr(module, "get_dropdown_values_service", fake_get)
+    monkeypatch.setattr(module, "get_dropdown_entry_service", fake_get)
     monkeypatch.setattr(module, "upsert_dropdown_values_service", fake_upsert)
     monkeypatch.setattr(module, "delete_dropdown_values_service", fake_delete)
 
-    assert asyncio.run(module.get_dropdown("LossCtl")) == {"name": "LossCtl"}
+    response = asyncio.run(module.get_dropdown("LossCtl", request_factory()))
+    assert response.status_code == 200
+    assert json.loads(response.body) == [{"name": "LossCtl"}]
+    assert response.headers["ETag"]
     assert asyncio.run(module.upsert_dropdown("LossCtl", [{"id": 1}])) == {"count": 1}
     assert asyncio.run(module.delete_dropdown("LossCtl", [{"id": 2}])) == {"count": 1}
     assert captured["get"] == "LossCtl"
+
+    async def fake_bundle(names):
+        captured["bundle"] = names
+        return {name: dropdowns_service._build_entry([{"name": name}], None) for name in names}
+
+    monkeypatch.setattr(module, "get_dropdown_bundle_service", fake_bundle)
+
+    response = asyncio.run(module.get_dropdown_bundle("LossCtl,BranchName", request_factory()))
+    assert captured["bundle"] == ["LossCtl", "BranchName"]
+    assert json.loads(response.body) == {
+        "LossCtl": [{"name": "LossCtl"}],
+        "BranchName": [{"name": "BranchName"}],
+    }
     assert captured["upsert"] == ("LossCtl", [{"id": 1}])
     assert captured["delete"] == ("LossCtl", [{"id": 2}])
 
@@ -237,8 +306,8 @@ def test_auth_endpoints(monkeypatch, request_factory):
         captured["me"] = request
         return {"ok": "me"}
 
-    async def fake_logout(response):
-        captured["logout"] = response
+    async def fake_logout(response, request):
+        captured["logout"] = (response, request)
         return {"ok": "logout"}
 
     async def fake_refresh(request, response, token):
@@ -251,6 +320,11 @@ def test_auth_endpoints(monkeypatch, request_factory):
     monkeypatch.setattr(module, "logout_user", fake_logout)
     monkeypatch.setattr(module, "refresh_user_token", fake_refresh)
 
+    async def fake_refresh_branch_mappings():
+        return {"ok": "branch_mapping"}
+
+    monkeypatch.setattr(module, "refresh_branch_mappings", fake_refresh_branch_mappings)
+
     response = Response()
     request = request_factory()
 
@@ -259,15 +333,25 @@ def test_auth_endpoints(monkeypatch, request_factory):
         "ok": "f5_login"
     }
     assert asyncio.run(module.get_current_user(request)) == {"ok": "me"}
-    assert asyncio.run(module.logout(response)) == {"ok": "logout"}
+    assert asyncio.run(module.logout(request, response)) == {"ok": "logout"}
     assert asyncio.run(module.refresh_token(request, response, token="abc")) == {"ok": "refresh"}
+    assert asyncio.run(module.refresh_branch_mapping()) == {"ok": "branch_mapping"}
 
     assert captured["login"][0] == {"user": "u"}
     assert captured["f5_login"][0] == {"user": "u", "groups": []}
-    assert captured["logout"] is response
+    assert captured["logout"] == (response, request)
     assert captured["refresh"][2] == "abc"
 
 
+def test_refresh_branch_mapping_requires_admin():
+    module = importlib.import_module("api.auth")
+    route = next(route for route in module.router.routes if route.path == "/refresh_branch_mapping")
+
+    assert [dependency.call for dependency in route.dependant.dependencies] == [
+        module.require_admin
+    ]
+
+
 def test_outlook_compose_endpoint(monkeypatch):
     module = importlib.import_module("api.outlook_compose")
     captured = {}
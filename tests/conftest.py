@@ -22,3 +22,29 @@ def request_factory():
         return Request(scope)
 
     return _make
+
+
+@pytest.fixture(autouse=True)
+def _clear_process_caches():
+    from core import db_helpers, jwt_handler
+    from services import (
+        association_graph_service,
+        auth_service,
+        branch_mapping_service,
+        name_email_index_service,
+    )
+    from services.sac import sac_policies_service
+
+    def _clear():
+        db_helpers.invalidate_schema_cache()
+        jwt_handler.clear_decode_cache()
+        auth_service.clear_principal_cache()
+        branch_mapping_service.branch_mapping_index.reset()
+        for graph in association_graph_service.association_graphs:
+            graph.reset()
+        name_email_index_service.name_email_index.reset()
+        sac_policies_service.clear_premium_cache()
+
+    _clear()
+    yield
+    _clear()
@@ -38,6 +38,47 @@ def test_try_parse_datetime_supports_multiple_formats():
     assert date_utils._try_parse_datetime("not-a-date") is None
 
 
+def test_try_parse_datetime_fast_path_matches_cascade():
+    samples = [
+        "2024-01-02",
+        "2024/1/2",
+        "01/02/2024",
+        "13/01/2024",
+        "1-2-2024",
+        "31-12-2024",
+        "02/30/2024",
+        "2024-01/02",
+        "20240102",
+        "2024-01-02T08:30:00Z",
+        "2024-01-02 08:30:00.123",
+        "2024-01-02 8:30 PST",
+        "01/02/2024 08:30 AM",
+        "13/13/2024",
+        "not-a-date",
+    ]
+    for text in samples:
+        expected = date_utils._parse_datetime_cascade(text.rstrip("Z"))
+        assert date_utils._try_parse_datetime(text) == expected, text
+
+
+def test_try_parse_datetime_memoizes_repeated_values(monkeypatch):
+    date_utils._try_parse_datetime.cache_clear()
+    calls = []
+    original = date_utils._sniff_datetime
+
+    def tracking(text):
+        calls.append(text)
+        return original(text)
+
+    monkeypatch.setattr(date_utils, "_sniff_datetime", tracking)
+    try:
+        for _ in range(3):
+            assert date_utils._try_parse_datetime("03/04/2024") == datetime(2024, 3, 4)
+        assert calls == ["03/04/2024"]
+    finally:
+        date_utils._try_parse_datetime.cache_clear()
+
+
 def test_format_records_dates_auto_detects_date_like_keys():
     records = [
         {
@@ -69,3 +110,22 @@ def test_normalize_payload_dates_respects_fields_allow_list():
     result = date_utils.normalize_payload_dates(payload, fields={"EndDate"})
     assert result["StartDate"] == "2024-01-02"
     assert result["EndDate"] == date(2024, 1, 3)
+
+
+def test_format_records_dates_plans_each_shape_once():
+    date_utils._date_column_plan.cache_clear()
+    records = [
+        {"PolicyNum": "P1", "EffDate": date(2024, 1, 2)},
+        {"PolicyNum": "P2", "EffDate": date(2024, 1, 3)},
+        {"PolicyNum": "P3", "EffDate": None, "dt_cancel": "2024-02-01"},
+    ]
+
+    result = date_utils.format_records_dates(records)
+
+    assert [row["EffDate"] for row in result] == ["01-02-2024", "01-03-2024", None]
+    assert result[2]["dt_cancel"] == "02-01-2024"
+    assert result[0]["PolicyNum"] == "P1"
+    assert date_utils._date_column_plan.cache_info().misses == 2
+
+    date_utils.format_records_dates([{"PolicyNum": "P4", "EffDate": date(2024, 1, 4)}])
+    assert date_utils._date_column_plan.cache_info().hits == 1
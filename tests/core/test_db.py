@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import struct
+import time
 from datetime import datetime, timedelta, timezone
 
 import pytest
 
 import db
+from core import db_executor
 
 
 def test_build_connection_string_uses_settings(monkeypatch):
@@ -98,19 +102,324 @@ def test_get_raw_connection_ignores_converter_errors(monkeypatch):
     assert isinstance(conn, FakeConn)
 
 
-def test_db_connection_context_manager_closes_connection(monkeypatch):
-    class FakeConn:
-        def __init__(self):
-            self.closed = False
+class FakePooledConn:
+    def __init__(self, ping_ok=True):
+        self.closed = False
+        self.rolled_back = 0
+        self.ping_ok = ping_ok
+
+    def cursor(self):
+        conn = self
+
+        class FakeCursor:
+            def execute(self, query):
+                if not conn.ping_ok:
+                    raise RuntimeError("connection is dead")
+
+            def fetchall(self):
+                return [(1,)]
+
+            def close(self):
+                return None
+
+        return FakeCursor()
+
+    def rollback(self):
+        self.rolled_back += 1
+
+    def close(self):
+        self.closed = True
+
+
+def _make_pool(created, **kwargs):
+    def creator():
+        conn = FakePooledConn()
+        created.append(conn)
+        return conn
+
+    options = {"max_size": 2, "timeout": 0.05, "recycle_seconds": 0}
+    options.update(kwargs)
+    return db.ConnectionPool(creator, **options)
+
+
+def test_db_connection_context_manager_reuses_pooled_connection(monkeypatch):
+    created = []
+
+    def fake_get_raw_connection():
+        conn = FakePooledConn()
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(db, "_pool", None)
+    monkeypatch.setattr(db, "get_raw_connection", fake_get_raw_connection)
+
+    with db.db_connection() as first:
+        assert first is created[0]
+
+    with db.db_connection() as second:
+        assert second is first
+
+    assert len(created) == 1
+    assert first.closed is False
+    assert first.rolled_back == 2
+
+    db.dispose_pool()
+    assert first.closed is True
+
+
+def test_connection_pool_times_out_when_exhausted():
+    created = []
+    pool = _make_pool(created, max_size=1)
+
+    pool.acquire()
+    with pytest.raises(db.PoolTimeoutError):
+        pool.acquire()
+
+
+def test_connection_pool_recycles_connections_past_max_age(monkeypatch):
+    created = []
+    pool = _make_pool(created, recycle_seconds=10)
+    clock = {"now": 100.0}
+    monkeypatch.setattr(db.time, "monotonic", lambda: clock["now"])
+
+    conn = pool.acquire()
+    pool.release(conn)
+    clock["now"] += 11
+
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert conn.closed is True
+    assert pool.stats()["size"] == 1
+
+
+def test_connection_pool_replaces_connection_failing_health_check():
+    created = []
+    pool = _make_pool(created)
+
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.ping_ok = False
+
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert conn.closed is True
+    assert len(created) == 2
+
+
+def test_connection_pool_discards_connection_when_rollback_fails():
+    created = []
+    pool = _make_pool(created)
+
+    conn = pool.acquire()
+
+    def broken_rollback():
+        raise RuntimeError("broken")
+
+    conn.rollback = broken_rollback
+    pool.release(conn)
+
+    assert conn.closed is True
+    assert pool.stats() == {"max_size": 2, "size": 0, "idle": 0, "in_use": 0}
+
+
+class FakeTxnConn(FakePooledConn):
+    def __init__(self):
+        super().__init__()
+        self.committed = 0
+
+    def commit(self):
+        self.committed += 1
+
+
+def _use_txn_pool(monkeypatch, created):
+    def creator():
+        conn = FakeTxnConn()
+        created.append(conn)
+        return conn
 
-        def close(self):
-            self.closed = True
+    pool = db.ConnectionPool(creator, max_size=2, timeout=0.05, recycle_seconds=0)
+    monkeypatch.setattr(db, "_pool", pool)
+    return pool
 
-    fake_conn = FakeConn()
-    monkeypatch.setattr(db, "get_raw_connection", lambda: fake_conn)
 
+def _helper_write():
+    # Mirrors the DB helpers: open a connection, execute, commit.
     with db.db_connection() as conn:
-        assert conn is fake_conn
-        assert fake_conn.closed is False
+        conn.cursor().execute("UPDATE t SET x = 1")
+        conn.commit()
+        return conn._conn
+
+
+def test_unit_of_work_shares_one_connection_and_commits_once(monkeypatch):
+    created = []
+    pool = _use_txn_pool(monkeypatch, created)
+
+    async def run():
+        async with db.unit_of_work() as unit:
+            first = await db.run_db(_helper_write)
+            second = await db.run_db(_helper_write)
+            assert unit.borrowed
+            assert first.committed == 0
+            return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first is second
+    assert len(created) == 1
+    assert first.committed == 1
+    assert pool.stats()["in_use"] == 0
+
+
+def test_unit_of_work_rolls_back_on_error(monkeypatch):
+    created = []
+    pool = _use_txn_pool(monkeypatch, created)
+
+    async def run():
+        async with db.unit_of_work():
+            await db.run_db(_helper_write)
+            raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+    conn = created[0]
+    assert conn.committed == 0
+    # Once by the unit of work, once more on return to the pool.
+    assert conn.rolled_back == 2
+    assert pool.stats()["in_use"] == 0
+
+
+def _helper_failing_write():
+    # Mirrors the DB helpers' error path: roll back, then re-raise.
+    with db.db_connection() as conn:
+        conn.cursor().execute("UPDATE t SET x = 2")
+        try:
+            raise RuntimeError("write failed")
+        except RuntimeError:
+            conn.rollback()
+            raise
+
+
+def test_unit_of_work_caught_helper_failure_cannot_commit(monkeypatch):
+    created = []
+    pool = _use_txn_pool(monkeypatch, created)
+
+    async def run():
+        async with db.unit_of_work() as unit:
+            await db.run_db(_helper_write)
+            with pytest.raises(RuntimeError):
+                await db.run_db(_helper_failing_write)
+            assert unit.rollback_only
+
+    with pytest.raises(db.UnitOfWorkRollbackError):
+        asyncio.run(run())
+
+    conn = created[0]
+    assert conn.committed == 0
+    assert conn.rolled_back >= 1
+    assert pool.stats()["in_use"] == 0
+
+
+def test_unit_of_work_explicit_rollback_clears_rollback_only(monkeypatch):
+    created = []
+    _use_txn_pool(monkeypatch, created)
+
+    async def run():
+        async with db.unit_of_work() as unit:
+            with pytest.raises(RuntimeError):
+                await db.run_db(_helper_failing_write)
+            await unit.rollback()
+            assert not unit.rollback_only
+            await db.run_db(_helper_write)
+
+    asyncio.run(run())
+
+    assert created[0].committed == 1
+
+
+def test_unit_of_work_is_not_starved_by_calls_waiting_for_the_pool(monkeypatch):
+    created = []
+
+    def creator():
+        conn = FakeTxnConn()
+        created.append(conn)
+        return conn
+
+    pool = db.ConnectionPool(creator, max_size=1, timeout=2, recycle_seconds=0)
+    monkeypatch.setattr(db, "_pool", pool)
+    monkeypatch.setattr(db_executor.settings, "DB_POOL_SIZE", 1, raising=False)
+    monkeypatch.setattr(db_executor.settings, "DB_EXECUTOR_WORKERS", 1, raising=False)
+    monkeypatch.setattr(db_executor.settings, "DB_CALL_TIMEOUT", 0, raising=False)
+    db_executor.shutdown_executor()
+
+    async def run():
+        async with db.unit_of_work():
+            # The unit holds the only connection across awaits ...
+            await db.run_db(_helper_write)
+            # ... while a plain call (another request, outside the unit) takes the
+            # only regular worker and waits for it.
+            waiting = asyncio.get_running_loop().create_task(
+                db.run_db(_helper_write), context=contextvars.Context()
+            )
+            await asyncio.sleep(0.05)
+            await db.run_db(_helper_write)
+        return await waiting
+
+    started = time.monotonic()
+    try:
+        conn = asyncio.run(run())
+    finally:
+        db_executor.shutdown_executor()
+
+    assert time.monotonic() - started < 1
+    assert conn is created[0]
+    assert conn.committed == 2
+    assert pool.stats()["in_use"] == 0
+
+
+def test_unit_of_work_nested_block_joins_outer(monkeypatch):
+    created = []
+    _use_txn_pool(monkeypatch, created)
+
+    async def run():
+        async with db.unit_of_work() as outer:
+            async with db.unit_of_work() as inner:
+                assert inner is outer
+                await db.run_db(_helper_write)
+            assert created[0].committed == 0
+            await db.run_db(_helper_write)
+
+    asyncio.run(run())
+
+    assert len(created) == 1
+    assert created[0].committed == 1
+
+
+def test_unit_of_work_borrows_lazily(monkeypatch):
+    created = []
+    pool = _use_txn_pool(monkeypatch, created)
+
+    async def run():
+        async with db.unit_of_work() as unit:
+            assert not unit.borrowed
+
+    asyncio.run(run())
+
+    assert created == []
+    assert pool.stats()["size"] == 0
+
+
+def test_db_connection_outside_unit_of_work_is_independent(monkeypatch):
+    created = []
+    _use_txn_pool(monkeypatch, created)
+
+    async def run():
+        async with db.unit_of_work():
+            await db.run_db(_helper_write)
+        return await db.run_db(_helper_write)
+
+    conn = asyncio.run(run())
 
-    assert fake_conn.closed is True
+    # The pool hands back the same idle connection, but it commits on its own.
+    assert conn is created[0]
+    assert conn.committed == 2
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+import db
+from core import db_executor
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor(monkeypatch):
+    monkeypatch.setattr(db_executor, "_executor", None)
+    monkeypatch.setattr(db_executor, "_metrics", db_executor._ExecutorMetrics())
+    monkeypatch.setattr(db_executor.settings, "DB_EXECUTOR_WORKERS", 2, raising=False)
+    monkeypatch.setattr(db_executor.settings, "DB_CALL_TIMEOUT", 0, raising=False)
+    yield
+    db_executor.shutdown_executor()
+
+
+def test_run_db_runs_on_dedicated_worker_and_records_metrics():
+    def work(value, *, scale):
+        return threading.current_thread().name, value * scale
+
+    thread_name, result = asyncio.run(db_executor.run_db(work, 2, scale=3))
+
+    assert result == 6
+    assert thread_name.startswith("db-worker")
+    stats = db_executor.executor_stats()
+    assert stats["workers"] == 2
+    assert stats["submitted"] == 1
+    assert stats["completed"] == 1
+    assert stats["queued"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_run_db_timeout_cancels_running_statement():
+    started = threading.Event()
+    cancelled = threading.Event()
+
+    class FakeCursor:
+        def cancel(self):
+            cancelled.set()
+
+    def slow_query():
+        call = db_executor.current_call()
+        call.register_cursor(FakeCursor())
+        started.set()
+        if not cancelled.wait(2):
+            raise AssertionError("statement was not cancelled")
+        raise RuntimeError("Operation canceled")
+
+    with pytest.raises(db_executor.DbCallTimeoutError):
+        asyncio.run(db_executor.run_db(slow_query, timeout=0.05))
+
+    assert started.is_set()
+    assert cancelled.is_set()
+    db_executor.shutdown_executor()
+    stats = db_executor.executor_stats()
+    assert stats["timed_out"] == 1
+    assert stats["failed"] == 1
+
+
+def test_run_db_propagates_function_timeout_errors():
+    def exhausted():
+        raise db.PoolTimeoutError("pool exhausted")
+
+    with pytest.raises(db.PoolTimeoutError):
+        asyncio.run(db_executor.run_db(exhausted, timeout=1))
+
+    assert db_executor.executor_stats()["timed_out"] == 0
+
+
+def test_cancelled_call_is_skipped_before_it_starts():
+    call = db_executor.DbCall()
+    call.cancel()
+
+    db_executor._metrics.on_submit()
+    with pytest.raises(db_executor.DbCallCancelledError):
+        db_executor._run_tracked(call, 0.0, lambda: "never")
+
+    assert db_executor.executor_stats()["queued"] == 0
+
+
+def test_db_connection_tracks_cursors_inside_executor_calls(monkeypatch):
+    class FakeConn:
+        def cursor(self):
+            return object()
+
+    class FakePool:
+        def acquire(self):
+            return fake_conn
+
+        def release(self, conn):
+            released.append(conn)
+
+    fake_conn = FakeConn()
+    released = []
+    monkeypatch.setattr(db, "get_pool", lambda: FakePool())
+
+    def open_cursor():
+        with db.db_connection() as conn:
+            assert conn is not fake_conn
+            cursor = conn.cursor()
+        return cursor, db_executor.current_call()
+
+    cursor, call = asyncio.run(db_executor.run_db(open_cursor))
+
+    assert call._cursors == [cursor]
+    assert released == [fake_conn]
+
+    with db.db_connection() as conn:
+        assert conn is fake_conn
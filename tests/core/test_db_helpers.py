@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import asyncio
+import threading
+import time
 from contextlib import contextmanager
 
-import pandas as pd
 import pytest
 
-from core import db_helpers
+from core import db_executor, db_helpers
 
 
 def test_ensure_safe_identifier_rejects_invalid():
@@ -36,52 +37,409 @@ def test_build_select_query_with_filters_and_order():
     assert params == [1, 2]
 
 
+def test_build_select_query_keyset_page():
+    query, params = db_helpers.build_select_query(
+        "MyTable", {"A": 1}, order_by=["B", "C"], page_size=10, after=["x", None]
+    )
+    assert query == (
+        "SELECT * FROM MyTable WHERE A = ? AND ((B > ?) OR (B = ? AND C IS NOT NULL))"
+        " ORDER BY B, C OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+    )
+    assert params == [1, "x", "x", 11]
+
+
+def test_build_select_query_pushes_conditions_into_where():
+    query, params = db_helpers.build_select_query(
+        "MyTable",
+        {"A": 1},
+        conditions=[
+            db_helpers.NOT_RETIRED_STAGE,
+            db_helpers.ColumnCondition("DeletedAt", None),
+            db_helpers.ColumnCondition("Owner", "x", negate=True),
+        ],
+    )
+    assert query == (
+        "SELECT * FROM MyTable WHERE A = ?"
+        " AND (Stage IS NULL OR LOWER(LTRIM(RTRIM(Stage))) <> ?)"
+        " AND DeletedAt IS NULL AND Owner <> ?"
+    )
+    assert params == [1, "retired", "x"]
+
+
+def test_render_conditions_qualifies_and_validates_columns():
+    clauses, params = db_helpers.render_conditions(
+        [db_helpers.ColumnCondition("Stage", " Active ", normalized=True)], "t"
+    )
+    assert clauses == ["LOWER(LTRIM(RTRIM(t.Stage))) = ?"]
+    assert params == ["active"]
+
+    with pytest.raises(ValueError):
+        db_helpers.render_conditions([db_helpers.ColumnCondition("Bad Col", 1)])
+
+
+def test_build_select_query_pagination_requires_order_by():
+    with pytest.raises(ValueError):
+        db_helpers.build_select_query("MyTable", page_size=10)
+
+
+def test_build_keyset_page_query_wraps_query_without_its_order_by():
+    query, params = db_helpers.build_keyset_page_query(
+        """
+        SELECT CustomerName AS [Customer Name], CustomerNum AS [Customer Number]
+        FROM tblAcctSpecial
+        ORDER BY tblAcctSpecial.CustomerName;
+        """,
+        ["Customer Name", "Customer Number"],
+        page_size=100,
+        after=[None, "C1"],
+    )
+
+    assert "ORDER BY tblAcctSpecial" not in query
+    assert query.startswith("SELECT * FROM (SELECT CustomerName")
+    assert query.endswith(
+        ") AS page_source WHERE (([Customer Name] IS NOT NULL)"
+        " OR ([Customer Name] IS NULL AND [Customer Number] > ?))"
+        " ORDER BY [Customer Name], [Customer Number] OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+    )
+    assert params == ["C1", 101]
+
+
+def test_build_keyset_page_query_rejects_unsafe_columns():
+    with pytest.raises(ValueError):
+        db_helpers.build_keyset_page_query("SELECT 1", ["Bad]Name"], page_size=1)
+
+
 def test_build_select_query_without_filters():
     query, params = db_helpers.build_select_query("MyTable")
     assert query == "SELECT * FROM MyTable"
     assert params == []
 
 
-def test_fetch_records_converts_nan_to_none(monkeypatch):
-    captured = {}
+def test_compile_filter_operators():
+    assert db_helpers.compile_filter("A", 1) == ("A = ?", [1])
+    assert db_helpers.compile_filter("PK_Number__in", "3, 1,3") == ("PK_Number IN (?, ?)", ["3", "1"])
+    assert db_helpers.compile_filter("D__between", ["a", "b"]) == ("D BETWEEN ? AND ?", ["a", "b"])
+    assert db_helpers.compile_filter("D__gte", "2024-01-01") == ("D >= ?", ["2024-01-01"])
+    assert db_helpers.compile_filter("D__lte", 5) == ("D <= ?", [5])
+    assert db_helpers.compile_filter("B__prefix", "N_Y") == ("B LIKE ?", ["N[_]Y%"])
+    assert db_helpers.compile_filter("B__prefix", ["NY", "50%"]) == (
+        "(B LIKE ? OR B LIKE ?)",
+        ["NY%", "50[%]%"],
+    )
+    assert db_helpers.compile_filter("C__is_null", "true") == ("C IS NULL", [])
+    assert db_helpers.compile_filter("C__is_null", False) == ("C IS NOT NULL", [])
+    # Unknown suffixes are part of the column name.
+    assert db_helpers.compile_filter("Odd__name", 1) == ("Odd__name = ?", [1])
+
+
+@pytest.mark.parametrize(
+    "key, value",
+    [("A__in", ""), ("A__between", "1"), ("A__is_null", "maybe"), ("A;--__in", "1")],
+)
+def test_compile_filter_rejects_bad_values(key, value):
+    with pytest.raises(ValueError):
+        db_helpers.compile_filter(key, value)
+
+
+def test_sanitize_filters_checks_operator_keys_by_column():
+    allowed = {"CustomerNum"}
+    assert db_helpers.sanitize_filters({"CustomerNum__in": "1,2"}, allowed) == {
+        "CustomerNum__in": "1,2"
+    }
+    with pytest.raises(ValueError, match="Other__in"):
+        db_helpers.sanitize_filters({"Other__in": "1"}, allowed)
+
+
+def test_fetch_records_splits_large_in_filters(monkeypatch):
+    executed = []
+
+    class ChunkCursor:
+        description = [("A", None, None, None, None, None, True)]
+
+        def execute(self, query, params):
+            executed.append((query, params))
+            self._rows = [(value,) for value in params[:-1]]
+
+        def fetchall(self):
+            return self._rows
+
+    class FakeConn:
+        def cursor(self):
+            return ChunkCursor()
 
     @contextmanager
     def fake_db_connection():
-        yield object()
-
-    def fake_read_sql(query, conn, params=None):
-        captured["query"] = query
-        captured["params"] = params
-        return pd.DataFrame([{"A": 1, "B": None}, {"A": 2, "B": float("nan")}])
+        yield FakeConn()
 
     monkeypatch.setattr(db_helpers, "db_connection", fake_db_connection)
-    monkeypatch.setattr(pd, "read_sql", fake_read_sql)
+    monkeypatch.setattr(db_helpers, "_MAX_STATEMENT_PARAMS", 3)
+
+    result = db_helpers.fetch_records("MyTable", {"A__in": [5, 1, 2, 4, 3], "B": "x"}, "A")
+
+    assert [params for _, params in executed] == [[5, 1, "x"], [2, 4, "x"], [3, "x"]]
+    assert executed[0][0] == "SELECT * FROM MyTable WHERE A IN (?, ?) AND B = ? ORDER BY A"
+    assert result == [{"A": value} for value in (1, 2, 3, 4, 5)]
+
+    with pytest.raises(ValueError, match="Pagination"):
+        db_helpers.fetch_records("MyTable", {"A__in": [1, 2, 3, 4]}, "A", page_size=2)
+
+
+class FakeSelectCursor:
+    def __init__(self, columns, rows, captured):
+        self.description = [(name, None, None, None, None, None, True) for name in columns]
+        self._rows = rows
+        self._captured = captured
+
+    def execute(self, query, params):
+        self._captured["query"] = query
+        self._captured["params"] = params
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+def _fake_select_connection(columns, rows, captured):
+    class FakeConn:
+        def cursor(self):
+            return FakeSelectCursor(columns, rows, captured)
+
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConn()
+
+    return fake_db_connection
+
+
+def test_fetch_records_builds_records_from_cursor(monkeypatch):
+    captured = {}
+    monkeypatch.setattr(
+        db_helpers,
+        "db_connection",
+        _fake_select_connection(["A", "B"], [(1, None), (2, "x")], captured),
+    )
 
     result = db_helpers.fetch_records("MyTable", {"A": 1}, order_by="A")
     assert captured["query"] == "SELECT * FROM MyTable WHERE A = ? ORDER BY A"
     assert captured["params"] == [1]
-    assert result == [{"A": 1, "B": None}, {"A": 2, "B": None}]
+    assert result == [{"A": 1, "B": None}, {"A": 2, "B": "x"}]
 
 
 def test_run_raw_query_uses_params(monkeypatch):
     captured = {}
+    monkeypatch.setattr(
+        db_helpers, "db_connection", _fake_select_connection(["A"], [(1,)], captured)
+    )
+
+    result = db_helpers.run_raw_query("SELECT 1", [10])
+    assert captured["query"] == "SELECT 1"
+    assert captured["params"] == [10]
+    assert result == [{"A": 1}]
+
+
+def test_rows_to_records_subsets_columns_in_requested_order():
+    cursor = FakeSelectCursor(["A", "B", "C"], [(1, 2, 3), (4, 5, 6)], {})
+
+    result = db_helpers.rows_to_records(cursor, columns=["C", "A"])
+    assert result == [{"C": 3, "A": 1}, {"C": 6, "A": 4}]
+
+    with pytest.raises(ValueError):
+        db_helpers.rows_to_records(cursor, columns=["Missing"])
+
+
+def test_rows_to_records_handles_batches_and_statements_without_results():
+    cursor = FakeSelectCursor(["A"], [], {})
+    assert db_helpers.rows_to_records(cursor, [(7,), (8,)]) == [{"A": 7}, {"A": 8}]
+
+    cursor.description = None
+    assert db_helpers.rows_to_records(cursor) == []
+
+
+def test_run_raw_query_sets_reads_each_result_set(monkeypatch):
+    captured = {}
+
+    class FakeMultiCursor:
+        def __init__(self):
+            self.sets = [(["a"], [(1,), (2,)]), (["b", "c"], [("x", None)])]
+            self.index = 0
+
+        @property
+        def description(self):
+            return [(name,) for name in self.sets[self.index][0]]
+
+        def execute(self, query, params):
+            captured["query"] = query
+            captured["params"] = params
+
+        def fetchall(self):
+            return self.sets[self.index][1]
+
+        def nextset(self):
+            self.index += 1
+            return self.index < len(self.sets)
+
+    class FakeConn:
+        def cursor(self):
+            return FakeMultiCursor()
+
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConn()
+
+    monkeypatch.setattr(db_helpers, "db_connection", fake_db_connection)
+
+    result = db_helpers.run_raw_query_sets(
+        [("SELECT a FROM t;", []), ("SELECT b, c FROM u WHERE d = ?", [5])]
+    )
+
+    assert result == [[{"a": 1}, {"a": 2}], [{"b": "x", "c": None}]]
+    assert captured["query"] == "SELECT a FROM t;\nSELECT b, c FROM u WHERE d = ?"
+    assert captured["params"] == [5]
+
+
+def test_iter_raw_query_batches_uses_fetchmany(monkeypatch):
+    captured = {"sizes": []}
+
+    class FakeCursor:
+        description = [("A",)]
+
+        def __init__(self):
+            self._rows = [(1,), (2,), (3,)]
+
+        def execute(self, query, params):
+            captured["query"] = query
+
+        def fetchmany(self, size):
+            captured["sizes"].append(size)
+            batch, self._rows = self._rows[:size], self._rows[size:]
+            return batch
+
+    class FakeConn:
+        def cursor(self):
+            return FakeCursor()
 
     @contextmanager
     def fake_db_connection():
-        yield object()
+        yield FakeConn()
+
+    monkeypatch.setattr(db_helpers, "db_connection", fake_db_connection)
+
+    batches = list(db_helpers.iter_raw_query_batches("SELECT A", batch_size=2))
+
+    assert batches == [[{"A": 1}, {"A": 2}], [{"A": 3}]]
+    assert captured["sizes"] == [2, 2, 2]
+
+
+def _streaming_connection(rows, seen_calls):
+    class FakeCursor:
+        description = [("A",)]
+
+        def execute(self, query, params):
+            pass
 
-    def fake_read_sql(query, conn, params=None):
-        captured["query"] = query
-        captured["params"] = params
-        return pd.DataFrame([{"A": 1}])
+        def fetchmany(self, size):
+            call = db_helpers.current_call()
+            seen_calls.append((call, self in call._cursors))
+            batch = rows[:size]
+            del rows[:size]
+            return batch
+
+        def cancel(self):
+            pass
+
+    class FakeConn:
+        def cursor(self):
+            return db_helpers.current_call().register_cursor(FakeCursor())
+
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConn()
+
+    return fake_db_connection
+
+
+def test_stream_raw_query_async_registers_cursor_with_each_batch_call(monkeypatch):
+    seen_calls = []
+    monkeypatch.setattr(
+        db_helpers, "db_connection", _streaming_connection([(1,), (2,), (3,)], seen_calls)
+    )
 
+    async def run():
+        stream = db_helpers.stream_raw_query_async("SELECT A", batch_size=1)
+        return [batch async for batch in stream]
+
+    assert asyncio.run(run()) == [[{"A": 1}], [{"A": 2}], [{"A": 3}]]
+    # Every fetch can be cancelled through the call it runs under.
+    assert len({id(call) for call, _ in seen_calls}) == len(seen_calls) == 4
+    assert all(registered for _, registered in seen_calls)
+
+
+def test_stream_raw_query_async_limits_concurrent_streams(monkeypatch):
+    monkeypatch.setattr(db_helpers.settings, "DB_STREAM_LIMIT", 1, raising=False)
+    monkeypatch.setattr(db_helpers, "db_connection", _streaming_connection([(1,), (2,)], []))
+
+    async def run():
+        first = db_helpers.stream_raw_query_async("SELECT A", batch_size=1)
+        await anext(first)
+        second = db_helpers.stream_raw_query_async("SELECT A", batch_size=1)
+        with pytest.raises(db_helpers.StreamLimitError):
+            await anext(second)
+        await first.aclose()
+        assert db_helpers._stream_slots.active == 0
+
+    asyncio.run(run())
+
+
+def test_stream_raw_query_async_closes_after_a_timed_out_fetch(monkeypatch):
+    cancelled = threading.Event()
+    released = []
+
+    class SlowCursor:
+        description = [("A",)]
+
+        def __init__(self):
+            self.fetches = 0
+
+        def execute(self, query, params):
+            pass
+
+        def fetchmany(self, size):
+            self.fetches += 1
+            if self.fetches == 1:
+                return [(1,)]
+            # The second fetch hangs until the timeout cancels it, then lingers
+            # briefly as a driver would while the server aborts the statement.
+            cancelled.wait(2)
+            time.sleep(0.1)
+            raise RuntimeError("Operation canceled")
+
+        def cancel(self):
+            cancelled.set()
+
+    class FakeConn:
+        def cursor(self):
+            return db_helpers.current_call().register_cursor(SlowCursor())
+
+    @contextmanager
+    def fake_db_connection():
+        try:
+            yield FakeConn()
+        finally:
+            released.append(True)
+
+    monkeypatch.setattr(db_helpers.settings, "DB_CALL_TIMEOUT", 0.05, raising=False)
     monkeypatch.setattr(db_helpers, "db_connection", fake_db_connection)
-    monkeypatch.setattr(pd, "read_sql", fake_read_sql)
 
-    result = db_helpers.run_raw_query("SELECT 1", [10])
-    assert captured["query"] == "SELECT 1"
-    assert captured["params"] == [10]
-    assert result == [{"A": 1}]
+    async def run():
+        stream = db_helpers.stream_raw_query_async("SELECT A", batch_size=1)
+        assert await anext(stream) == [{"A": 1}]
+        with pytest.raises(db_executor.DbCallTimeoutError):
+            await anext(stream)
+
+    asyncio.run(run())
+
+    assert cancelled.is_set()
+    assert released == [True]
+    assert db_helpers._stream_slots.active == 0
 
 
 def test_merge_upsert_records_builds_merge_query(monkeypatch):
@@ -216,6 +574,70 @@ def test_merge_upsert_records_preserves_insert_datetime_on_update(monkeypatch):
     assert values == [1, "Alice", timestamp, timestamp]
 
 
+class RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, query, values):
+        self.executed.append((query, values))
+
+
+def test_execute_merge_batches_merges_rows_in_one_statement_per_column_set():
+    cursor = RecordingCursor()
+
+    statements = db_helpers.execute_merge_batches(
+        cursor,
+        "MyTable",
+        [
+            {"id": 1, "name": "Alice"},
+            {"id": 2, "name": "Bob"},
+            {"id": 3, "email": "c@example.com"},
+            {"id": 1, "name": "Alicia"},
+        ],
+        ["id"],
+    )
+
+    assert statements == 2
+    first_query, first_values = cursor.executed[0]
+    assert "USING (VALUES (?, ?), (?, ?)) AS source (id, name)" in first_query
+    # Duplicate keys collapse to the last occurrence.
+    assert first_values == [1, "Alicia", 2, "Bob"]
+    second_query, second_values = cursor.executed[1]
+    assert "AS source (id, email)" in second_query
+    assert second_values == [3, "c@example.com"]
+
+
+def test_execute_merge_batches_dedupes_keys_the_way_the_collation_compares_them():
+    cursor = RecordingCursor()
+
+    db_helpers.execute_merge_batches(
+        cursor,
+        "MyTable",
+        [
+            {"code": "abc", "name": "first"},
+            {"code": "ABC  ", "name": "second"},
+            {"code": "abd", "name": "other"},
+        ],
+        ["code"],
+    )
+
+    # "abc" and "ABC  " match the same row, which one MERGE may not update twice.
+    query, values = cursor.executed[0]
+    assert "USING (VALUES (?, ?), (?, ?)) AS source (code, name)" in query
+    assert values == ["ABC  ", "second", "abd", "other"]
+
+
+def test_execute_merge_batches_chunks_by_parameter_limit(monkeypatch):
+    monkeypatch.setattr(db_helpers, "_MAX_STATEMENT_PARAMS", 4)
+    cursor = RecordingCursor()
+    rows = [{"id": i, "name": f"n{i}"} for i in range(5)]
+
+    statements = db_helpers.execute_merge_batches(cursor, "MyTable", rows, ["id"])
+
+    assert statements == 3
+    assert [len(values) for _, values in cursor.executed] == [4, 4, 2]
+
+
 def test_insert_records_builds_insert_query(monkeypatch):
     executed = []
     monkeypatch.setattr(
@@ -225,8 +647,10 @@ def test_insert_records_builds_insert_query(monkeypatch):
     )
 
     class FakeCursor:
-        def execute(self, query, values):
-            executed.append((query, values))
+        fast_executemany = False
+
+        def executemany(self, query, values):
+            executed.append((query, values, self.fast_executemany))
 
     class FakeConn:
         def cursor(self):
@@ -243,22 +667,232 @@ def test_insert_records_builds_insert_query(monkeypatch):
 
     monkeypatch.setattr(db, "db_connection", fake_db_connection)
 
-    result = db_helpers.insert_records("MyTable", [{"id": 1, "name": "Bob"}])
-    assert result == {"message": "Insertion successful", "count": 1}
-    query, values = executed[0]
+    result = db_helpers.insert_records(
+        "MyTable",
+        [{"id": 1, "name": "Bob"}, {"id": 2, "name": "Eve"}, {"id": 3}],
+    )
+    assert result == {"message": "Insertion successful", "count": 3}
+    assert len(executed) == 2
+    query, values, fast = executed[0]
     assert query == "INSERT INTO MyTable (id, name) VALUES (?, ?)"
-    assert values == [1, "Bob"]
+    assert values == [[1, "Bob"], [2, "Eve"]]
+    assert fast is True
+    assert executed[1][:2] == ("INSERT INTO MyTable (id) VALUES (?)", [[3]])
 
 
-def test_add_update_datetime_if_supported_adds_utc_timestamp(monkeypatch):
+def test_insert_records_returning_maps_output_rows_to_inputs(monkeypatch):
+    executed = []
+    monkeypatch.setattr(
+        db_helpers,
+        "add_update_datetime_if_supported",
+        lambda cursor, table, rows, **kwargs: rows,
+    )
+
+    monkeypatch.setattr(
+        db_helpers,
+        "get_table_schema",
+        lambda cursor, table: db_helpers.TableSchema(
+            name=table,
+            columns={"id": "numeric", "name": "varchar", "code": "char"},
+            identity_columns=("id",),
+        ),
+    )
+
     class FakeCursor:
+        description = None
+
         def execute(self, query, values):
-            assert "sys.columns" in query
-            assert values == ["MyTable", "UpdateDateTime"]
+            executed.append((query, values))
+            # The MERGE row count comes first; the SELECT from @inserted follows.
+            self.description = None
+            # OUTPUT order is not the VALUES order; the source row number maps it back.
+            ordinals = values[2::3] if "(name, code, _source_row)" in query else values[1::2]
+            self._rows = [(ordinal, 100 + ordinal) for ordinal in reversed(ordinals)]
+
+        def nextset(self):
+            self.description = [("_source_row",), ("id",)]
+            return True
 
-        def fetchone(self):
-            return (1,)
+        def fetchall(self):
+            assert self.description is not None
+            return self._rows
+
+    class FakeConn:
+        def cursor(self):
+            return FakeCursor()
+
+        def commit(self):
+            return None
+
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConn()
+
+    import db
 
+    monkeypatch.setattr(db, "db_connection", fake_db_connection)
+
+    result = db_helpers.insert_records(
+        "MyTable",
+        [{"name": "Bob", "code": "b"}, {"name": "Eve"}, {}, {"name": "Al", "code": "a"}],
+        returning=["id"],
+    )
+
+    assert result["inserted"] == [{"id": 100}, {"id": 101}, None, {"id": 103}]
+    assert len(executed) == 2
+    query, values = executed[0]
+    assert "USING (VALUES (?, ?, ?), (?, ?, ?)) AS source (name, code, _source_row)" in query
+    assert "ON 1 = 0" in query
+    # OUTPUT goes INTO a table variable so tables with triggers accept it.
+    assert "DECLARE @inserted TABLE (_source_row int, id numeric(38, 0));" in query
+    assert "OUTPUT source._source_row, INSERTED.id INTO @inserted (_source_row, id);" in query
+    assert "SELECT _source_row, id FROM @inserted;" in query
+    assert values == ["Bob", "b", 0, "Al", "a", 3]
+
+
+def test_output_column_type_widens_unsized_types():
+    schema = db_helpers.TableSchema(
+        name="MyTable",
+        columns={"id": "int", "code": "varchar", "amount": "decimal"},
+        identity_columns=("id",),
+    )
+
+    assert db_helpers._output_column_type(schema, "ID") == "int"
+    assert db_helpers._output_column_type(schema, "code") == "nvarchar(max)"
+    with pytest.raises(ValueError, match="non-identity decimal"):
+        db_helpers._output_column_type(schema, "amount")
+    with pytest.raises(ValueError, match="Unknown column"):
+        db_helpers._output_column_type(schema, "missing")
+
+
+def test_insert_record_returning_async_returns_the_generated_column(monkeypatch):
+    captured = {}
+
+    async def fake_insert_records_async(*, table, records, returning, timeout):
+        captured.update(table=table, records=records, returning=returning)
+        return {"count": 1, "inserted": [{"PK_Number": 10}]}
+
+    monkeypatch.setattr(db_helpers, "insert_records_async", fake_insert_records_async)
+
+    result = asyncio.run(
+        db_helpers.insert_record_returning_async("tblPolicies", {"PolicyNum": "P1"}, "PK_Number")
+    )
+
+    assert result == 10
+    assert captured == {
+        "table": "tblPolicies",
+        "records": [{"PolicyNum": "P1"}],
+        "returning": ["PK_Number"],
+    }
+
+
+class FakeSchemaCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, values=None):
+        self.executed.append((query, values))
+
+    def fetchall(self):
+        return self.rows
+
+
+AUDITED_COLUMNS = [
+    ("id", "int", True),
+    ("UpdateDateTime", "datetimeoffset", False),
+    ("InsertDateTime", "datetimeoffset", False),
+]
+
+
+def test_get_table_schema_caches_catalog_lookup():
+    cursor = FakeSchemaCursor(AUDITED_COLUMNS)
+
+    schema = db_helpers.get_table_schema(cursor, "MyTable")
+    again = db_helpers.get_table_schema(cursor, "mytable")
+
+    assert again is schema
+    assert len(cursor.executed) == 1
+    query, values = cursor.executed[0]
+    assert "sys.columns" in query
+    assert values == ["MyTable"]
+    assert schema.columns == {
+        "id": "int",
+        "UpdateDateTime": "datetimeoffset",
+        "InsertDateTime": "datetimeoffset",
+    }
+    assert schema.identity_columns == ("id",)
+    assert schema.supports_audit_columns
+    assert schema.has_column("updatedatetime")
+
+
+def test_get_table_schema_reloads_after_invalidate_or_ttl(monkeypatch):
+    cursor = FakeSchemaCursor(AUDITED_COLUMNS)
+
+    db_helpers.get_table_schema(cursor, "MyTable")
+    db_helpers.invalidate_schema_cache("MyTable")
+    db_helpers.get_table_schema(cursor, "MyTable")
+    assert len(cursor.executed) == 2
+
+    monkeypatch.setattr(db_helpers.settings, "DB_SCHEMA_CACHE_TTL", 0)
+    db_helpers.get_table_schema(cursor, "MyTable")
+    assert len(cursor.executed) == 3
+
+
+def test_resolve_projection_matches_cached_schema_columns():
+    db_helpers.get_table_schema(FakeSchemaCursor(AUDITED_COLUMNS), "MyTable")
+
+    columns = asyncio.run(
+        db_helpers.resolve_projection("MyTable", " ID, updatedatetime,,id ")
+    )
+    assert columns == ["id", "UpdateDateTime"]
+    assert asyncio.run(db_helpers.resolve_projection("MyTable", None)) is None
+    assert asyncio.run(db_helpers.resolve_projection("MyTable", " , ")) is None
+
+    with pytest.raises(ValueError, match="Invalid field\\(s\\): Nope"):
+        asyncio.run(db_helpers.resolve_projection("MyTable", ["id", "Nope"]))
+
+
+def test_build_select_query_projects_columns():
+    query, params = db_helpers.build_select_query("MyTable", {"A": 1}, columns=["A", "B"])
+    assert query == "SELECT A, B FROM MyTable WHERE A = ?"
+    assert params == [1]
+
+    with pytest.raises(ValueError, match="keyset"):
+        db_helpers.build_select_query("MyTable", order_by="C", columns=["A"], page_size=5)
+
+
+def test_warm_schema_cache_loads_all_tables_in_one_query(monkeypatch):
+    cursor = FakeSchemaCursor(
+        [
+            ("TableA", "id", "int", True),
+            ("TableA", "UpdateDateTime", "datetimeoffset", False),
+            ("TableB", "code", "varchar", False),
+        ]
+    )
+
+    class FakeConn:
+        def cursor(self):
+            return cursor
+
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConn()
+
+    import db
+
+    monkeypatch.setattr(db, "db_connection", fake_db_connection)
+
+    assert db_helpers.warm_schema_cache() == 2
+    assert len(cursor.executed) == 1
+
+    unused = FakeSchemaCursor([])
+    assert db_helpers.get_table_schema(unused, "TableA").supports_audit_columns
+    assert not db_helpers.get_table_schema(unused, "TableB").supports_audit_columns
+    assert unused.executed == []
+
+
+def test_add_update_datetime_if_supported_adds_utc_timestamp(monkeypatch):
     monkeypatch.setattr(
         db_helpers,
         "_utc_datetimeoffset_string",
@@ -266,26 +900,18 @@ def test_add_update_datetime_if_supported_adds_utc_timestamp(monkeypatch):
     )
     original = [{"id": 1, "UpdateDateTime": "client value"}]
 
-    result = db_helpers.add_update_datetime_if_supported(FakeCursor(), "MyTable", original)
+    result = db_helpers.add_update_datetime_if_supported(FakeSchemaCursor(AUDITED_COLUMNS), "MyTable", original)
 
     assert result == [{"id": 1, "UpdateDateTime": "2026-05-08 19:58:00.4800450 +00:00"}]
     assert original == [{"id": 1, "UpdateDateTime": "client value"}]
 
 
 def test_add_update_datetime_if_supported_adds_insert_timestamp_when_requested(monkeypatch):
-    class FakeCursor:
-        def execute(self, query, values):
-            assert "sys.columns" in query
-            assert values == ["MyTable", "UpdateDateTime"]
-
-        def fetchone(self):
-            return (1,)
-
     timestamp = "2026-05-08 19:58:00.4800450 +00:00"
     monkeypatch.setattr(db_helpers, "_utc_datetimeoffset_string", lambda: timestamp)
 
     result = db_helpers.add_update_datetime_if_supported(
-        FakeCursor(),
+        FakeSchemaCursor(AUDITED_COLUMNS),
         "MyTable",
         [{"id": 1, "InsertDateTime": "client value"}],
         include_insert_datetime=True,
@@ -301,15 +927,10 @@ def test_add_update_datetime_if_supported_adds_insert_timestamp_when_requested(m
 
 
 def test_add_update_datetime_if_supported_leaves_rows_unchanged_without_column():
-    class FakeCursor:
-        def execute(self, query, values):
-            return None
-
-        def fetchone(self):
-            return None
-
     original = [{"id": 1}]
-    result = db_helpers.add_update_datetime_if_supported(FakeCursor(), "MyTable", original)
+    result = db_helpers.add_update_datetime_if_supported(
+        FakeSchemaCursor([("id", "int", True)]), "MyTable", original
+    )
 
     assert result == original
     assert result is not original
@@ -339,22 +960,343 @@ def test_delete_records_builds_delete_query(monkeypatch):
 
     result = db_helpers.delete_records(
         "MyTable",
-        data_list=[{"id": 1, "name": "Bob"}],
+        data_list=[{"id": 1, "name": "Bob"}, {"id": 2, "name": "Eve"}],
         key_columns=["id", "name"],
     )
 
-    assert result == {"message": "Deletion successful", "count": 1}
+    assert result == {"message": "Deletion successful", "count": 2}
+    assert len(executed) == 1
     query, values = executed[0]
-    assert query == "DELETE FROM MyTable WHERE id = ? AND name = ?"
-    assert values == [1, "Bob"]
+    assert query == (
+        "DELETE target FROM MyTable AS target WHERE EXISTS ("
+        "SELECT 1 FROM (VALUES (?, ?), (?, ?)) AS doomed (id, name) "
+        "WHERE target.id = doomed.id AND target.name = doomed.name)"
+    )
+    assert values == [1, "Bob", 2, "Eve"]
+
+
+def test_delete_records_requires_key_columns():
+    with pytest.raises(ValueError):
+        db_helpers.execute_delete_batches(RecordingCursor(), "MyTable", [{"id": 1}], ["id", "name"])
+
+
+def test_select_existing_keys_echoes_requested_keys_with_lock():
+    class FakeCursor(RecordingCursor):
+        def fetchall(self):
+            return [("P", "c1")]
+
+    cursor = FakeCursor()
+    existing = db_helpers.select_existing_keys(
+        cursor, "MyTable", [("P", "c1"), ("P", "C2"), ("P", "c1")], ["Parent", "Child"], lock=True
+    )
+
+    assert existing == {("P", "c1")}
+    query, values = cursor.executed[0]
+    assert query == (
+        "SELECT wanted.Parent, wanted.Child FROM (VALUES (?, ?), (?, ?)) "
+        "AS wanted (Parent, Child) WHERE EXISTS ("
+        "SELECT 1 FROM MyTable AS target WITH (UPDLOCK, HOLDLOCK) "
+        "WHERE target.Parent = wanted.Parent AND target.Child = wanted.Child)"
+    )
+    assert values == ["P", "c1", "P", "C2"]
 
 
-def test_fetch_records_async_uses_threadpool(monkeypatch):
-    async def fake_run_in_threadpool(func):
-        return func()
+def test_insert_missing_records_inserts_only_absent_keys(monkeypatch):
+    executed = []
+    monkeypatch.setattr(
+        db_helpers,
+        "add_update_datetime_if_supported",
+        lambda cursor, table, rows, **kwargs: rows,
+    )
+
+    class FakeCursor:
+        fast_executemany = False
+
+        def execute(self, query, values):
+            executed.append((query, values))
+
+        def fetchall(self):
+            return [("P", "C1")]
+
+        def executemany(self, query, values):
+            executed.append((query, values))
+
+    class FakeConn:
+        committed = False
+
+        def cursor(self):
+            return FakeCursor()
+
+        def commit(self):
+            FakeConn.committed = True
+
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConn()
+
+    import db
+
+    monkeypatch.setattr(db, "db_connection", fake_db_connection)
+
+    result = db_helpers.insert_missing_records(
+        "MyTable",
+        [
+            {"Parent": "P", "Child": "C1"},
+            {"Parent": "P", "Child": "C2"},
+            {"Parent": "P", "Child": "C2"},
+        ],
+        ["Parent", "Child"],
+    )
+
+    assert result == {"message": "Insertion successful", "count": 1}
+    assert FakeConn.committed is True
+    assert len(executed) == 2
+    assert executed[0][1] == ["P", "C1", "P", "C2"]
+    assert executed[1] == ("INSERT INTO MyTable (Parent, Child) VALUES (?, ?)", [["P", "C2"]])
+
+
+def test_insert_missing_records_skips_insert_when_all_exist(monkeypatch):
+    inserted = []
+
+    class FakeCursor:
+        def execute(self, query, values):
+            self._rows = [tuple(values)]
+
+        def fetchall(self):
+            return self._rows
+
+        def executemany(self, query, values):
+            inserted.append(values)
+
+    class FakeConn:
+        def cursor(self):
+            return FakeCursor()
+
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConn()
+
+    import db
+
+    monkeypatch.setattr(db, "db_connection", fake_db_connection)
+
+    result = db_helpers.insert_missing_records("MyTable", [{"id": 1}], ["id"])
+
+    assert result == {"message": "No new records to insert", "count": 0}
+    assert inserted == []
+
+
+def test_insert_missing_records_requires_key_columns():
+    with pytest.raises(ValueError):
+        db_helpers.insert_missing_records("MyTable", [{"id": 1}], ["id", "name"])
+
+
+def _update(field, via, value, key):
+    return {"fieldName": field, "updateVia": via, "fieldValue": value, "updateViaValue": key}
+
+
+def test_execute_update_batches_runs_one_statement_per_group():
+    class CountingCursor(RecordingCursor):
+        rowcount = 0
+
+        def execute(self, query, values):
+            super().execute(query, values)
+            self.rowcount = len(values) // 2
+
+    cursor = CountingCursor()
+    groups = db_helpers.execute_update_batches(
+        cursor,
+        "MyTable",
+        [
+            _update("Status", "CustomerNum", "A", "1"),
+            _update("Owner", "CustomerNum", "Bob", "1"),
+            _update("Status", "CustomerNum", "B", "2"),
+            _update("Status", "CustomerNum", "C", "1"),
+        ],
+    )
+
+    assert groups == [
+        {"fieldName": "Status", "updateVia": "CustomerNum", "count": 2},
+        {"fieldName": "Owner", "updateVia": "CustomerNum", "count": 1},
+    ]
+    query, values = cursor.executed[0]
+    assert query == (
+        "UPDATE target SET target.Status = staged.field_value FROM MyTable AS target "
+        "JOIN (VALUES (?, ?), (?, ?)) AS staged (match_value, field_value) "
+        "ON target.CustomerNum = staged.match_value"
+    )
+    # The later update for the same key wins.
+    assert values == ["1", "C", "2", "B"]
+
+
+def test_execute_update_batches_keeps_field_order_across_match_columns():
+    cursor = RecordingCursor()
+    cursor.rowcount = 1
+    groups = db_helpers.execute_update_batches(
+        cursor,
+        "MyTable",
+        [
+            _update("Status", "CustomerNum", "A", "1"),
+            _update("Status", "PolicyNum", "B", "P1"),
+            _update("Status", "CustomerNum", "C", "2"),
+        ],
+    )
+
+    # The third update may overlap PolicyNum rows, so it can't run before them.
+    assert [(group["updateVia"], group["count"]) for group in groups] == [
+        ("CustomerNum", 1),
+        ("PolicyNum", 1),
+        ("CustomerNum", 1),
+    ]
+
+
+def test_execute_update_batches_keeps_order_after_match_column_is_written():
+    cursor = RecordingCursor()
+    cursor.rowcount = 1
+    groups = db_helpers.execute_update_batches(
+        cursor,
+        "MyTable",
+        [
+            _update("Status", "Region", "A", "East"),
+            _update("Region", "CustomerNum", "East", "7"),
+            _update("Status", "Region", "B", "East"),
+        ],
+    )
+
+    # Customer 7 only matches the third update after its Region was rewritten.
+    assert [(group["fieldName"], group["updateVia"]) for group in groups] == [
+        ("Status", "Region"),
+        ("Region", "CustomerNum"),
+        ("Status", "Region"),
+    ]
+    assert [values for _, values in cursor.executed] == [
+        ["East", "A"],
+        ["7", "East"],
+        ["East", "B"],
+    ]
+
+
+def test_execute_update_batches_keeps_writes_behind_groups_matching_on_the_field():
+    cursor = RecordingCursor()
+    cursor.rowcount = 1
+    groups = db_helpers.execute_update_batches(
+        cursor,
+        "MyTable",
+        [
+            _update("Status", "CustomerNum", "X", "1"),
+            _update("Owner", "Status", "Y", "X"),
+            _update("Status", "CustomerNum", "X", "2"),
+        ],
+    )
+
+    # Customer 2 only gets Status X after the Owner update has run.
+    assert [(group["fieldName"], group["updateVia"]) for group in groups] == [
+        ("Status", "CustomerNum"),
+        ("Owner", "Status"),
+        ("Status", "CustomerNum"),
+    ]
+    assert [values for _, values in cursor.executed] == [["1", "X"], ["X", "Y"], ["2", "X"]]
+
+
+def test_execute_update_batches_runs_updates_of_the_match_column_one_by_one():
+    cursor = RecordingCursor()
+    cursor.rowcount = 1
+    db_helpers.execute_update_batches(
+        cursor,
+        "MyTable",
+        [
+            _update("Code", "Code", "B", "A"),
+            _update("Code", "Code", "C", "B"),
+        ],
+    )
+
+    # Run together, the row renamed A -> B would not go on to become C.
+    assert [values for _, values in cursor.executed] == [["A", "B"], ["B", "C"]]
+
+
+def test_execute_update_batches_folds_match_values_the_way_the_collation_compares_them():
+    cursor = RecordingCursor()
+    cursor.rowcount = 1
+    db_helpers.execute_update_batches(
+        cursor,
+        "MyTable",
+        [
+            _update("Status", "PolicyNum", "A", "abc"),
+            _update("Status", "PolicyNum", "B", "P2"),
+            _update("Status", "PolicyNum", "C", "ABC "),
+        ],
+    )
+
+    # "abc" and "ABC " match the same row; the later value wins deterministically.
+    assert cursor.executed[0][1] == ["ABC ", "C", "P2", "B"]
+
+
+def test_execute_update_batches_chunks_large_groups(monkeypatch):
+    monkeypatch.setattr(db_helpers, "_MAX_STATEMENT_PARAMS", 4)
+    cursor = RecordingCursor()
+    cursor.rowcount = -1
+    updates = [_update("Status", "CustomerNum", "X", str(i)) for i in range(5)]
+
+    groups = db_helpers.execute_update_batches(cursor, "MyTable", updates)
+
+    assert [len(values) for _, values in cursor.executed] == [4, 4, 2]
+    assert groups == [{"fieldName": "Status", "updateVia": "CustomerNum", "count": 0}]
+
+
+def test_update_records_commits_all_groups_and_reports_counts(monkeypatch):
+    class FakeCursor(RecordingCursor):
+        rowcount = 3
+
+    class FakeConn:
+        committed = False
+
+        def cursor(self):
+            return FakeCursor()
+
+        def commit(self):
+            FakeConn.committed = True
+
+    @contextmanager
+    def fake_db_connection():
+        yield FakeConn()
+
+    import db
+
+    monkeypatch.setattr(db, "db_connection", fake_db_connection)
+
+    result = db_helpers.update_records(
+        "MyTable",
+        [_update("Status", "CustomerNum", "A", "1"), _update("Owner", "CustomerNum", "B", "1")],
+    )
+
+    assert FakeConn.committed is True
+    assert result == {
+        "message": "Update successful",
+        "count": 6,
+        "groups": [
+            {"fieldName": "Status", "updateVia": "CustomerNum", "count": 3},
+            {"fieldName": "Owner", "updateVia": "CustomerNum", "count": 3},
+        ],
+    }
+
+
+def test_update_records_rejects_unsafe_identifiers():
+    with pytest.raises(ValueError):
+        db_helpers.execute_update_batches(
+            RecordingCursor(), "MyTable", [_update("Status; DROP", "CustomerNum", "A", "1")]
+        )
+
+
+def test_fetch_records_async_uses_db_executor(monkeypatch):
+    captured = {}
+
+    async def fake_run_db(func, /, *args, timeout=None, **kwargs):
+        captured["timeout"] = timeout
+        return func(*args, **kwargs)
 
-    monkeypatch.setattr(db_helpers, "run_in_threadpool", fake_run_in_threadpool)
+    monkeypatch.setattr(db_helpers, "run_db", fake_run_db)
     monkeypatch.setattr(db_helpers, "fetch_records", lambda **kwargs: [{"ok": True}])
 
-    result = asyncio.run(db_helpers.fetch_records_async("MyTable"))
+    result = asyncio.run(db_helpers.fetch_records_async("MyTable", timeout=5))
     assert result == [{"ok": True}]
+    assert captured["timeout"] == 5
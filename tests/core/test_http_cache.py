@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+from starlette.requests import Request
+
+from core.http_cache import conditional_json_response, is_not_modified
+
+LAST_MODIFIED = datetime(2026, 5, 8, 19, 58, tzinfo=UTC)
+
+
+def _request(headers=None):
+    raw = [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    return Request({"type": "http", "query_string": b"", "headers": raw})
+
+
+def test_conditional_json_response_returns_body_with_validators():
+    response = conditional_json_response(
+        _request(), [{"id": 1}], etag='"abc"', last_modified=LAST_MODIFIED
+    )
+
+    assert response.status_code == 200
+    assert response.body == b'[{"id":1}]'
+    assert response.headers["ETag"] == '"abc"'
+    assert response.headers["Last-Modified"] == "Fri, 08 May 2026 19:58:00 GMT"
+
+
+def test_conditional_json_response_returns_304_for_matching_etag():
+    response = conditional_json_response(
+        _request({"If-None-Match": 'W/"old", "abc"'}),
+        [{"id": 1}],
+        etag='"abc"',
+        last_modified=LAST_MODIFIED,
+    )
+
+    assert response.status_code == 304
+    assert response.body == b""
+
+
+def test_is_not_modified_prefers_etag_over_date():
+    request = _request(
+        {"If-None-Match": '"other"', "If-Modified-Since": "Fri, 08 May 2026 19:58:00 GMT"}
+    )
+    assert not is_not_modified(request, '"abc"', LAST_MODIFIED)
+
+
+def test_is_not_modified_uses_if_modified_since():
+    assert is_not_modified(
+        _request({"If-Modified-Since": "Fri, 08 May 2026 19:58:00 GMT"}), '"abc"', LAST_MODIFIED
+    )
+    assert not is_not_modified(
+        _request({"If-Modified-Since": "Fri, 08 May 2026 19:57:59 GMT"}), '"abc"', LAST_MODIFIED
+    )
+    assert not is_not_modified(_request({"If-Modified-Since": "garbage"}), '"abc"', LAST_MODIFIED)
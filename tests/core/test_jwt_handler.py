@@ -66,6 +66,56 @@ def test_decode_refresh_token_expired(monkeypatch):
     assert excinfo.value.detail == "Refresh token expired"
 
 
+def test_decode_access_token_caches_verified_claims(monkeypatch):
+    monkeypatch.setattr(jwt_handler, "SECRET_KEY", "secret")
+    monkeypatch.setattr(jwt_handler, "ACCESS_TOKEN_VALIDITY", 5)
+    token = jwt_handler.create_access_token("123", role="admin")
+
+    first = jwt_handler.decode_access_token(token)
+    first["role"] = "mutated"
+    monkeypatch.setattr(
+        jwt_handler.jwt, "decode", lambda *args, **kwargs: pytest.fail("should be cached")
+    )
+    second = jwt_handler.decode_access_token(token)
+
+    assert second["role"] == "admin"
+    stats = jwt_handler.decode_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_decode_cache_respects_exp_and_token_type(monkeypatch):
+    monkeypatch.setattr(jwt_handler, "SECRET_KEY", "secret")
+    token = jwt.encode(
+        {"sub": "1", "exp": datetime.now(UTC) - timedelta(seconds=1), "type": "access"},
+        "secret",
+        algorithm="HS256",
+    )
+    claims = jwt.decode(token, "secret", algorithms=["HS256"], options={"verify_exp": False})
+    jwt_handler._remember_claims("access", token, claims)
+
+    with pytest.raises(HTTPException) as excinfo:
+        jwt_handler.decode_access_token(token)
+    assert excinfo.value.status_code == 401
+
+    refresh = jwt_handler.create_refresh_token("1")
+    jwt_handler.decode_refresh_token(refresh)
+    with pytest.raises(HTTPException):
+        jwt_handler.decode_access_token(refresh)
+
+
+def test_decode_cache_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(jwt_handler, "SECRET_KEY", "secret")
+    monkeypatch.setattr(jwt_handler._decode_cache, "maxsize", 0)
+    token = jwt_handler.create_access_token("123")
+
+    jwt_handler.decode_access_token(token)
+    jwt_handler.decode_access_token(token)
+
+    assert jwt_handler.decode_cache_stats()["size"] == 0
+    assert jwt_handler.decode_cache_stats()["hits"] == 0
+
+
 def test_decode_refresh_token_invalid_type(monkeypatch):
     monkeypatch.setattr(jwt_handler, "SECRET_KEY", "secret")
     token = jwt.encode(
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from core import pagination
+
+
+def test_cursor_round_trips_typed_values():
+    values = ["Acme", None, 42, date(2024, 1, 2), datetime(2024, 1, 2, 3, 4, 5), Decimal("1.50")]
+
+    token = pagination.encode_cursor(values)
+
+    assert "=" not in token
+    assert pagination.decode_cursor(token, len(values)) == values
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", pagination.encode_cursor(["a"])])
+def test_decode_cursor_rejects_malformed_or_mismatched_tokens(token):
+    with pytest.raises(ValueError) as excinfo:
+        pagination.decode_cursor(token, 2)
+    assert str(excinfo.value) == "Invalid page cursor"
+
+
+@pytest.mark.parametrize("page_size", [0, -1, pagination.MAX_PAGE_SIZE + 1, "abc"])
+def test_validate_page_size_rejects_out_of_range(page_size):
+    with pytest.raises(ValueError):
+        pagination.validate_page_size(page_size)
+
+
+def test_build_page_returns_cursor_only_when_more_rows_exist():
+    rows = [{"Name": "A", "Id": 1}, {"Name": "B", "Id": 2}, {"Name": "C", "Id": 3}]
+
+    items, next_cursor = pagination.build_page(rows, ["Name", "Id"], 2)
+    assert items == rows[:2]
+    assert pagination.decode_cursor(next_cursor, 2) == ["B", 2]
+
+    items, next_cursor = pagination.build_page(rows[:2], ["Name", "Id"], 2)
+    assert items == rows[:2]
+    assert next_cursor is None
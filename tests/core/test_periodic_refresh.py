@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+
+from core import periodic_refresh
+from core.periodic_refresh import PeriodicRefresh, RefreshableIndex
+
+
+class CountingIndex(RefreshableIndex):
+    def __init__(self) -> None:
+        super().__init__()
+        self.rows: list[int] = []
+
+    def replace(self, rows: list[int]) -> None:
+        with self._lock:
+            self.rows = rows
+            self._mark_loaded()
+
+    def _sizes(self) -> dict[str, int]:
+        return {"rows": len(self.rows)}
+
+
+def test_refreshable_index_stats_report_sizes_and_age():
+    index = CountingIndex()
+    assert index.stats() == {"loaded": False, "rows": 0, "age_seconds": None}
+
+    index.replace([1, 2])
+
+    stats = index.stats()
+    assert index.loaded
+    assert stats["loaded"] is True
+    assert stats["rows"] == 2
+    assert stats["age_seconds"] >= 0
+
+
+def test_periodic_refresh_start_loads_then_schedules(monkeypatch):
+    index = CountingIndex()
+
+    def load():
+        index.replace([1, 2, 3])
+        return 3
+
+    monkeypatch.setattr(periodic_refresh.settings, "TEST_REFRESH_SECONDS", 60, raising=False)
+    refresh = PeriodicRefresh("Test index", load, "TEST_REFRESH_SECONDS")
+
+    async def run():
+        task = await refresh.start()
+        assert task is not None
+        task.cancel()
+
+    asyncio.run(run())
+    assert index.stats()["rows"] == 3
+
+
+def test_periodic_refresh_start_disabled(monkeypatch):
+    monkeypatch.setattr(periodic_refresh.settings, "TEST_REFRESH_SECONDS", 0, raising=False)
+    refresh = PeriodicRefresh("Test index", lambda: 0, "TEST_REFRESH_SECONDS")
+
+    assert asyncio.run(refresh.start()) is None
+
+
+def test_periodic_refresh_run_survives_failures(monkeypatch):
+    calls = []
+
+    async def fake_refresh():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("db down")
+        if len(calls) == 3:
+            raise asyncio.CancelledError
+        return 0
+
+    refresh = PeriodicRefresh("Test index", lambda: 0, "TEST_REFRESH_SECONDS")
+    monkeypatch.setattr(refresh, "refresh", fake_refresh)
+
+    async def run():
+        try:
+            await refresh.run(0)
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert len(calls) == 3
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from core import streaming
+
+
+class FakeBatches:
+    def __init__(self, batches, error=None):
+        self._batches = list(batches)
+        self._error = error
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._error is not None:
+            raise self._error
+        if not self._batches:
+            raise StopAsyncIteration
+        return self._batches.pop(0)
+
+    async def aclose(self):
+        self.closed = True
+
+
+async def _read_body(response):
+    chunks = [chunk async for chunk in response.body_iterator]
+    return b"".join(chunks)
+
+
+def test_stream_records_response_writes_json_array_and_applies_transform():
+    batches = FakeBatches([[{"A": 1}, {"A": 2}], [{"A": Decimal("3.50"), "D": date(2024, 1, 2)}]])
+
+    def transform(batch):
+        return [{**record, "seen": True} for record in batch]
+
+    async def run():
+        response = await streaming.stream_records_response(batches, "json", transform=transform)
+        return response, await _read_body(response)
+
+    response, body = asyncio.run(run())
+
+    assert response.media_type == "application/json"
+    assert json.loads(body) == [
+        {"A": 1, "seen": True},
+        {"A": 2, "seen": True},
+        {"A": 3.5, "D": "2024-01-02", "seen": True},
+    ]
+    assert batches.closed is True
+
+
+def test_stream_records_response_writes_ndjson():
+    batches = FakeBatches([[{"A": 1}], [{"A": 2}]])
+
+    async def run():
+        response = await streaming.stream_records_response(batches, "ndjson")
+        return response, await _read_body(response)
+
+    response, body = asyncio.run(run())
+
+    assert response.media_type == "application/x-ndjson"
+    assert body == b'{"A":1}\n{"A":2}\n'
+
+
+def test_stream_records_response_empty_result_is_empty_array():
+    async def run():
+        response = await streaming.stream_records_response(FakeBatches([]), "json")
+        return await _read_body(response)
+
+    assert asyncio.run(run()) == b"[]"
+
+
+def test_stream_records_response_raises_first_batch_errors_before_streaming():
+    batches = FakeBatches([], error=RuntimeError("db exploded"))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(streaming.stream_records_response(batches, "json"))
+
+    assert batches.closed is True
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from core import ttl_cache
+from core.ttl_cache import InvalidationLog, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+
+    now[0] += 10
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+    now[0] += 25
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_ttl_cache_disabled_and_evict_where():
+    disabled = TTLCache(maxsize=10, ttl=0)
+    disabled.set("a", 1)
+    assert disabled.get("a", "miss") == "miss"
+
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(("u1", "Admin"), 1)
+    cache.set(("u1", None), 2)
+    cache.set(("u2", None), 3)
+
+    assert cache.evict_where(lambda key: key[0] == "u1") == 2
+    assert len(cache) == 1
+
+
+def test_invalidation_log_flags_writes_made_during_a_load():
+    log = InvalidationLog(maxsize=10)
+    log.invalidate("a")
+    token = log.start()
+    assert log.unchanged("a", token)
+
+    log.invalidate("b")
+    assert log.unchanged("a", token)
+    assert not log.unchanged("b", token)
+
+    log.invalidate_all()
+    assert not log.unchanged("a", token)
+    assert log.unchanged("a", log.start())
+
+
+def test_invalidation_log_stays_bounded_and_forgets_conservatively():
+    log = InvalidationLog(maxsize=2)
+    token = log.start()
+    for key in ("a", "b", "c"):
+        log.invalidate(key)
+
+    assert len(log) == 2
+    # "a" was forgotten, so a load that started before its invalidation is stale.
+    assert not log.unchanged("a", token)
+    assert not log.unchanged("z", token)
+    assert log.unchanged("a", log.start())
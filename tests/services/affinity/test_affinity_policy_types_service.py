@@ -8,38 +8,6 @@ from fastapi import HTTPException
 from services.affinity import affinity_policy_types_service
 
 
-def test_lookup_pk_number_returns_value(monkeypatch):
-    async def fake_run_raw_query_async(query, params):
-        return [{"PK_Number": 10}]
-
-    monkeypatch.setattr(
-        affinity_policy_types_service, "run_raw_query_async", fake_run_raw_query_async
-    )
-
-    result = asyncio.run(
-        affinity_policy_types_service._lookup_pk_number(
-            {"ProgramName": "A", "PolicyType": "B"}
-        )
-    )
-    assert result == 10
-
-
-def test_lookup_pk_number_returns_none_on_error(monkeypatch):
-    async def fake_run_raw_query_async(query, params):
-        raise RuntimeError("db down")
-
-    monkeypatch.setattr(
-        affinity_policy_types_service, "run_raw_query_async", fake_run_raw_query_async
-    )
-
-    result = asyncio.run(
-        affinity_policy_types_service._lookup_pk_number(
-            {"ProgramName": "A", "PolicyType": "B"}
-        )
-    )
-    assert result is None
-
-
 def test_get_affinity_policy_types_program_name_path(monkeypatch):
     captured = {}
 
@@ -62,8 +30,8 @@ def test_get_affinity_policy_types_program_name_path(monkeypatch):
     )
 
     assert "WITH primary_agents" in captured["query"]
-    assert "LOWER(LTRIM(RTRIM(tblAffinityPolicyType.Stage))) <> 'retired'" in captured["query"]
-    assert captured["params"][0] == "yes"
+    assert "LOWER(LTRIM(RTRIM(tblAffinityPolicyType.Stage))) <> ?" in captured["query"]
+    assert captured["params"] == ["yes", "retired", "A", "P"]
     assert result == [{"ProgramName": "A"}]
 
 
@@ -87,7 +55,7 @@ def test_get_affinity_policy_types_primary_agt_path(monkeypatch):
     )
 
     assert "WHERE EXISTS" in captured["query"]
-    assert "LOWER(LTRIM(RTRIM(tblAffinityPolicyType.Stage))) <> 'retired'" in captured["query"]
+    assert "LOWER(LTRIM(RTRIM(tblAffinityPolicyType.Stage))) <> ?" in captured["query"]
     assert captured["params"][0] == "yes"
     assert result == [{"ProgramName": "A"}]
 
@@ -109,8 +77,8 @@ def test_get_affinity_policy_types_default_path_applies_retired_filter(monkeypat
 
     result = asyncio.run(affinity_policy_types_service.get_affinity_policy_types({}))
 
-    assert "LOWER(LTRIM(RTRIM(tblAffinityPolicyType.Stage))) <> 'retired'" in captured["query"]
-    assert captured["params"] == []
+    assert "LOWER(LTRIM(RTRIM(tblAffinityPolicyType.Stage))) <> ?" in captured["query"]
+    assert captured["params"] == ["retired"]
     assert result == [{"ProgramName": "A"}]
 
 
@@ -243,28 +211,26 @@ def test_upsert_affinity_policy_types_inserts_when_policy_type_changes(monkeypat
             }
         ]
 
-    async def fake_insert_records_async(*, table, records):
-        captured["insert_records"] = records
-        return {"count": len(records)}
+    async def fake_insert_record_returning_async(table, record, column):
+        captured["insert_records"] = [record]
+        return 25
 
     async def fake_merge_upsert_records_async(*, table, data_list, key_columns, **kwargs):
         raise AssertionError("merge_upsert_records_async should not be called when PolicyType changes")
 
-    async def fake_lookup(record):
-        return 25
-
     monkeypatch.setattr(
         affinity_policy_types_service, "fetch_records_async", fake_fetch_records_async
     )
     monkeypatch.setattr(
-        affinity_policy_types_service, "insert_records_async", fake_insert_records_async
+        affinity_policy_types_service,
+        "insert_record_returning_async",
+        fake_insert_record_returning_async,
     )
     monkeypatch.setattr(
         affinity_policy_types_service,
         "merge_upsert_records_async",
         fake_merge_upsert_records_async,
     )
-    monkeypatch.setattr(affinity_policy_types_service, "_lookup_pk_number", fake_lookup)
 
     result = asyncio.run(affinity_policy_types_service.upsert_affinity_policy_types({"PK_Number": 1}))
 
@@ -299,8 +265,8 @@ def test_upsert_affinity_policy_types_updates_when_policy_type_changes_only_by_c
     async def fake_fetch_records_async(*, table, filters):
         return [{"PK_Number": 1, "ProgramName": "A", "PolicyType": "Auto"}]
 
-    async def fake_insert_records_async(*, table, records):
-        raise AssertionError("insert_records_async should not be called for case-only PolicyType changes")
+    async def fake_insert_record_returning_async(table, record, column):
+        raise AssertionError("no insert expected for case-only PolicyType changes")
 
     async def fake_merge_upsert_records_async(*, table, data_list, key_columns, **kwargs):
         return {"count": len(data_list)}
@@ -309,7 +275,9 @@ def test_upsert_affinity_policy_types_updates_when_policy_type_changes_only_by_c
         affinity_policy_types_service, "fetch_records_async", fake_fetch_records_async
     )
     monkeypatch.setattr(
-        affinity_policy_types_service, "insert_records_async", fake_insert_records_async
+        affinity_policy_types_service,
+        "insert_record_returning_async",
+        fake_insert_record_returning_async,
     )
     monkeypatch.setattr(
         affinity_policy_types_service,
@@ -338,16 +306,15 @@ def test_upsert_affinity_policy_types_inserts_without_pk(monkeypatch):
         lambda data: {"ProgramName": "A", "PolicyType": "P"},
     )
 
-    async def fake_insert_records_async(*, table, records):
-        return {"count": len(records)}
-
-    async def fake_lookup(record):
+    async def fake_insert_record_returning_async(table, record, column):
+        assert (table, column) == ("tblAffinityPolicyType", "PK_Number")
         return 10
 
     monkeypatch.setattr(
-        affinity_policy_types_service, "insert_records_async", fake_insert_records_async
+        affinity_policy_types_service,
+        "insert_record_returning_async",
+        fake_insert_record_returning_async,
     )
-    monkeypatch.setattr(affinity_policy_types_service, "_lookup_pk_number", fake_lookup)
 
     result = asyncio.run(affinity_policy_types_service.upsert_affinity_policy_types({"x": 1}))
     assert result == {"message": "Transaction successful", "count": 1, "pk": 10}
@@ -5,19 +5,22 @@ import asyncio
 import pytest
 from fastapi import HTTPException
 
+from core import db_helpers
 from services.affinity import affinity_program_service
 
 
 def test_get_affinity_program_without_branch_filter_uses_fetch(monkeypatch):
     captured = {"filters": None, "formatted": False}
-    records = [{"ProgramName": "Alpha", "Stage": "Retired"}, {"ProgramName": "Beta"}]
+    records = [{"ProgramName": "Beta"}]
     formatted_records = [{"ProgramName": "Beta", "OnBoardDt": "01-01-2024"}]
 
     def fake_sanitize_filters(query_params):
         return {"ProgramName": "Alpha"}
 
-    async def fake_fetch_records_async(*, table, filters):
+    async def fake_fetch_records_async(*, table, filters, columns, conditions):
+        assert columns is None
         assert table == affinity_program_service.TABLE_NAME
+        assert conditions == [db_helpers.NOT_RETIRED_STAGE]
         captured["filters"] = filters
         return list(records)
 
@@ -44,23 +47,23 @@ def test_get_affinity_program_without_branch_filter_uses_fetch(monkeypatch):
 
 
 def test_get_affinity_program_with_branch_filter_builds_like_query(monkeypatch):
-    captured = {"query": None, "params": None}
-    records = [{"ProgramName": "Alpha", "Stage": "Retired"}, {"ProgramName": "Beta"}]
+    captured = {}
 
     def fake_sanitize_filters(query_params):
         return {"BranchVal": "NY, LA & SF", "ProgramName": "Alpha"}
 
-    async def fake_run_raw_query_async(query, params):
-        captured["query"] = query
-        captured["params"] = params
-        return list(records)
+    async def fake_fetch_records_async(*, table, filters, columns, conditions):
+        captured["query"], captured["params"] = db_helpers.build_select_query(
+            table, filters, columns=columns, conditions=conditions
+        )
+        return [{"ProgramName": "Beta"}]
 
     def fake_format_records_dates(rows):
         return rows
 
     monkeypatch.setattr(affinity_program_service, "sanitize_filters", fake_sanitize_filters)
     monkeypatch.setattr(
-        affinity_program_service, "run_raw_query_async", fake_run_raw_query_async
+        affinity_program_service, "fetch_records_async", fake_fetch_records_async
     )
     monkeypatch.setattr(
         affinity_program_service, "format_records_dates", fake_format_records_dates
@@ -70,8 +73,9 @@ def test_get_affinity_program_with_branch_filter_builds_like_query(monkeypatch):
         affinity_program_service.get_affinity_program({"BranchVal": "NY, LA & SF"})
     )
 
-    assert "BranchVal LIKE ?" in captured["query"]
-    assert captured["params"] == ["Alpha", "NY%", "LA%", "SF%"]
+    assert "(BranchVal LIKE ? OR BranchVal LIKE ? OR BranchVal LIKE ?)" in captured["query"]
+    assert "(Stage IS NULL OR LOWER(LTRIM(RTRIM(Stage))) <> ?)" in captured["query"]
+    assert captured["params"] == ["Alpha", "NY%", "LA%", "SF%", "retired"]
     assert result == [{"ProgramName": "Beta"}]
 
 
@@ -5,6 +5,7 @@ import asyncio
 import pytest
 from fastapi import HTTPException
 
+from core import db_helpers
 from services.affinity import search_affinity_programs_service
 
 
@@ -61,3 +62,58 @@ def test_search_affinity_program_records_query_error(monkeypatch):
 
     assert excinfo.value.status_code == 500
     assert excinfo.value.detail == {"error": "db exploded"}
+
+
+def test_search_affinity_program_page_walks_duplicate_rows_across_pages(monkeypatch):
+    # An agent listed twice under one program yields identical output columns; only
+    # the agent key tells the rows apart when they straddle a page boundary.
+    rows = [
+        {
+            "Agent Code": "A1",
+            "Program Name": "Alpha",
+            "Agent Name": "Agent",
+            "On Board Date": "2024-01-01",
+            "Account Status": "Active",
+            "Program Key": 7,
+            "Agent Key": agent_key,
+        }
+        for agent_key in (3, 1, 2)
+    ]
+    keyset = search_affinity_programs_service.SEARCH_KEYSETS["ProducerCode"]
+    captured = {}
+    build_keyset_page_query = db_helpers.build_keyset_page_query
+
+    def capturing_build(query, keyset_columns, *, page_size, after=None, params=None):
+        captured["after"] = after
+        return build_keyset_page_query(
+            query, keyset_columns, page_size=page_size, after=after, params=params
+        )
+
+    async def fake_run_raw_query_async(query, params=None, timeout=None):
+        ordered = sorted(rows, key=lambda row: [row[column] for column in keyset])
+        after = captured["after"]
+        if after is not None:
+            ordered = [row for row in ordered if [row[column] for column in keyset] > after]
+        return [dict(row) for row in ordered[: params[-1]]]
+
+    monkeypatch.setattr(db_helpers, "build_keyset_page_query", capturing_build)
+    monkeypatch.setattr(db_helpers, "run_raw_query_async", fake_run_raw_query_async)
+    monkeypatch.setattr(
+        search_affinity_programs_service, "format_records_dates", lambda records: records
+    )
+
+    seen, cursor = [], None
+    while True:
+        page = asyncio.run(
+            search_affinity_programs_service.search_affinity_program_page("ProducerCode", 2, cursor)
+        )
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # All three rows come back, without the keyset-only primary keys.
+    assert len(seen) == 3
+    assert all("Agent Key" not in item and "Program Key" not in item for item in seen)
+    query = search_affinity_programs_service.SEARCH_QUERIES["ProducerCode"]
+    assert "PK_Number AS [Agent Key]" in query
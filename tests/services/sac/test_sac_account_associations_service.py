@@ -33,32 +33,27 @@ def test_add_associations_no_new_children(monkeypatch):
 
 
 def test_add_associations_inserts_new_pairs(monkeypatch):
-    captured = {"records": None}
-
-    async def fake_fetch_records_async(*, table, filters):
-        parent = filters.get("ParentAccount")
-        if parent == "P":
-            return [{"AssociatedAccount": "C1"}]
-        if parent == "C1":
-            return [{"AssociatedAccount": "P"}]
-        return []
-
-    async def fake_insert_records_async(*, table, records):
-        captured["records"] = records
-        return {"count": len(records)}
+    captured = {}
+
+    async def fake_insert_missing_records_async(*, table, records, key_columns):
+        captured.update(table=table, records=records, key_columns=key_columns)
+        return {"message": "Insertion successful", "count": 2}
 
     monkeypatch.setattr(
-        sac_account_associations_service, "fetch_records_async", fake_fetch_records_async
-    )
-    monkeypatch.setattr(
-        sac_account_associations_service, "insert_records_async", fake_insert_records_async
+        sac_account_associations_service,
+        "insert_missing_records_async",
+        fake_insert_missing_records_async,
     )
 
-    payload = {"parent_account": "P", "child_account": ["C1", "C2"]}
+    payload = {"parent_account": "P", "child_account": ["C1", "C2", "C1"]}
     result = asyncio.run(sac_account_associations_service.add_associations(payload))
 
-    assert result == {"count": 2}
+    assert result == {"message": "Insertion successful", "count": 2}
+    assert captured["table"] == "tblSACAccountAssociations"
+    assert captured["key_columns"] == ["ParentAccount", "AssociatedAccount"]
     assert captured["records"] == [
+        {"ParentAccount": "P", "AssociatedAccount": "C1"},
+        {"ParentAccount": "C1", "AssociatedAccount": "P"},
         {"ParentAccount": "P", "AssociatedAccount": "C2"},
         {"ParentAccount": "C2", "AssociatedAccount": "P"},
     ]
@@ -132,3 +127,61 @@ def test_get_associations_success(monkeypatch):
 
     result = asyncio.run(sac_account_associations_service.get_associations({"ParentAccount": "P"}))
     assert result == [{"ParentAccount": "P"}]
+
+
+def test_get_account_family_uses_association_graph():
+    graph = sac_account_associations_service.sac_association_graph
+    graph.replace(
+        [
+            {"ParentAccount": "P", "AssociatedAccount": "C1"},
+            {"ParentAccount": "C1", "AssociatedAccount": "C2"},
+        ]
+    )
+
+    result = asyncio.run(
+        sac_account_associations_service.get_account_family({"ParentAccount": "P"})
+    )
+    assert result == [
+        {"ParentAccount": "P", "AssociatedAccount": "C1", "Hops": 1},
+        {"ParentAccount": "P", "AssociatedAccount": "C2", "Hops": 2},
+    ]
+
+    one_hop = asyncio.run(
+        sac_account_associations_service.get_account_family({"ParentAccount": "P", "hops": "1"})
+    )
+    assert [row["AssociatedAccount"] for row in one_hop] == ["C1"]
+
+
+def test_get_account_family_validates_params():
+    for params in ({}, {"ParentAccount": "P", "hops": "0"}, {"ParentAccount": "P", "x": "1"}):
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(sac_account_associations_service.get_account_family(params))
+        assert excinfo.value.status_code == 400
+
+
+def test_association_writes_update_loaded_graph(monkeypatch):
+    graph = sac_account_associations_service.sac_association_graph
+    graph.replace([])
+
+    async def fake_insert_missing_records_async(*, table, records, key_columns):
+        return {"count": len(records)}
+
+    async def fake_delete_records_async(*, table, data_list, key_columns):
+        return {"count": len(data_list)}
+
+    monkeypatch.setattr(
+        sac_account_associations_service,
+        "insert_missing_records_async",
+        fake_insert_missing_records_async,
+    )
+    monkeypatch.setattr(
+        sac_account_associations_service, "delete_records_async", fake_delete_records_async
+    )
+
+    payload = {"parent_account": "P", "child_account": ["C1", "C2"]}
+    asyncio.run(sac_account_associations_service.add_associations(payload))
+    assert graph.neighborhood("C1") == {"P": 1, "C2": 2}
+
+    payload = {"parent_account": "P", "child_account": ["C2"]}
+    asyncio.run(sac_account_associations_service.delete_associations(payload))
+    assert graph.neighborhood("C1") == {"P": 1}
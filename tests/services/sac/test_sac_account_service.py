@@ -5,15 +5,15 @@ import asyncio
 import pytest
 from fastapi import HTTPException
 
+from core import db_helpers
 from services.sac import sac_account_service
 
 
 def test_get_sac_account_without_branch(monkeypatch):
-    async def fake_fetch_records_async(*, table, filters):
-        return [
-            {"CustomerNum": "1", "Stage": "Retired"},
-            {"CustomerNum": "2", "Stage": "Active"},
-        ]
+    async def fake_fetch_records_async(*, table, filters, columns, conditions):
+        assert columns is None
+        assert conditions == [db_helpers.NOT_RETIRED_STAGE]
+        return [{"CustomerNum": "2", "Stage": "Active"}]
 
     def fake_format_records_dates(records, fields=None):
         return records
@@ -27,11 +27,17 @@ def test_get_sac_account_without_branch(monkeypatch):
 
 
 def test_get_sac_account_with_branch_filter(monkeypatch):
-    async def fake_run_raw_query_async(query, params):
-        return [
-            {"CustomerNum": "1", "Stage": "Retired"},
-            {"CustomerNum": "2", "Stage": "Active"},
-        ]
+    async def fake_fetch_records_async(*, table, filters, columns, conditions):
+        query, params = db_helpers.build_select_query(
+            table, filters, columns=columns, conditions=conditions
+        )
+        assert query == (
+            "SELECT * FROM tblAcctSpecial WHERE CustomerNum = ?"
+            " AND (BranchName LIKE ? OR BranchName LIKE ?)"
+            " AND (Stage IS NULL OR LOWER(LTRIM(RTRIM(Stage))) <> ?)"
+        )
+        assert params == ["1", "NY%", "LA%", "retired"]
+        return [{"CustomerNum": "2", "Stage": "Active"}]
 
     def fake_format_records_dates(records, fields=None):
         return records
@@ -41,13 +47,58 @@ def test_get_sac_account_with_branch_filter(monkeypatch):
         "sanitize_filters",
         lambda params, allowed: {"BranchName": "NY, LA", "CustomerNum": "1"},
     )
-    monkeypatch.setattr(sac_account_service, "run_raw_query_async", fake_run_raw_query_async)
+    monkeypatch.setattr(sac_account_service, "fetch_records_async", fake_fetch_records_async)
     monkeypatch.setattr(sac_account_service, "format_records_dates", fake_format_records_dates)
 
     result = asyncio.run(sac_account_service.get_sac_account({"BranchName": "NY, LA"}))
     assert result == [{"CustomerNum": "2", "Stage": "Active"}]
 
 
+def test_get_sac_account_projects_requested_fields(monkeypatch):
+    captured = {}
+
+    async def fake_resolve_projection(table, fields):
+        assert table == sac_account_service.TABLE_NAME
+        assert fields == "customernum,Stage"
+        return ["CustomerNum", "Stage"]
+
+    async def fake_fetch_records_async(*, table, filters, columns, conditions):
+        captured["query"], _ = db_helpers.build_select_query(
+            table, filters, columns=columns, conditions=conditions
+        )
+        return []
+
+    monkeypatch.setattr(
+        sac_account_service,
+        "sanitize_filters",
+        lambda params, allowed: {"BranchName": "NY"},
+    )
+    monkeypatch.setattr(sac_account_service, "resolve_projection", fake_resolve_projection)
+    monkeypatch.setattr(sac_account_service, "fetch_records_async", fake_fetch_records_async)
+
+    result = asyncio.run(
+        sac_account_service.get_sac_account({"BranchName": "NY"}, fields="customernum,Stage")
+    )
+
+    assert result == []
+    assert captured["query"].startswith(
+        "SELECT CustomerNum, Stage FROM tblAcctSpecial WHERE BranchName LIKE ?"
+    )
+
+
+def test_get_sac_account_unknown_field_returns_http_400(monkeypatch):
+    async def fake_resolve_projection(table, fields):
+        raise ValueError("Invalid field(s): Nope")
+
+    monkeypatch.setattr(sac_account_service, "sanitize_filters", lambda params, allowed: {})
+    monkeypatch.setattr(sac_account_service, "resolve_projection", fake_resolve_projection)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(sac_account_service.get_sac_account({}, fields="Nope"))
+
+    assert excinfo.value.status_code == 400
+
+
 def test_get_sac_account_invalid_filters(monkeypatch):
     def fake_sanitize_filters(params, allowed):
         raise ValueError("bad filters")
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import asyncio
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 
 import pytest
 from fastapi import HTTPException
@@ -13,11 +13,10 @@ def test_get_sac_policies_formats_and_normalizes_premium(monkeypatch):
     def fake_sanitize_filters(query_params, allowed):
         return {"CustomerNum": "1"}
 
-    async def fake_fetch_records_async(*, table, filters):
-        return [
-            {"PremiumAmt": 100, "Other": "retired", "Stage": "Retired"},
-            {"PremiumAmt": 200, "Other": "active", "Stage": "Active"},
-        ]
+    async def fake_fetch_records_async(*, table, filters, columns, conditions):
+        assert columns is None
+        assert conditions == sac_policies_service.DEFAULT_CONDITIONS
+        return [{"PremiumAmt": 200, "Other": "active", "Stage": "Active"}]
 
     def fake_format_records_dates(records):
         return records
@@ -51,30 +50,33 @@ def test_get_sac_policies_invalid_filters():
 
 
 def test_upsert_sac_policies_inserts_without_pk(monkeypatch):
-    async def fake_insert_records_async(*, table, records):
-        return {"count": len(records)}
+    captured = {}
+
+    async def fake_insert_record_returning_async(table, record, column):
+        captured["returning"] = (table, column)
+        return 101
 
     monkeypatch.setattr(
         sac_policies_service,
         "normalize_payload_dates",
         lambda payload: {"CustomerNum": "1", "PolicyNum": "P1", "PolMod": "1"},
     )
-    monkeypatch.setattr(sac_policies_service, "insert_records_async", fake_insert_records_async)
-    async def fake_lookup(record):
-        return 101
-
-    monkeypatch.setattr(sac_policies_service, "_lookup_pk_number", fake_lookup)
+    monkeypatch.setattr(
+        sac_policies_service, "insert_record_returning_async", fake_insert_record_returning_async
+    )
 
     result = asyncio.run(sac_policies_service.upsert_sac_policies({"CustomerNum": "1"}))
     assert result == {"message": "Transaction successful", "count": 1, "pk": 101}
+    assert captured["returning"] == ("tblPolicies", "PK_Number")
 
 
 def test_upsert_sac_policies_inserts_when_mod_changes(monkeypatch):
     async def fake_fetch_records_async(*, table, filters):
         return [{"PK_Number": 10, "PolMod": "1"}]
 
-    async def fake_insert_records_async(*, table, records):
-        return {"count": len(records)}
+    async def fake_insert_record_returning_async(table, record, column):
+        assert "PK_Number" not in record
+        return 202
 
     monkeypatch.setattr(
         sac_policies_service,
@@ -82,11 +84,9 @@ def test_upsert_sac_policies_inserts_when_mod_changes(monkeypatch):
         lambda payload: {"PK_Number": 10, "CustomerNum": "1", "PolicyNum": "P1", "PolMod": "2"},
     )
     monkeypatch.setattr(sac_policies_service, "fetch_records_async", fake_fetch_records_async)
-    monkeypatch.setattr(sac_policies_service, "insert_records_async", fake_insert_records_async)
-    async def fake_lookup(record):
-        return 202
-
-    monkeypatch.setattr(sac_policies_service, "_lookup_pk_number", fake_lookup)
+    monkeypatch.setattr(
+        sac_policies_service, "insert_record_returning_async", fake_insert_record_returning_async
+    )
 
     result = asyncio.run(sac_policies_service.upsert_sac_policies({"PK_Number": 10}))
     assert result["pk"] == 202
@@ -156,12 +156,15 @@ def test_update_field_for_all_policies_success(monkeypatch):
     def fake_db_connection():
         yield FakeConn()
 
-    async def fake_run_in_threadpool(func):
-        return func()
+    async def fake_run_db(func, /, *args, timeout=None, **kwargs):
+        return func(*args, **kwargs)
+
+    import db
+    from core import db_helpers
 
     monkeypatch.setattr(sac_policies_service, "parse_date_input", fake_parse_date_input)
-    monkeypatch.setattr(sac_policies_service, "db_connection", fake_db_connection)
-    monkeypatch.setattr(sac_policies_service, "run_in_threadpool", fake_run_in_threadpool)
+    monkeypatch.setattr(db, "db_connection", fake_db_connection)
+    monkeypatch.setattr(db_helpers, "run_db", fake_run_db)
 
     result = asyncio.run(
         sac_policies_service.update_field_for_all_policies(
@@ -174,8 +177,13 @@ def test_update_field_for_all_policies_success(monkeypatch):
         )
     )
 
-    assert captured["params"] == ("parsed", "123")
-    assert result == {"message": "Update successful", "count": 2}
+    assert "target.EffectiveDate = staged.field_value" in captured["query"]
+    assert captured["params"] == ["123", "parsed"]
+    assert result == {
+        "message": "Update successful",
+        "count": 2,
+        "groups": [{"fieldName": "EffectiveDate", "updateVia": "CustomerNum", "count": 2}],
+    }
 
 
 def test_get_premium_success(monkeypatch):
@@ -206,29 +214,224 @@ def test_get_premium_invalid_filters(monkeypatch):
     assert excinfo.value.detail == {"error": "bad filter"}
 
 
-def test_get_underwriter_details_only_queries_active_policies(monkeypatch):
+def test_get_underwriter_details_returns_empty_lists_without_records(monkeypatch):
+    captured = []
+
+    async def fake_run_raw_query_async(query, params):
+        captured.append((query, params))
+        return []
+
+    monkeypatch.setattr(sac_policies_service, "run_raw_query_async", fake_run_raw_query_async)
+    empty = {
+        "AcctOwnerEmail": [],
+        "UnderwriterNames": [],
+        "UnderwriterEmails": [],
+        "UWMgrNames": [],
+        "UWMgrEmails": [],
+        "MissingUnderwriters": [],
+        "MissingUWManagers": [],
+    }
+
+    def details():
+        return asyncio.run(sac_policies_service.get_underwriter_details({"CustomerNum": "123"}))
+
+    # Until the name/email index loads, emails are joined in SQL.
+    assert details() == empty
+    sac_policies_service.name_email_index.replace([], [])
+    assert details() == empty
+
+    assert captured == [
+        (sac_policies_service._UNDERWRITER_DETAILS_JOIN_QUERY, ["123"]),
+        (sac_policies_service._POLICY_CONTACT_NAMES_QUERY, ["123"]),
+    ]
+
+
+def test_get_underwriter_details_resolves_names_from_index(monkeypatch):
     captured = {}
 
     async def fake_run_raw_query_async(query, params):
         captured["query"] = query
-        captured["params"] = params
-        return []
+        return [
+            {"AcctOwner": "sam owner", "UnderwriterName": "Jane Doe", "UWMgr": "Max Boss"},
+            {"AcctOwner": "sam owner", "UnderwriterName": "New Hire", "UWMgr": None},
+        ]
 
-    monkeypatch.setattr(
-        sac_policies_service,
-        "sanitize_filters",
-        lambda query_params, allowed: query_params,
+    monkeypatch.setattr(sac_policies_service, "run_raw_query_async", fake_run_raw_query_async)
+    sac_policies_service.name_email_index.replace(
+        [
+            {"Name": "JANE DOE", "Email": "jane@example.com"},
+            {"Name": "max boss", "Email": "max@example.com"},
+        ],
+        [{"Name": "Sam Owner", "Email": "sam@example.com"}],
     )
-    monkeypatch.setattr(
-        sac_policies_service,
-        "run_raw_query_async",
-        fake_run_raw_query_async,
+
+    result = asyncio.run(sac_policies_service.get_underwriter_details({"CustomerNum": "123"}))
+
+    assert "tblUnderwriters" not in captured["query"]
+    assert "UPPER" not in captured["query"]
+    assert result == {
+        "AcctOwnerEmail": "sam@example.com",
+        "UnderwriterNames": ["Jane Doe", "New Hire"],
+        "UnderwriterEmails": ["jane@example.com"],
+        "UWMgrNames": ["Max Boss"],
+        "UWMgrEmails": ["max@example.com"],
+        "MissingUnderwriters": ["New Hire"],
+        "MissingUWManagers": [],
+    }
+
+
+def test_get_underwriter_details_joins_in_sql_until_index_loads(monkeypatch):
+    captured = {}
+
+    async def fake_run_raw_query_async(query, params):
+        captured["query"] = query
+        return [
+            {
+                "AcctOwnerEmail": "sam@example.com",
+                "UnderwriterName": "Jane Doe",
+                "UnderwriterEmail": "jane@example.com",
+                "UWMgr": None,
+                "UWMgrEmail": None,
+            }
+        ]
+
+    monkeypatch.setattr(sac_policies_service, "run_raw_query_async", fake_run_raw_query_async)
+
+    result = asyncio.run(sac_policies_service.get_underwriter_details({"CustomerNum": "123"}))
+
+    assert "LEFT JOIN tblUnderwriters uw" in captured["query"]
+    assert result["AcctOwnerEmail"] == "sam@example.com"
+    assert result["UnderwriterEmails"] == ["jane@example.com"]
+
+
+def test_get_premium_caches_customer_totals_until_a_write(monkeypatch):
+    queries = []
+
+    async def fake_run_raw_query_async(query, params):
+        queries.append(params)
+        return [{"Premium": 250}]
+
+    async def fake_update_records_async(*, table, updates):
+        return {"count": 1}
+
+    monkeypatch.setattr(sac_policies_service, "run_raw_query_async", fake_run_raw_query_async)
+    monkeypatch.setattr(sac_policies_service, "update_records_async", fake_update_records_async)
+
+    def premium(params):
+        return asyncio.run(sac_policies_service.get_premium(params))
+
+    assert premium({"CustomerNum": "123"}) == 250
+    assert premium({"CustomerNum": "123"}) == 250
+    assert len(queries) == 1
+
+    # Other filter shapes are not cached.
+    premium({"CustomerNum": "123", "PolicyNum": "P1"})
+    assert len(queries) == 2
+
+    # Writes to unrelated columns keep the cached total.
+    asyncio.run(
+        sac_policies_service.sync_account_name({"CustomerNum": "123", "AccountName": "New"})
     )
+    premium({"CustomerNum": "123"})
+    assert len(queries) == 2
 
-    result = asyncio.run(
-        sac_policies_service.get_underwriter_details({"CustomerNum": "123"})
+    asyncio.run(
+        sac_policies_service.update_field_for_all_policies(
+            {
+                "fieldName": "PolicyStatus",
+                "updateVia": "CustomerNum",
+                "fieldValue": "Cancelled",
+                "updateViaValue": "123",
+            }
+        )
+    )
+    premium({"CustomerNum": "123"})
+    assert len(queries) == 3
+
+
+def test_premium_cache_eviction_scope_follows_update_shape():
+    cache = sac_policies_service._premium_cache
+    for customer_num in ("1", "2"):
+        cache.set(customer_num, 10)
+
+    sac_policies_service._evict_premiums_for_updates(
+        [{"fieldName": "PremiumAmt", "updateVia": "CustomerNum", "updateViaValue": "1"}]
+    )
+    assert cache.get("1") is None
+    assert cache.get("2") == 10
+
+    # Matching by PolicyNum can touch any customer.
+    sac_policies_service._evict_premiums_for_updates(
+        [{"fieldName": "PremiumAmt", "updateVia": "PolicyNum", "updateViaValue": "P1"}]
+    )
+    assert cache.get("2") is None
+
+
+def test_get_premium_does_not_cache_total_read_during_a_write(monkeypatch):
+    async def fake_run_raw_query_async(query, params):
+        sac_policies_service.evict_premiums(["123"])
+        return [{"Premium": 250}]
+
+    monkeypatch.setattr(sac_policies_service, "run_raw_query_async", fake_run_raw_query_async)
+
+    asyncio.run(sac_policies_service.get_premium({"CustomerNum": "123"}))
+
+    assert sac_policies_service._premium_cache.get("123") is None
+
+
+def test_upsert_sac_policies_evicts_old_and_new_customer(monkeypatch):
+    async def fake_fetch_records_async(*, table, filters):
+        return [{"PK_Number": 7, "CustomerNum": "OLD", "PolMod": "01"}]
+
+    async def fake_merge_upsert_records_async(**kwargs):
+        return {"count": 1}
+
+    @asynccontextmanager
+    async def fake_unit_of_work():
+        yield None
+
+    monkeypatch.setattr(sac_policies_service, "fetch_records_async", fake_fetch_records_async)
+    monkeypatch.setattr(
+        sac_policies_service, "merge_upsert_records_async", fake_merge_upsert_records_async
     )
+    monkeypatch.setattr(sac_policies_service, "unit_of_work", fake_unit_of_work)
+    cache = sac_policies_service._premium_cache
+    for customer_num in ("OLD", "NEW", "OTHER"):
+        cache.set(customer_num, 10)
+
+    asyncio.run(
+        sac_policies_service.upsert_sac_policies(
+            {"PK_Number": 7, "CustomerNum": "NEW", "PolMod": "01", "PremiumAmt": "5"}
+        )
+    )
+
+    assert cache.get("OLD") is None
+    assert cache.get("NEW") is None
+    assert cache.get("OTHER") == 10
 
-    assert result == {}
-    assert "p.PolicyStatus = 'Active'" in captured["query"]
-    assert captured["params"] == ["123"]
+
+def test_get_premiums_serves_hits_and_groups_misses(monkeypatch):
+    captured = {}
+
+    async def fake_run_raw_query_async(query, params):
+        captured.update(query=query, params=params)
+        return [{"CustomerNum": "B ", "Premium": 20}]
+
+    monkeypatch.setattr(sac_policies_service, "run_raw_query_async", fake_run_raw_query_async)
+    sac_policies_service._premium_cache.set("A", 10)
+
+    result = asyncio.run(sac_policies_service.get_premiums({"CustomerNum": "A, B,C,A"}))
+
+    assert result == {"A": 10, "B": 20, "C": 0}
+    assert "GROUP BY CustomerNum" in captured["query"]
+    assert captured["params"] == ["B", "C", "Active"]
+    assert sac_policies_service._premium_cache.get("C") == 0
+
+
+def test_get_premiums_validates_customer_list(monkeypatch):
+    monkeypatch.setattr(sac_policies_service, "MAX_PREMIUM_CUSTOMERS", 2)
+
+    for params in ({}, {"CustomerNum": " , "}, {"CustomerNum": "A,B,C"}, {"PolicyNum": "1"}):
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(sac_policies_service.get_premiums(params))
+        assert excinfo.value.status_code == 400
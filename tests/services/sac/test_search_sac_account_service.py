@@ -5,6 +5,7 @@ import asyncio
 import pytest
 from fastapi import HTTPException
 
+from core import db_helpers
 from services.sac import search_sac_account_service
 
 
@@ -59,3 +60,163 @@ def test_search_sac_account_records_query_error_surfaces_http_exception(monkeypa
 
     assert excinfo.value.status_code == 500
     assert excinfo.value.detail == {"error": "db exploded"}
+
+
+def test_stream_sac_account_records_invalid_search_by():
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(search_sac_account_service.stream_sac_account_records("Nope"))
+
+    assert excinfo.value.status_code == 400
+
+
+def test_stream_sac_account_records_streams_formatted_batches(monkeypatch):
+    captured = {}
+
+    def fake_stream_raw_query_async(query):
+        captured["query"] = query
+        return "batches"
+
+    async def fake_stream_records_response(batches, fmt, *, transform):
+        captured["args"] = (batches, fmt, transform)
+        return "response"
+
+    monkeypatch.setattr(
+        search_sac_account_service, "stream_raw_query_async", fake_stream_raw_query_async
+    )
+    monkeypatch.setattr(
+        search_sac_account_service, "stream_records_response", fake_stream_records_response
+    )
+
+    result = asyncio.run(
+        search_sac_account_service.stream_sac_account_records("PolicyNum", "ndjson")
+    )
+
+    assert result == "response"
+    assert captured["query"] == search_sac_account_service.SEARCH_QUERIES["PolicyNum"]
+    assert captured["args"] == (
+        "batches",
+        "ndjson",
+        search_sac_account_service.format_records_dates,
+    )
+
+
+def test_search_sac_account_page_formats_items_and_keeps_cursor(monkeypatch):
+    captured = {}
+
+    async def fake_run_keyset_page_async(query, keyset, **kwargs):
+        captured["args"] = (query, keyset, kwargs)
+        return {"items": [{"On Board Date": "raw"}], "next_cursor": "abc", "page_size": 100}
+
+    monkeypatch.setattr(
+        search_sac_account_service, "run_keyset_page_async", fake_run_keyset_page_async
+    )
+    monkeypatch.setattr(
+        search_sac_account_service,
+        "format_records_dates",
+        lambda records: [{"On Board Date": "formatted"}],
+    )
+
+    result = asyncio.run(
+        search_sac_account_service.search_sac_account_page("AccountName", 100, None, True)
+    )
+
+    assert result == {
+        "items": [{"On Board Date": "formatted"}],
+        "next_cursor": "abc",
+        "page_size": 100,
+    }
+    query, keyset, kwargs = captured["args"]
+    assert query == search_sac_account_service.SEARCH_QUERIES["AccountName"]
+    assert keyset == search_sac_account_service.SEARCH_KEYSETS["AccountName"]
+    assert kwargs == {"page_size": 100, "cursor": None, "include_total": True}
+
+
+def test_search_sac_account_page_invalid_cursor_is_bad_request(monkeypatch):
+    async def fake_run_keyset_page_async(query, keyset, **kwargs):
+        raise ValueError("Invalid page cursor")
+
+    monkeypatch.setattr(
+        search_sac_account_service, "run_keyset_page_async", fake_run_keyset_page_async
+    )
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(search_sac_account_service.search_sac_account_page("AccountName", 100, "x"))
+
+    assert excinfo.value.status_code == 400
+    assert excinfo.value.detail == {"error": "Invalid page cursor"}
+
+
+def test_search_sac_account_page_walks_rows_sharing_a_prefix_across_pages(monkeypatch):
+    # Two affiliate rows differ only in ServLevel; with page_size=1 they straddle a
+    # page boundary and the second must not be skipped by the "after" predicate.
+    rows = [
+        {
+            "Affiliate Name": "Acme",
+            "Customer Name": "Acme Co",
+            "Customer Number": "C1",
+            "OnBoardDate": "2024-01-01",
+            "Service Level": level,
+            "Account Status": "Active",
+        }
+        for level in ("Gold", "Silver", "Bronze")
+    ]
+    keyset = search_sac_account_service.SEARCH_KEYSETS["AffiliateName"]
+    captured = {}
+    build_keyset_page_query = db_helpers.build_keyset_page_query
+
+    def capturing_build(query, keyset_columns, *, page_size, after=None, params=None):
+        captured["after"] = after
+        return build_keyset_page_query(
+            query, keyset_columns, page_size=page_size, after=after, params=params
+        )
+
+    async def fake_run_raw_query_async(query, params=None, timeout=None):
+        ordered = sorted(rows, key=lambda row: [row[column] for column in keyset])
+        after = captured["after"]
+        if after is not None:
+            ordered = [row for row in ordered if [row[column] for column in keyset] > after]
+        return [dict(row) for row in ordered[: params[-1]]]
+
+    monkeypatch.setattr(db_helpers, "build_keyset_page_query", capturing_build)
+    monkeypatch.setattr(db_helpers, "run_raw_query_async", fake_run_raw_query_async)
+    monkeypatch.setattr(search_sac_account_service, "format_records_dates", lambda records: records)
+
+    seen, cursor = [], None
+    while True:
+        page = asyncio.run(
+            search_sac_account_service.search_sac_account_page("AffiliateName", 1, cursor)
+        )
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # All three rows come back, without the keyset-only tie-breaker.
+    assert len(seen) == 3
+    assert all("Service Level" not in item for item in seen)
+    query = search_sac_account_service.SEARCH_QUERIES["AffiliateName"]
+    assert "ServLevel AS [Service Level]" in query
+
+
+def test_stream_sac_account_records_returns_503_when_streams_are_exhausted(monkeypatch):
+    async def exhausted(batches, fmt, *, transform):
+        raise search_sac_account_service.StreamLimitError("Too many concurrent streams")
+
+    monkeypatch.setattr(search_sac_account_service, "stream_raw_query_async", lambda query: None)
+    monkeypatch.setattr(search_sac_account_service, "stream_records_response", exhausted)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(search_sac_account_service.stream_sac_account_records("PolicyNum"))
+
+    assert excinfo.value.status_code == 503
+
+
+def test_search_sac_account_records_omit_keyset_only_columns(monkeypatch):
+    async def fake_run_raw_query_async(query):
+        return [{"Affiliate Name": "Acme", "Service Level": "Gold", "Account Status": "Active"}]
+
+    monkeypatch.setattr(search_sac_account_service, "run_raw_query_async", fake_run_raw_query_async)
+
+    result = asyncio.run(search_sac_account_service.search_sac_account_records("AffiliateName"))
+
+    assert result == [{"Affiliate Name": "Acme", "Account Status": "Active"}]
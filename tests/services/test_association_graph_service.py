@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from core.config import settings
+from services import association_graph_service
+from services.association_graph_service import AssociationGraph
+
+
+def _rows(*pairs):
+    return [{"ParentAccount": parent, "AssociatedAccount": child} for parent, child in pairs]
+
+
+def test_association_graph_answers_components_and_k_hops():
+    graph = AssociationGraph("tblAssoc")
+    assert not graph.loaded
+
+    # A - B - C - D chain (one-sided rows still link), E - F separate, blanks ignored.
+    graph.replace(_rows(("A", "B"), ("B", "A"), ("C", "B"), (" D ", "C"), ("E", "F"), ("X", None)))
+
+    assert graph.loaded
+    assert graph.neighborhood("A") == {"B": 1, "C": 2, "D": 3}
+    assert graph.neighborhood("A", 2) == {"B": 1, "C": 2}
+    assert graph.neighborhood("F") == {"E": 1}
+    assert graph.neighborhood("unknown") == {}
+    assert graph.stats()["accounts"] == 6
+
+
+def test_association_graph_remove_keeps_link_while_reverse_row_exists():
+    graph = AssociationGraph("tblAssoc")
+    graph.replace(_rows(("A", "B"), ("B", "A"), ("B", "C")))
+
+    graph.remove_pairs([("A", "B")])
+    assert graph.neighborhood("A") == {"B": 1, "C": 2}
+
+    graph.remove_pairs([("B", "A")])
+    assert graph.neighborhood("A") == {}
+    assert graph.neighborhood("C") == {"B": 1}
+
+    graph.add_pairs([("C", "A")])
+    assert graph.neighborhood("A") == {"C": 1, "B": 2}
+
+
+def test_association_graph_ignores_writes_before_load_but_replays_during_reload():
+    graph = AssociationGraph("tblAssoc")
+    graph.add_pairs([("A", "B")])
+    assert graph.neighborhood("A") == {}
+
+    graph.begin_reload()
+    # Committed after the reload query read the table.
+    graph.add_pairs([("B", "C")])
+    graph.replace(_rows(("A", "B")))
+
+    assert graph.neighborhood("A") == {"B": 1, "C": 2}
+
+
+def test_refresh_association_graph_reads_table(monkeypatch):
+    captured = {}
+
+    def fake_run_raw_query(query, params):
+        captured["query"] = query
+        return _rows(("P", "C"))
+
+    monkeypatch.setattr(association_graph_service, "run_raw_query", fake_run_raw_query)
+    graph = association_graph_service.sac_association_graph
+
+    assert association_graph_service.refresh_association_graph(graph) == 1
+    assert "FROM tblSACAccountAssociations" in captured["query"]
+    assert graph.neighborhood("C") == {"P": 1}
+
+
+def test_account_neighborhood_reads_table_when_graph_not_loaded(monkeypatch):
+    calls = []
+
+    def fake_run_raw_query(query, params):
+        calls.append(query)
+        return _rows(("P", "C1"), ("C1", "C2"))
+
+    async def fake_run_db(func, /, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    monkeypatch.setattr(association_graph_service, "run_raw_query", fake_run_raw_query)
+    monkeypatch.setattr(association_graph_service, "run_db", fake_run_db)
+    graph = association_graph_service.hcm_association_graph
+
+    result = asyncio.run(association_graph_service.account_neighborhood(graph, "P", 1))
+
+    assert result == {"C1": 1}
+    assert len(calls) == 1
+    assert not graph.loaded
+
+
+@pytest.mark.parametrize("value", ["0", "-1", "two"])
+def test_parse_max_hops_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        association_graph_service.parse_max_hops(value)
+
+
+def test_start_association_graphs_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "ASSOCIATION_GRAPH_REFRESH_SECONDS", 0)
+
+    assert asyncio.run(association_graph_service.start_association_graphs()) is None
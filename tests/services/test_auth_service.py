@@ -5,6 +5,7 @@ import asyncio
 import pytest
 from fastapi import HTTPException, Request, Response
 
+from core.ttl_cache import InvalidationLog
 from services import auth_service
 
 
@@ -461,6 +462,100 @@ def test_get_current_user_from_token_success_f5_path_branch_mapping(monkeypatch)
     assert result["user"]["branch"] == "All"
 
 
+def _session_request(token="token"):
+    request = Request({"type": "http", "headers": [], "query_string": b""})
+    request._cookies = {auth_service.SESSION_COOKIE_NAME: token}
+    return request
+
+
+def test_get_current_user_from_token_caches_principal(monkeypatch):
+    lookups = []
+
+    def fake_get_user_by_id(user_id):
+        lookups.append(user_id)
+        return {
+            "ID": 1,
+            "FirstName": "A",
+            "LastName": "B",
+            "Email": "a@example.com",
+            "Role": "User",
+        }
+
+    monkeypatch.setattr(auth_service, "decode_access_token", lambda token: {"sub": "1"})
+    monkeypatch.setattr(auth_service, "get_user_by_id", fake_get_user_by_id)
+    monkeypatch.setattr(auth_service, "get_branch_name_by_email", lambda email: "HQ")
+
+    first = asyncio.run(auth_service.get_current_user_from_token(_session_request()))
+    first["user"]["role"] = "mutated"
+    second = asyncio.run(auth_service.get_current_user_from_token(_session_request()))
+
+    assert lookups == [1]
+    assert second["user"]["role"] == "User"
+
+    auth_service.evict_principal("1")
+    asyncio.run(auth_service.get_current_user_from_token(_session_request()))
+    assert lookups == [1, 1]
+
+
+def test_resolve_principal_shares_concurrent_lookups(monkeypatch):
+    lookups = []
+
+    def fake_load(user_id, role):
+        lookups.append((user_id, role))
+        return {"id": user_id, "role": role}
+
+    monkeypatch.setattr(auth_service, "_load_principal", fake_load)
+
+    async def resolve_many():
+        return await asyncio.gather(
+            *(auth_service.resolve_principal("MRM468", "Director,Director") for _ in range(5))
+        )
+
+    results = asyncio.run(resolve_many())
+
+    assert lookups == [("MRM468", "Director")]
+    assert all(result == {"id": "MRM468", "role": "Director"} for result in results)
+
+
+def test_clear_principal_cache_discards_lookups_in_flight(monkeypatch):
+    lookups = []
+
+    def fake_load(user_id, role):
+        lookups.append(user_id)
+        if len(lookups) == 1:
+            # A branch mapping refresh lands while the first lookup runs.
+            auth_service.clear_principal_cache()
+        return {"id": user_id, "lookup": len(lookups)}
+
+    monkeypatch.setattr(auth_service, "_load_principal", fake_load)
+
+    first = asyncio.run(auth_service.resolve_principal("MRM468", "Director"))
+    second = asyncio.run(auth_service.resolve_principal("MRM468", "Director"))
+    third = asyncio.run(auth_service.resolve_principal("MRM468", "Director"))
+
+    assert (first["lookup"], second["lookup"], third["lookup"]) == (1, 2, 2)
+
+
+def test_evicted_subjects_are_tracked_in_bounded_memory(monkeypatch):
+    monkeypatch.setattr(auth_service, "_principal_invalidations", InvalidationLog(2))
+
+    for user_id in range(10):
+        auth_service.evict_principal(user_id)
+
+    assert len(auth_service._principal_invalidations) == 2
+
+
+def test_logout_user_evicts_cached_principal(monkeypatch):
+    evicted = []
+    monkeypatch.setattr(auth_service, "decode_access_token", lambda token: {"sub": "MRM468"})
+    monkeypatch.setattr(auth_service, "evict_principal", evicted.append)
+
+    result = asyncio.run(auth_service.logout_user(Response(), _session_request()))
+
+    assert result == {"message": "Logged out successfully"}
+    assert evicted == ["MRM468"]
+
+
 def test_get_branch_name_by_email_returns_none_when_lookup_fails(monkeypatch):
     monkeypatch.setattr(
         auth_service,
@@ -471,6 +566,48 @@ def test_get_branch_name_by_email_returns_none_when_lookup_fails(monkeypatch):
     assert auth_service.get_branch_name_by_email("mbond@hanover.com") is None
 
 
+def test_branch_lookups_use_loaded_index_without_db(monkeypatch):
+    monkeypatch.setattr(
+        auth_service,
+        "run_raw_query",
+        lambda query, params: pytest.fail("Branch lookup should not query the DB"),
+    )
+    auth_service.branch_mapping_index.replace(
+        [{"Email": "mbond@hanover.com", "UserID": "MRM468", "BranchName": "Boston"}]
+    )
+
+    assert auth_service.get_branch_name_by_email("MBond@Hanover.com") == "Boston"
+    assert auth_service.get_branch_name_by_user_identifier("mrm468") == "Boston"
+    assert auth_service.get_branch_name_by_user_identifier("other") == "All"
+
+
+def test_refresh_branch_mappings_clears_principals(monkeypatch):
+    async def fake_refresh():
+        return 4
+
+    cleared = []
+    monkeypatch.setattr(auth_service, "refresh_branch_mapping_index_async", fake_refresh)
+    monkeypatch.setattr(auth_service, "clear_principal_cache", lambda: cleared.append(True))
+
+    result = asyncio.run(auth_service.refresh_branch_mappings())
+
+    assert result == {"message": "Branch mappings refreshed", "count": 4}
+    assert cleared == [True]
+
+
+def test_require_admin_rejects_users_without_the_admin_role(monkeypatch):
+    async def fake_current_user(request):
+        return {"user": {"id": "MRM468", "role": request}}
+
+    monkeypatch.setattr(auth_service, "get_current_user_from_token", fake_current_user)
+
+    assert asyncio.run(auth_service.require_admin("Director,Admin"))["user"]["id"] == "MRM468"
+    for role in ("Director,Underwriter", None):
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(auth_service.require_admin(role))
+        assert excinfo.value.status_code == 403
+
+
 def test_get_branch_name_by_user_identifier_uses_user_id(monkeypatch):
     captured = {}
 
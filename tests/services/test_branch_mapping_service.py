@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import asyncio
+
+from core.config import settings
+from services import branch_mapping_service
+from services.branch_mapping_service import BranchMappingIndex
+
+
+def test_branch_mapping_index_folds_keys_and_keeps_first_row():
+    index = BranchMappingIndex()
+    assert not index.loaded
+
+    index.replace(
+        [
+            {"Email": " MBond@Hanover.com ", "UserID": "MRM468", "BranchName": "Boston"},
+            {"Email": "mbond@hanover.com", "UserID": None, "BranchName": "Worcester"},
+            {"Email": None, "UserID": "jhoule", "BranchName": None},
+        ]
+    )
+
+    assert index.loaded
+    assert index.branch_for_email("mbond@hanover.com") == "Boston"
+    assert index.branch_for_user_id("mrm468") == "Boston"
+    assert index.branch_for_user_id("JHOULE") is None
+    assert index.branch_for_email("unknown@hanover.com") == "All"
+    assert index.stats()["emails"] == 1
+
+
+def test_refresh_branch_mapping_index_reads_table(monkeypatch):
+    captured = {}
+
+    def fake_run_raw_query(query, params):
+        captured["query"] = query
+        return [{"Email": "a@example.com", "UserID": "A1", "BranchName": "HQ"}]
+
+    monkeypatch.setattr(branch_mapping_service, "run_raw_query", fake_run_raw_query)
+
+    assert branch_mapping_service.refresh_branch_mapping_index() == 1
+    assert "FROM tblBranchMapping" in captured["query"]
+    assert branch_mapping_service.branch_mapping_index.branch_for_email("A@example.com") == "HQ"
+
+
+def test_start_branch_mapping_index_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "BRANCH_MAPPING_REFRESH_SECONDS", 0)
+
+    assert asyncio.run(branch_mapping_service.start_branch_mapping_index()) is None
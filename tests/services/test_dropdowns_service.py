@@ -9,6 +9,13 @@ from fastapi import HTTPException
 from services import dropdowns_service
 
 
+@pytest.fixture(autouse=True)
+def _clear_dropdown_cache():
+    dropdowns_service.invalidate_dropdown_cache()
+    yield
+    dropdowns_service.invalidate_dropdown_cache()
+
+
 def test_quote_identifier_rejects_invalid():
     with pytest.raises(ValueError):
         dropdowns_service._quote_identifier("bad-name")
@@ -98,6 +105,146 @@ def test_get_dropdown_values_all_and_query_and_dynamic(monkeypatch):
     assert result == [{"dynamic": "Unknown"}]
 
 
+def test_get_dropdown_entry_caches_until_table_write(monkeypatch):
+    calls = []
+
+    async def fake_run_raw_query_async(query, params):
+        calls.append(query)
+        return [{"LANID": "u1", "SACName": f"User {len(calls)}"}]
+
+    async def fake_merge(**kwargs):
+        return {"count": len(kwargs["data_list"])}
+
+    monkeypatch.setattr(dropdowns_service, "run_raw_query_async", fake_run_raw_query_async)
+    monkeypatch.setattr(dropdowns_service, "_merge_upsert_dropdown_records_async", fake_merge)
+
+    first = asyncio.run(dropdowns_service.get_dropdown_entry("SAC_Contact1"))
+    again = asyncio.run(dropdowns_service.get_dropdown_entry("SAC_Contact1"))
+    assert again is first
+    assert len(calls) == 1
+    assert first.etag.startswith('"')
+
+    # AcctOwner reads the same table, so writing through it invalidates SAC_Contact1.
+    asyncio.run(
+        dropdowns_service.upsert_dropdown_values("AcctOwner", [{"LANID": "u1", "SACName": "x"}])
+    )
+    reloaded = asyncio.run(dropdowns_service.get_dropdown_entry("SAC_Contact1"))
+    assert len(calls) == 2
+    assert reloaded.etag != first.etag
+
+
+def test_get_dropdown_entry_keeps_last_modified_when_content_unchanged(monkeypatch):
+    async def fake_fetch_dynamic(name):
+        return [{"DD_Value": "A"}]
+
+    monkeypatch.setattr(dropdowns_service, "_fetch_dynamic_dropdown", fake_fetch_dynamic)
+
+    first = asyncio.run(dropdowns_service.get_dropdown_entry("Status"))
+    # Expire the entry; its validators outlive it.
+    dropdowns_service._dropdown_cache._entries.clear()
+    second = asyncio.run(dropdowns_service.get_dropdown_entry("Status"))
+
+    assert second is not first
+    assert second.etag == first.etag
+    assert second.last_modified == first.last_modified
+
+
+def test_dropdown_cache_is_bounded_by_size(monkeypatch):
+    async def fake_fetch_dynamic(name):
+        return [{"DD_Value": name}]
+
+    cache = dropdowns_service._DropdownCache(maxsize=2, ttl=60)
+    monkeypatch.setattr(dropdowns_service, "_dropdown_cache", cache)
+    monkeypatch.setattr(dropdowns_service, "_fetch_dynamic_dropdown", fake_fetch_dynamic)
+
+    for name in ("One", "Two", "Three"):
+        asyncio.run(dropdowns_service.get_dropdown_entry(name))
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert cache.get("One") is None
+    assert cache.get("Three") is not None
+
+
+def test_get_dropdown_values_returns_copies(monkeypatch):
+    async def fake_fetch_dynamic(name):
+        return [{"DD_Value": "A"}]
+
+    monkeypatch.setattr(dropdowns_service, "_fetch_dynamic_dropdown", fake_fetch_dynamic)
+
+    rows = asyncio.run(dropdowns_service.get_dropdown_values("Status"))
+    rows[0]["DD_Value"] = "mutated"
+
+    assert asyncio.run(dropdowns_service.get_dropdown_values("Status")) == [{"DD_Value": "A"}]
+
+
+def test_get_dropdown_bundle_batches_misses_and_reuses_cache(monkeypatch):
+    batches = []
+
+    async def fake_run_raw_query_sets_async(statements):
+        batches.append(statements)
+        return [
+            [{"LANID": "u1", "SACName": "User"}],
+            [
+                {"DD_Type": "status", "DD_Key": 1, "DD_Value": "Open", "DD_SortOrder": 1},
+                {"DD_Type": "Priority", "DD_Key": 2, "DD_Value": "High", "DD_SortOrder": 1},
+            ],
+        ]
+
+    monkeypatch.setattr(
+        dropdowns_service, "run_raw_query_sets_async", fake_run_raw_query_sets_async
+    )
+
+    entries = asyncio.run(
+        dropdowns_service.get_dropdown_bundle(["Status", "SAC_Contact1", "Priority", " Status "])
+    )
+
+    assert list(entries) == ["Status", "SAC_Contact1", "Priority"]
+    assert entries["SAC_Contact1"].rows == [{"LANID": "u1", "SACName": "User"}]
+    assert entries["Status"].rows == [{"DD_Key": 1, "DD_Value": "Open", "DD_SortOrder": 1}]
+    assert entries["Priority"].rows == [{"DD_Key": 2, "DD_Value": "High", "DD_SortOrder": 1}]
+    assert len(batches) == 1
+    dynamic_query, dynamic_params = batches[0][-1]
+    assert "DD_Type IN (?, ?)" in dynamic_query
+    assert dynamic_params == ["Status", "Priority"]
+
+    again = asyncio.run(dropdowns_service.get_dropdown_bundle(["Priority", "SAC_Contact1"]))
+    assert again["Priority"] is entries["Priority"]
+    assert len(batches) == 1
+
+    etag, last_modified = dropdowns_service.bundle_validators(again)
+    assert etag.startswith('"')
+    assert last_modified == entries["Priority"].last_modified
+
+
+def test_get_dropdown_bundle_handles_names_differing_only_by_case(monkeypatch):
+    async def fake_run_raw_query_sets_async(statements):
+        return [[{"DD_Type": "FOO", "DD_Key": 1, "DD_Value": "Bar", "DD_SortOrder": 1}]]
+
+    monkeypatch.setattr(
+        dropdowns_service, "run_raw_query_sets_async", fake_run_raw_query_sets_async
+    )
+
+    entries = asyncio.run(dropdowns_service.get_dropdown_bundle(["Foo", "foo"]))
+
+    assert list(entries) == ["Foo", "foo"]
+    expected = [{"DD_Key": 1, "DD_Value": "Bar", "DD_SortOrder": 1}]
+    assert entries["Foo"].rows == expected
+    assert entries["foo"].rows == expected
+    assert entries["Foo"].rows is not entries["foo"].rows
+
+
+def test_get_dropdown_bundle_validates_names():
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(dropdowns_service.get_dropdown_bundle([" ", ""]))
+    assert excinfo.value.status_code == 400
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(dropdowns_service.get_dropdown_bundle(["users"]))
+    assert excinfo.value.status_code == 404
+
+
 def test_get_dropdown_values_requires_name():
     with pytest.raises(HTTPException):
         asyncio.run(dropdowns_service.get_dropdown_values("  "))
@@ -209,6 +356,38 @@ def test_delete_dropdown_values_success(monkeypatch):
     assert result == {"count": 1}
 
 
+def test_dropdown_writes_refresh_the_name_email_index(monkeypatch):
+    refreshed = []
+
+    async def fake_refresh_after_write(table):
+        refreshed.append(table)
+
+    async def fake_merge(*, table, data_list, key_columns, exclude_key_columns_from_insert):
+        return {"count": len(data_list)}
+
+    async def fake_delete(*, table, data_list, key_column):
+        return {"count": len(data_list)}
+
+    monkeypatch.setattr(
+        dropdowns_service, "refresh_name_email_index_after_write", fake_refresh_after_write
+    )
+    monkeypatch.setattr(
+        dropdowns_service,
+        "_normalize_dropdown_rows",
+        lambda rows, pk, cmap: [{pk: 1, "UW Email": "jane@example.com"}],
+    )
+    monkeypatch.setattr(
+        dropdowns_service, "_normalize_delete_rows", lambda rows, pk, allowed: [{pk: 1}]
+    )
+    monkeypatch.setattr(dropdowns_service, "_merge_upsert_dropdown_records_async", fake_merge)
+    monkeypatch.setattr(dropdowns_service, "_delete_dropdown_records_async", fake_delete)
+
+    asyncio.run(dropdowns_service.upsert_dropdown_values("Underwriters", [{}]))
+    asyncio.run(dropdowns_service.delete_dropdown_values("AcctOwner", [{}]))
+
+    assert refreshed == ["tblUnderwriters", "tblMGTUsers"]
+
+
 def test_delete_dropdown_values_requires_name():
     with pytest.raises(HTTPException):
         asyncio.run(dropdowns_service.delete_dropdown_values("  ", []))
@@ -277,6 +456,9 @@ def test_insert_and_delete_dropdown_records(monkeypatch):
         def execute(self, query, values):
             executed.append((query, values))
 
+        def executemany(self, query, values):
+            executed.append((query, values))
+
     class FakeConn:
         def cursor(self):
             return FakeCursor()
@@ -294,10 +476,11 @@ def test_insert_and_delete_dropdown_records(monkeypatch):
         "tblDropDowns", [{"DD_Value": "A"}, {}]
     )
     assert insert_result == {"message": "Insertion successful", "count": 2}
-    assert "INSERT INTO [tblDropDowns]" in executed[0][0]
+    assert executed[0] == ("INSERT INTO [tblDropDowns] ([DD_Value]) VALUES (?)", [["A"]])
 
     delete_result = dropdowns_service._delete_dropdown_records(
         "tblDropDowns", [{"DD_Key": 1}], "DD_Key"
     )
     assert delete_result == {"message": "Deletion successful", "count": 1}
-    assert "DELETE FROM [tblDropDowns]" in executed[-1][0]
+    assert "DELETE target FROM [tblDropDowns] AS target WHERE EXISTS" in executed[-1][0]
+    assert executed[-1][1] == [1]
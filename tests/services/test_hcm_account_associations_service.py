@@ -11,24 +11,14 @@ from services.hcm import hcm_account_associations_service
 def test_add_associations_inserts_bidirectional_hcm_pairs(monkeypatch):
     captured = {}
 
-    async def fake_fetch_records_async(*, table, filters):
-        assert table == "tblHcmAccountAssociations"
-        return []
-
-    async def fake_insert_records_async(*, table, records):
-        captured["table"] = table
-        captured["records"] = records
+    async def fake_insert_missing_records_async(*, table, records, key_columns):
+        captured.update(table=table, records=records, key_columns=key_columns)
         return {"count": len(records)}
 
     monkeypatch.setattr(
         hcm_account_associations_service,
-        "fetch_records_async",
-        fake_fetch_records_async,
-    )
-    monkeypatch.setattr(
-        hcm_account_associations_service,
-        "insert_records_async",
-        fake_insert_records_async,
+        "insert_missing_records_async",
+        fake_insert_missing_records_async,
     )
 
     result = asyncio.run(
@@ -44,18 +34,18 @@ def test_add_associations_inserts_bidirectional_hcm_pairs(monkeypatch):
             {"ParentAccount": "P", "AssociatedAccount": "C"},
             {"ParentAccount": "C", "AssociatedAccount": "P"},
         ],
+        "key_columns": ["ParentAccount", "AssociatedAccount"],
     }
 
 
 def test_add_associations_skips_existing_pairs(monkeypatch):
-    async def fake_fetch_records_async(*, table, filters):
-        parent = filters["ParentAccount"]
-        return [{"AssociatedAccount": "C" if parent == "P" else "P"}]
+    async def fake_insert_missing_records_async(*, table, records, key_columns):
+        return {"message": "No new records to insert", "count": 0}
 
     monkeypatch.setattr(
         hcm_account_associations_service,
-        "fetch_records_async",
-        fake_fetch_records_async,
+        "insert_missing_records_async",
+        fake_insert_missing_records_async,
     )
 
     result = asyncio.run(
@@ -126,3 +116,15 @@ def test_get_associations_requires_parent_account():
 
     assert excinfo.value.status_code == 400
     assert excinfo.value.detail == {"error": "ParentAccount is required"}
+
+
+def test_get_account_family_uses_hcm_graph():
+    hcm_account_associations_service.hcm_association_graph.replace(
+        [{"ParentAccount": "P", "AssociatedAccount": "C"}]
+    )
+
+    result = asyncio.run(
+        hcm_account_associations_service.get_account_family({"ParentAccount": "C"})
+    )
+
+    assert result == [{"ParentAccount": "C", "AssociatedAccount": "P", "Hops": 1}]
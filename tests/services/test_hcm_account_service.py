@@ -5,8 +5,9 @@ from services.hcm import hcm_account_service
 
 
 def test_get_hcm_account_formats_date_fields(monkeypatch):
-    async def fake_fetch_records_async(*, table, filters):
+    async def fake_fetch_records_async(*, table, filters, columns):
         assert table == "tblHcmAccount"
+        assert columns is None
         assert filters == {"Stage": "Admin", "IsSubmitted": "0"}
         return [
             {
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+
+from core.config import settings
+from services import name_email_index_service
+from services.name_email_index_service import NameEmailIndex
+
+
+def test_name_email_index_normalizes_names_and_keeps_all_emails():
+    index = NameEmailIndex()
+    assert not index.loaded
+
+    index.replace(
+        [
+            {"Name": " Jane Doe ", "Email": "jane@example.com"},
+            {"Name": "JANE DOE", "Email": "jdoe@example.com"},
+            {"Name": "jane doe", "Email": "jane@example.com"},
+            {"Name": "No Email", "Email": None},
+            {"Name": None, "Email": "orphan@example.com"},
+        ],
+        [{"Name": "Sam Owner", "Email": "sam@example.com"}],
+    )
+
+    assert index.loaded
+    assert index.underwriter_emails("jane doe") == ("jane@example.com", "jdoe@example.com")
+    assert index.underwriter_emails("no email") == ()
+    assert index.underwriter_emails("Unknown") == ()
+    assert index.sac_user_emails("SAM OWNER ") == ("sam@example.com",)
+    assert index.stats()["underwriters"] == 2
+
+
+def test_refresh_name_email_index_reads_both_tables_in_one_batch(monkeypatch):
+    captured = {}
+
+    def fake_run_raw_query_sets(statements):
+        captured["statements"] = statements
+        return [[{"Name": "UW", "Email": "uw@example.com"}], []]
+
+    monkeypatch.setattr(name_email_index_service, "run_raw_query_sets", fake_run_raw_query_sets)
+
+    assert name_email_index_service.refresh_name_email_index() == 1
+    queries = [query for query, _ in captured["statements"]]
+    assert "FROM tblUnderwriters" in queries[0]
+    assert "FROM tblMGTUsers" in queries[1]
+    assert name_email_index_service.name_email_index.underwriter_emails("uw") == ("uw@example.com",)
+
+
+def test_start_name_email_index_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "NAME_EMAIL_INDEX_REFRESH_SECONDS", 0)
+
+    assert asyncio.run(name_email_index_service.start_name_email_index()) is None
+
+
+def test_refresh_after_write_reloads_a_loaded_index_for_its_tables(monkeypatch):
+    reloads = []
+
+    async def fake_refresh():
+        reloads.append(True)
+        return 0
+
+    monkeypatch.setattr(name_email_index_service.name_email_refresh, "refresh", fake_refresh)
+    refresh_after_write = name_email_index_service.refresh_name_email_index_after_write
+
+    asyncio.run(refresh_after_write("tblUnderwriters"))
+    assert reloads == []  # Not loaded: lookups already join in SQL.
+
+    name_email_index_service.name_email_index.replace([], [])
+    asyncio.run(refresh_after_write("tblDropDowns"))
+    asyncio.run(refresh_after_write("tblMGTUsers"))
+    assert reloads == [True]
+
+
+def test_refresh_after_write_falls_back_to_sql_when_reload_fails(monkeypatch):
+    async def failing_refresh():
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(name_email_index_service.name_email_refresh, "refresh", failing_refresh)
+    name_email_index_service.name_email_index.replace([], [])
+
+    asyncio.run(name_email_index_service.refresh_name_email_index_after_write("tblUnderwriters"))
+
+    assert not name_email_index_service.name_email_index.loaded